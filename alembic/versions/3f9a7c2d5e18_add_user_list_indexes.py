@@ -0,0 +1,38 @@
+"""add_user_list_indexes
+
+Revision ID: 3f9a7c2d5e18
+Revises: 8d4c1e6b2a90
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a7c2d5e18'
+down_revision: Union[str, None] = '8d4c1e6b2a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_users_is_blocked', table_name='users')
+    op.drop_index('ix_users_role', table_name='users')
+    op.create_index('ix_users_full_name', 'users', ['full_name'], unique=False)
+    op.create_index('ix_users_role_full_name', 'users', ['role', 'full_name'], unique=False)
+    op.create_index('ix_users_is_blocked_full_name', 'users', ['is_blocked', 'full_name'], unique=False)
+    op.create_index('ix_users_railway_full_name', 'users', ['railway', 'full_name'], unique=False)
+    op.create_index('ix_users_branch_full_name', 'users', ['branch', 'full_name'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_branch_full_name', table_name='users')
+    op.drop_index('ix_users_railway_full_name', table_name='users')
+    op.drop_index('ix_users_is_blocked_full_name', table_name='users')
+    op.drop_index('ix_users_role_full_name', table_name='users')
+    op.drop_index('ix_users_full_name', table_name='users')
+    op.create_index('ix_users_role', 'users', ['role'], unique=False)
+    op.create_index('ix_users_is_blocked', 'users', ['is_blocked'], unique=False)
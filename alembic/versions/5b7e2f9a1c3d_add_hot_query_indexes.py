@@ -0,0 +1,32 @@
+"""add_hot_query_indexes
+
+Revision ID: 5b7e2f9a1c3d
+Revises: 21163e23e592
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2f9a1c3d'
+down_revision: Union[str, None] = '21163e23e592'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_role', 'users', ['role'], unique=False)
+    op.create_index('ix_users_is_blocked', 'users', ['is_blocked'], unique=False)
+    op.create_index('ix_train_receptions_user_id_created_at', 'train_receptions', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_blocks_in_train_reception_id_is_checked', 'blocks_in_train', ['reception_id', 'is_checked'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_blocks_in_train_reception_id_is_checked', table_name='blocks_in_train')
+    op.drop_index('ix_train_receptions_user_id_created_at', table_name='train_receptions')
+    op.drop_index('ix_users_is_blocked', table_name='users')
+    op.drop_index('ix_users_role', table_name='users')
@@ -0,0 +1,52 @@
+"""add_users_full_name_lower
+
+Revision ID: 7c1f4e9b3d52
+Revises: e2b8c6a4f710
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1f4e9b3d52'
+down_revision: Union[str, None] = 'e2b8c6a4f710'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIST_INDEXES = ('role', 'is_blocked', 'railway', 'branch')
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('full_name_lower', sa.String(), nullable=False, server_default=''))
+
+    # lower() SQLite переводит в нижний регистр только ASCII, поэтому
+    # кириллические ФИО заполняются из Python
+    connection = op.get_bind()
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('full_name', sa.String),
+                     sa.column('full_name_lower', sa.String))
+    rows = connection.execute(sa.select(users.c.id, users.c.full_name)).all()
+    if rows:
+        connection.execute(
+            users.update().where(users.c.id == sa.bindparam('user_id')).values(full_name_lower=sa.bindparam('lower')),
+            [{'user_id': user_id, 'lower': full_name.lower()} for user_id, full_name in rows]
+        )
+
+    op.drop_index('ix_users_full_name', table_name='users')
+    op.create_index('ix_users_full_name_lower', 'users', ['full_name_lower'], unique=False)
+    for column in LIST_INDEXES:
+        op.drop_index(f'ix_users_{column}_full_name', table_name='users')
+        op.create_index(f'ix_users_{column}_full_name_lower', 'users', [column, 'full_name_lower'], unique=False)
+
+
+def downgrade() -> None:
+    for column in reversed(LIST_INDEXES):
+        op.drop_index(f'ix_users_{column}_full_name_lower', table_name='users')
+        op.create_index(f'ix_users_{column}_full_name', 'users', [column, 'full_name'], unique=False)
+    op.drop_index('ix_users_full_name_lower', table_name='users')
+    op.create_index('ix_users_full_name', 'users', ['full_name'], unique=False)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('full_name_lower')
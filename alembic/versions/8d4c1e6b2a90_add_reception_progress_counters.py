@@ -0,0 +1,69 @@
+"""add_reception_progress_counters
+
+Revision ID: 8d4c1e6b2a90
+Revises: 5b7e2f9a1c3d
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4c1e6b2a90'
+down_revision: Union[str, None] = '5b7e2f9a1c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('blocks_in_train', sa.Column('position', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('train_receptions', sa.Column('blocks_total', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('train_receptions', sa.Column('blocks_checked', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('train_receptions', sa.Column('faults_found', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('train_receptions', sa.Column('next_block_position', sa.Integer(), nullable=False, server_default='0'))
+
+    # Позиция блока — порядковый номер внутри приёмки в порядке создания
+    op.execute("""
+        UPDATE blocks_in_train SET position = (
+            SELECT COUNT(*) FROM blocks_in_train AS b
+            WHERE b.reception_id = blocks_in_train.reception_id AND b.id < blocks_in_train.id
+        )
+    """)
+    op.execute("""
+        UPDATE train_receptions SET
+            blocks_total = (
+                SELECT COUNT(*) FROM blocks_in_train AS b
+                WHERE b.reception_id = train_receptions.id
+            ),
+            blocks_checked = (
+                SELECT COUNT(*) FROM blocks_in_train AS b
+                WHERE b.reception_id = train_receptions.id AND b.is_checked = 1
+            ),
+            faults_found = (
+                SELECT COUNT(*) FROM blocks_in_train AS b
+                WHERE b.reception_id = train_receptions.id AND b.is_checked = 1
+                  AND b.notes IS NOT 'Исправен'
+            ),
+            next_block_position = COALESCE((
+                SELECT MIN(b.position) FROM blocks_in_train AS b
+                WHERE b.reception_id = train_receptions.id AND b.is_checked = 0
+            ), (
+                SELECT COUNT(*) FROM blocks_in_train AS b
+                WHERE b.reception_id = train_receptions.id
+            ))
+    """)
+    op.create_index('ix_blocks_in_train_reception_id_position', 'blocks_in_train', ['reception_id', 'position'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_blocks_in_train_reception_id_position', table_name='blocks_in_train')
+    with op.batch_alter_table('train_receptions') as batch_op:
+        batch_op.drop_column('next_block_position')
+        batch_op.drop_column('faults_found')
+        batch_op.drop_column('blocks_checked')
+        batch_op.drop_column('blocks_total')
+    with op.batch_alter_table('blocks_in_train') as batch_op:
+        batch_op.drop_column('position')
@@ -0,0 +1,47 @@
+"""add_stat_counters
+
+Revision ID: a6e3d9f41b27
+Revises: 3f9a7c2d5e18
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e3d9f41b27'
+down_revision: Union[str, None] = '3f9a7c2d5e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('stat_counters',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Начальные значения счётчиков по текущим данным
+    op.execute("""
+        INSERT INTO stat_counters (name, value)
+        SELECT 'users_total', COUNT(*) FROM users
+        UNION ALL SELECT 'users_admin', COALESCE(SUM(role = 'ADMIN'), 0) FROM users
+        UNION ALL SELECT 'users_blocked', COALESCE(SUM(is_blocked = 1), 0) FROM users
+        UNION ALL SELECT 'receptions_total', COUNT(*) FROM train_receptions
+        UNION ALL SELECT 'receptions_open', COALESCE(SUM(COALESCE(is_completed, 0) = 0), 0) FROM train_receptions
+        UNION ALL SELECT 'receptions_faulty', COALESCE(SUM(faults_found > 0), 0) FROM train_receptions
+    """)
+    op.execute("""
+        INSERT INTO stat_counters (name, value)
+        SELECT 'receptions_day_' || DATE(created_at), COUNT(*) FROM train_receptions
+        WHERE created_at IS NOT NULL
+        GROUP BY DATE(created_at)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('stat_counters')
@@ -0,0 +1,85 @@
+"""add_checklist_catalog
+
+Revision ID: e2b8c6a4f710
+Revises: a6e3d9f41b27
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from train_blocks import TRAIN_BLOCKS, BLOCK_DESCRIPTIONS, BLOCK_CHECKLIST
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8c6a4f710'
+down_revision: Union[str, None] = 'a6e3d9f41b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRAIN_TYPE = sa.Enum('EP2D', 'EP3D', 'RA1', 'RA2', 'RA3', name='traintype')
+
+
+def upgrade() -> None:
+    versions = op.create_table('checklist_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('comment', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    blocks = op.create_table('checklist_blocks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version_id', sa.Integer(), nullable=False),
+    sa.Column('train_type', TRAIN_TYPE, nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['version_id'], ['checklist_versions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_checklist_blocks_version_id_train_type_position', 'checklist_blocks', ['version_id', 'train_type', 'position'], unique=True)
+    items = op.create_table('checklist_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('block_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('text', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['block_id'], ['checklist_blocks.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_checklist_items_block_id_position', 'checklist_items', ['block_id', 'position'], unique=True)
+
+    # Все существующие приёмки созданы по первой версии каталога
+    op.add_column('train_receptions', sa.Column('checklist_version', sa.Integer(), nullable=False, server_default='1'))
+
+    # Первая версия — блоки из train_blocks.py
+    op.bulk_insert(versions, [{'id': 1, 'comment': 'train_blocks.py'}])
+    block_rows, item_rows = [], []
+    for train_type, names in TRAIN_BLOCKS.items():
+        for position, name in enumerate(names):
+            block_id = len(block_rows) + 1
+            block_rows.append({
+                'id': block_id,
+                'version_id': 1,
+                'train_type': train_type.name,
+                'position': position,
+                'name': name,
+                'description': BLOCK_DESCRIPTIONS[name]
+            })
+            item_rows.extend(
+                {'block_id': block_id, 'position': item_position, 'text': text}
+                for item_position, text in enumerate(BLOCK_CHECKLIST[name])
+            )
+    op.bulk_insert(blocks, block_rows)
+    op.bulk_insert(items, item_rows)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('train_receptions') as batch_op:
+        batch_op.drop_column('checklist_version')
+    op.drop_index('ix_checklist_items_block_id_position', table_name='checklist_items')
+    op.drop_table('checklist_items')
+    op.drop_index('ix_checklist_blocks_version_id_train_type_position', table_name='checklist_blocks')
+    op.drop_table('checklist_blocks')
+    op.drop_table('checklist_versions')
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+
+from models import Base, User, TrainReception, BlockInTrain
+from database import engine, archive_engine, ARCHIVE_DB_PATH
+
+# Завершённые приёмки старше этого срока переносятся в архив
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '180'))
+# Приёмок в одной транзакции переноса
+ARCHIVE_CHUNK_SIZE = int(os.getenv('ARCHIVE_CHUNK_SIZE', '500'))
+# Пауза между транзакциями, чтобы пропускать вперёд запись из бота (сек)
+ARCHIVE_PAUSE = float(os.getenv('ARCHIVE_PAUSE', '0.05'))
+
+ARCHIVE_TABLES = [User.__table__, TrainReception.__table__, BlockInTrain.__table__]
+
+def init_archive():
+    """Создаёт таблицы архивной базы (пользователи, приёмки, блоки).
+
+    Архив не обслуживается миграциями, поэтому столбцы, добавленные в модели
+    позже создания файла, дописываются в существующие таблицы здесь.
+    """
+    Base.metadata.create_all(archive_engine, tables=ARCHIVE_TABLES)
+    with archive_engine.begin() as connection:
+        for table in ARCHIVE_TABLES:
+            existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({table.name})')}
+            for column in table.columns:
+                if column.name not in existing:
+                    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                    connection.exec_driver_sql(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} '
+                        f'{column.type.compile(archive_engine.dialect)}'
+                        + (f' DEFAULT {default!r}' if default is not None else '')
+                    )
+
+def _copy_rows(connection, table, where: str, ids: list):
+    """Копирует строки таблицы из основной базы в присоединённый архив.
+
+    Столбцы перечисляются явно: после миграций их порядок в bot.db может
+    отличаться от порядка в архиве, созданном по моделям.
+    """
+    columns = ', '.join(column.name for column in table.columns)
+    placeholders = ', '.join('?' for _ in ids)
+    connection.exec_driver_sql(
+        f'INSERT OR REPLACE INTO archive.{table.name} ({columns}) '
+        f'SELECT {columns} FROM main.{table.name} WHERE {where} IN ({placeholders})',
+        tuple(ids)
+    )
+
+def archive_receptions(older_than_days: int = ARCHIVE_AFTER_DAYS, chunk_size: int = ARCHIVE_CHUNK_SIZE,
+                       pause: float = ARCHIVE_PAUSE) -> int:
+    """Переносит завершённые приёмки старше срока в архивную базу.
+
+    Работает короткими транзакциями по chunk_size приёмок, чтобы не держать
+    блокировку записи bot.db. В режиме WAL транзакция с присоединённой базой
+    атомарна только по каждому файлу отдельно, поэтому строки сначала
+    копируются в архив (INSERT OR REPLACE), а затем удаляются из основной
+    базы: при сбое повторный запуск просто докопирует их.
+
+    Приёмка с наибольшим id не переносится никогда: SQLite выдаёт новые id
+    как MAX(id) + 1, и так новые приёмки не получат id уже архивированных.
+    Возвращает число перенесённых приёмок.
+    """
+    init_archive()
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    moved = 0
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql('ATTACH DATABASE ? AS archive', (ARCHIVE_DB_PATH,))
+        connection.commit()
+        try:
+            while True:
+                with connection.begin():
+                    ids = connection.scalars(
+                        select(TrainReception.id)
+                        .filter(
+                            TrainReception.is_completed == True,
+                            TrainReception.created_at < cutoff,
+                            TrainReception.id < select(func.max(TrainReception.id)).scalar_subquery()
+                        )
+                        .order_by(TrainReception.id)
+                        .limit(chunk_size)
+                    ).all()
+                    if not ids:
+                        break
+
+                    user_ids = connection.scalars(
+                        select(TrainReception.user_id).filter(TrainReception.id.in_(ids)).distinct()
+                    ).all()
+                    _copy_rows(connection, User.__table__, 'id', user_ids)
+                    _copy_rows(connection, TrainReception.__table__, 'id', ids)
+                    _copy_rows(connection, BlockInTrain.__table__, 'reception_id', ids)
+
+                    connection.execute(BlockInTrain.__table__.delete().where(BlockInTrain.reception_id.in_(ids)))
+                    connection.execute(TrainReception.__table__.delete().where(TrainReception.id.in_(ids)))
+
+                moved += len(ids)
+                print(f"Перенесено в архив: {moved}")
+                time.sleep(pause)
+        finally:
+            connection.rollback()
+            connection.exec_driver_sql('DETACH DATABASE archive')
+            connection.commit()
+
+    return moved
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else ARCHIVE_AFTER_DAYS
+    total = archive_receptions(days)
+    print(f"Готово, перенесено приёмок: {total}")
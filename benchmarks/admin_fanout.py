@@ -0,0 +1,109 @@
+"""Уведомления администраторов о регистрациях: по одному, в фоне и сводкой.
+
+Запуск из корня проекта:
+    python -m benchmarks.admin_fanout [регистраций] [администраторов]
+
+Регистрации идут подряд, как при массовом приёме на работу. Для каждой
+схемы выводится, сколько обработчик регистрации ждёт уведомления (ответ
+новому пользователю уходит только после этого), сколько сообщений
+отправлено и за сколько доставлены все. Bot API — заглушка с задержкой
+API_LATENCY на запрос без ограничений частоты; время доставки при
+лимите Telegram ~30 сообщений в секунду оценивается отдельно.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from sqlalchemy import select
+from telegram.ext import ExtBot
+from telegram.request import BaseRequest
+
+from models import Base, User, UserRole, Railway
+from database import engine, session_scope, async_read_session_scope
+from handlers.notifications import AdminNotifier, DigestItem
+
+API_LATENCY = 0.01  # секунд на запрос к Bot API
+TELEGRAM_RATE = 30  # сообщений в секунду
+
+class FakeRequest(BaseRequest):
+    def __init__(self):
+        self.messages = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        await asyncio.sleep(API_LATENCY)
+        result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        if not url.endswith('/getMe'):
+            self.messages += 1
+            result = {'message_id': 1, 'date': 0, 'chat': {'id': 1, 'type': 'private'}, 'text': ''}
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+async def notify_admins_sequential(bot, message: str):
+    """Прежняя схема: админы целиком из ORM, отправка по одному внутри сессии"""
+    async with async_read_session_scope() as session:
+        admins = (await session.scalars(select(User).filter(User.role == UserRole.ADMIN))).all()
+        for admin in admins:
+            await bot.send_message(chat_id=admin.id, text=message, parse_mode='HTML')
+
+def registration(number: int):
+    message = f'📝 Новая регистрация!\n\n👤 Сотрудник {number}\n📋 Должность: Инспектор'
+    return message, DigestItem('📝 Новые регистрации', f'👤 Сотрудник {number}, Инспектор')
+
+async def measure(label: str, registrations: int, notifier: AdminNotifier = None):
+    request = FakeRequest()
+    bot = ExtBot('1:bench', request=request)
+    await bot.initialize()
+
+    started = time.perf_counter()
+    blocked = 0.0
+    for number in range(registrations):
+        message, digest = registration(number)
+        call_started = time.perf_counter()
+        if notifier is None:
+            await notify_admins_sequential(bot, message)
+        else:
+            notifier.notify(bot, message, digest)
+        blocked += time.perf_counter() - call_started
+        await asyncio.sleep(0)  # Следующая регистрация — следующее обновление
+    if notifier is not None:
+        if notifier.digest_window:
+            await asyncio.sleep(notifier.digest_window)
+        await notifier.stop()
+    elapsed = time.perf_counter() - started
+    await bot.shutdown()
+
+    print(
+        f'{label:<18} ожидание в регистрации {blocked / registrations * 1000:8.2f} мс, '
+        f'сообщений {request.messages:5d}, доставлены за {elapsed:5.2f} с '
+        f'(при 30/с — не меньше {request.messages / TELEGRAM_RATE:6.1f} с)'
+    )
+
+def main():
+    registrations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    admins = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    Base.metadata.create_all(engine)
+    with session_scope() as session:
+        for admin_id in range(1, admins + 1):
+            session.merge(User(
+                id=admin_id, full_name=f'Администратор {admin_id}', position='Администратор',
+                railway=Railway.YUGO_VOSTOCHNAYA, branch='Депо', phone='+79000000000', role=UserRole.ADMIN
+            ))
+
+    print(f'Регистраций: {registrations}, администраторов: {admins}')
+    asyncio.run(measure('по одному', registrations))
+    asyncio.run(measure('в фоне', registrations, AdminNotifier(digest_window=0)))
+    asyncio.run(measure('сводкой (окно 1 с)', registrations, AdminNotifier(digest_window=1)))
+
+if __name__ == '__main__':
+    main()
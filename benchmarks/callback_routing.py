@@ -0,0 +1,96 @@
+"""Маршрутизация нажатий: цепочка regex-обработчиков против префиксного маршрутизатора.
+
+Запуск из корня проекта:
+    python -m benchmarks.callback_routing [число проходов]
+
+Старая схема воспроизведена по прежним обработчикам: CallbackQueryHandler
+с регулярными выражениями пробуются по очереди (последний — без pattern,
+как выбор пользователя в админке), затем данные разбираются split('_').
+Новая — один CallbackQueryHandler маршрутизатора на все действия: поиск
+префикса во множестве, разбор полей и выбор обработчика в словаре.
+Выводятся время на нажатие и длина callback_data.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault('DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from telegram import Update, CallbackQuery, User as TelegramUser
+from telegram.ext import CallbackQueryHandler
+
+from callbacks import CallbackAction, callback_router, pack_callback
+import handlers.admin  # noqa: F401 — регистрирует обработчики в маршрутизаторе
+import handlers.reception  # noqa: F401
+
+CREATED_AT = datetime(2026, 10, 18, 12, 30, 1, 123456)
+
+# Прежние шаблоны в порядке, в котором их пробовал PTB
+OLD_PATTERNS = [
+    r'^block_(ok|fail)_\d+$',
+    r'^clist_(ok|fail|rest|done)_\d+$',
+    r'^(view_reception_\d+|back_to_reception|export_pdf_\d+|history_(older|newer)_[0-9a-z]+\.[0-9a-z]+)$',
+    r'^users_',
+    None
+]
+
+# Одни и те же нажатия в старом и новом формате
+CLICKS = [
+    ('block_ok_123456', (CallbackAction.BLOCK_OK, 123456)),
+    ('clist_fail_123456', (CallbackAction.CHECKLIST_FAIL, 123456)),
+    ('view_reception_98765', (CallbackAction.HISTORY_VIEW, 98765)),
+    ('history_older_5ybs3mnx8sw.2s9x', (CallbackAction.HISTORY_OLDER, CREATED_AT, 135789)),
+    ('export_pdf_98765', (CallbackAction.EXPORT_PDF, 98765)),
+    ('users_next_1234567890', (CallbackAction.USERS_NEXT, 1234567890)),
+    ('user_1234567890', (CallbackAction.USER_SELECT, 1234567890)),
+    ('make_admin_1234567890', (CallbackAction.MAKE_ADMIN, 1234567890)),
+]
+
+async def _noop(update, context):
+    pass
+
+def make_update(data: str) -> Update:
+    return Update(1, callback_query=CallbackQuery(
+        '1', TelegramUser(1, 'Инспектор', False), 'bench', data=data
+    ))
+
+def route_old(handlers, update):
+    for handler in handlers:
+        if handler.check_update(update):
+            return update.callback_query.data.split('_')
+    return None
+
+def route_new(handler, routes, update):
+    callback = handler.check_update(update)
+    return routes[callback.action], callback.values
+
+def measure(label: str, route, updates, passes: int):
+    started = time.perf_counter()
+    for _ in range(passes):
+        for update in updates:
+            route(update)
+    elapsed = time.perf_counter() - started
+    print(f'{label:<24} {elapsed / passes / len(updates) * 1e6:6.2f} мкс/нажатие')
+
+def main():
+    passes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    old_handlers = [CallbackQueryHandler(_noop, pattern=pattern) for pattern in OLD_PATTERNS]
+    new_handler = callback_router.handler(*CallbackAction)
+    routes = callback_router._routes
+
+    old_updates = [make_update(old) for old, _ in CLICKS]
+    new_updates = [make_update(pack_callback(*new)) for _, new in CLICKS]
+
+    print(f'{"callback_data":<32} {"было":>5} {"стало":>6}')
+    for (old, _), update in zip(CLICKS, new_updates):
+        print(f'{old:<32} {len(old):5d} {len(update.callback_query.data):6d}')
+    print()
+
+    measure('regex-цепочка + split', lambda update: route_old(old_handlers, update), old_updates, passes)
+    measure('префикс + кодек', lambda update: route_new(new_handler, routes, update), new_updates, passes)
+
+if __name__ == '__main__':
+    main()
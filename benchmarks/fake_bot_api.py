@@ -0,0 +1,166 @@
+"""Локальный сервер Bot API для нагрузочных стендов.
+
+Отвечает на запросы бота так же, как api.telegram.org, по HTTP/1.1 с
+keep-alive: getUpdates отдаёт обновления, поставленные виртуальными
+пользователями (с ожиданием long polling), send*/edit* возвращают
+сообщение и записываются в ленту чата, остальные методы отвечают True.
+Бот подключается к нему через BOT_API_URL (см. main.py).
+"""
+import asyncio
+import email.parser
+import itertools
+import json
+import time
+from typing import NamedTuple
+from urllib.parse import parse_qsl
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Load', 'username': 'load_bot'}
+
+# Наибольшее число обновлений в ответе getUpdates, как у Telegram
+MAX_UPDATES = 100
+
+class BotMessage(NamedTuple):
+    """Сообщение бота в чате: метод, текст и кнопки (текст, callback_data)"""
+    method: str
+    message: dict
+    text: str
+    buttons: tuple
+    received_at: float
+
+class FakeBotApi:
+    """Bot API на asyncio: обновления для бота и лента ответов по чатам"""
+
+    def __init__(self):
+        self.requests = 0
+        self.methods = {}
+        self._server = None
+        self._updates = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._has_updates = asyncio.Event()
+        self._chats = {}
+        self._connections = {}
+        self._stopping = False
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f'http://{host}:{port}'
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        self._server = await asyncio.start_server(self._serve, host, port)
+
+    async def stop(self):
+        """Отпускает ожидающие getUpdates и закрывает соединения"""
+        self._stopping = True
+        self._has_updates.set()
+        self._server.close()
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def push_update(self, update: dict) -> int:
+        """Ставит обновление в очередь getUpdates; возвращает его update_id"""
+        update['update_id'] = next(self._update_ids)
+        self._updates.append(update)
+        self._has_updates.set()
+        return update['update_id']
+
+    def chat(self, chat_id: int) -> asyncio.Queue:
+        """Лента сообщений бота в чате (BotMessage)"""
+        queue = self._chats.get(chat_id)
+        if queue is None:
+            queue = self._chats[chat_id] = asyncio.Queue()
+        return queue
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while not self._stopping:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                request_line, *header_lines = head[:-4].decode('latin-1').split('\r\n')
+                _, target, _ = request_line.split(' ', 2)
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', '0')))
+
+                method = target.rsplit('/', 1)[-1]
+                params = _parse_params(headers.get('content-type', ''), body)
+                result = await self._call(method, params)
+                payload = json.dumps({'ok': True, 'result': result}).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    + f'Content-Length: {len(payload)}\r\n\r\n'.encode()
+                    + payload
+                )
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self._connections[task]
+            writer.close()
+
+    async def _call(self, method: str, params: dict):
+        self.requests += 1
+        self.methods[method] = self.methods.get(method, 0) + 1
+
+        if method == 'getMe':
+            return BOT_USER
+        if method == 'getUpdates':
+            return await self._get_updates(params)
+        if method.startswith(('send', 'edit')) and 'chat_id' in params:
+            return self._record(method, params)
+        return True
+
+    async def _get_updates(self, params: dict) -> list:
+        offset = int(params.get('offset', 0))
+        self._updates = [update for update in self._updates if update['update_id'] >= offset]
+        if not self._updates and not self._stopping:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), float(params.get('timeout', 0)))
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:int(params.get('limit', MAX_UPDATES))]
+
+    def _record(self, method: str, params: dict) -> dict:
+        chat_id = int(params['chat_id'])
+        text = params.get('text', params.get('caption', ''))
+        message = {
+            'message_id': int(params.get('message_id', 0)) or next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER,
+            'text': text
+        }
+        buttons = ()
+        markup = json.loads(params['reply_markup']) if params.get('reply_markup') else {}
+        if 'inline_keyboard' in markup:
+            # В Message.reply_markup бывает только инлайн-клавиатура
+            message['reply_markup'] = markup
+            buttons = tuple(
+                (button['text'], button.get('callback_data'))
+                for row in markup['inline_keyboard'] for button in row
+            )
+        self.chat(chat_id).put_nowait(BotMessage(method, message, text, buttons, time.perf_counter()))
+        return message
+
+def _parse_params(content_type: str, body: bytes) -> dict:
+    """Параметры метода: form-urlencoded или multipart (при отправке файлов)"""
+    if content_type.startswith('multipart/'):
+        message = email.parser.BytesParser().parsebytes(
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + body
+        )
+        return {
+            part.get_param('name', header='content-disposition'): part.get_payload(decode=True).decode()
+            for part in message.get_payload()
+            if part.get_filename() is None
+        }
+    return dict(parse_qsl(body.decode()))
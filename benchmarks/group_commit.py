@@ -0,0 +1,81 @@
+"""Отметка блоков: транзакция на каждое нажатие против группового писателя.
+
+Запуск из корня проекта:
+    python -m benchmarks.group_commit [число инспекторов]
+
+Каждый виртуальный инспектор отмечает все блоки своей приёмки подряд,
+как при нажатиях «✅ Исправен». Выводятся отметки в секунду и число
+фиксаций (COMMIT) в секунду для обоих способов записи.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from sqlalchemy import select
+
+from models import Base, User, Railway, TrainType, BlockInTrain
+from database import engine, session_scope, async_session_scope
+from repository import create_receptions, mark_block_checked
+from train_blocks import TRAIN_BLOCKS
+from writer import GroupCommitWriter
+
+BLOCKS_PER_RECEPTION = len(TRAIN_BLOCKS[TrainType.RA3])
+
+def prepare(inspectors):
+    with session_scope() as session:
+        session.merge(User(
+            id=1, full_name='Инспектор', position='Инспектор',
+            railway=Railway.YUGO_VOSTOCHNAYA, branch='Депо', phone='+79000000000'
+        ))
+        reception_ids = create_receptions(session, [
+            {'train_number': f'{i:04d}', 'train_type': TrainType.RA3, 'user_id': 1}
+            for i in range(inspectors)
+        ])
+        return [
+            session.scalars(
+                select(BlockInTrain.id)
+                .filter(BlockInTrain.reception_id == reception_id)
+                .order_by(BlockInTrain.position)
+            ).all()
+            for reception_id in reception_ids
+        ]
+
+async def per_click(block_ids):
+    for block_id in block_ids:
+        async with async_session_scope() as session:
+            await session.run_sync(mark_block_checked, block_id, 'Исправен')
+
+async def grouped(block_ids, group_writer):
+    for block_id in block_ids:
+        await group_writer.submit(mark_block_checked, block_id, 'Исправен')
+
+async def run(inspectors, make_task):
+    blocks = prepare(inspectors)
+    started = time.perf_counter()
+    await asyncio.gather(*(make_task(block_ids) for block_ids in blocks))
+    return inspectors * BLOCKS_PER_RECEPTION / (time.perf_counter() - started)
+
+def main():
+    inspectors = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    Base.metadata.create_all(engine)
+    operations = inspectors * BLOCKS_PER_RECEPTION
+
+    rate = asyncio.run(run(inspectors, per_click))
+    print(f'транзакция на нажатие: {rate:8.1f} отметок/с, {rate:8.1f} COMMIT/с')
+
+    group_writer = GroupCommitWriter()
+    rate = asyncio.run(run(inspectors, lambda block_ids: grouped(block_ids, group_writer)))
+    group_writer.stop()
+    stats = group_writer.stats()
+    commit_rate = rate * stats['commits'] / operations
+    print(
+        f'групповая фиксация:    {rate:8.1f} отметок/с, {commit_rate:8.1f} COMMIT/с '
+        f'(в среднем {stats["batch_size"]:.1f} операций на COMMIT)'
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Замер задержки обработчиков при N одновременных пользователях.
+
+Запуск из корня проекта:
+    python -m benchmarks.handler_latency [число пользователей ...]
+
+Обработчики вызываются напрямую с поддельными Update/Context на временной
+базе данных, поэтому токен бота и сеть не нужны.
+
+Замер идёт дважды. Сначала пользователи действуют с паузами, как люди
+(в среднем THINK_TIME секунд между нажатиями, экспоненциально): здесь
+видно, остаётся ли p99 ровной с ростом числа пользователей. Затем те же
+действия без пауз (замкнутая нагрузка) — это замер пропускной
+способности: при насыщении средняя задержка ≈ пользователи / вызовов в
+секунду, и её рост с числом пользователей ожидаем.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault('DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from models import Base, User, Railway, UserRole, TrainCategory
+from database import engine, session_scope
+from main import check_user_access
+from handlers.reception import handle_train_type, show_reception_history
+
+# Средняя пауза между действиями пользователя в первом замере, сек
+THINK_TIME = float(os.getenv('THINK_TIME', '0.5'))
+
+class FakeMessage:
+    def __init__(self, text=''):
+        self.text = text
+
+    async def reply_text(self, *args, **kwargs):
+        return self
+
+def make_update(user_id: int, text: str = ''):
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=user_id, username=None),
+        message=FakeMessage(text),
+        callback_query=None
+    )
+
+def seed_users(count: int):
+    with session_scope() as session:
+        for user_id in range(1, count + 1):
+            session.merge(User(
+                id=user_id,
+                full_name=f'Инспектор {user_id}',
+                position='Инспектор',
+                railway=Railway.YUGO_VOSTOCHNAYA,
+                branch='Депо',
+                phone='+79000000000',
+                role=UserRole.USER
+            ))
+
+async def timed(latencies: list, handler, update, context):
+    started = time.perf_counter()
+    await handler(update, context)
+    latencies.append(time.perf_counter() - started)
+
+async def think(think_time: float):
+    if think_time:
+        await asyncio.sleep(random.expovariate(1 / think_time))
+
+async def simulate_user(user_id: int, latencies: list, rounds: int, think_time: float):
+    context = SimpleNamespace(user_data={})
+    # Пользователи начинают не одновременно
+    await asyncio.sleep(random.uniform(0, think_time))
+    for _ in range(rounds):
+        await timed(latencies, check_user_access, make_update(user_id), context)
+        await think(think_time)
+        context.user_data['train_number'] = f'{user_id:04d}'
+        context.user_data['train_category'] = TrainCategory.ELEKTRICHKA
+        await timed(latencies, handle_train_type, make_update(user_id, 'ЭП2Д'), context)
+        await think(think_time)
+        await timed(latencies, show_reception_history, make_update(user_id, '📋 История приёмок'), context)
+        await think(think_time)
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+async def run(concurrency: int, rounds: int = 5, think_time: float = 0.0):
+    latencies = []
+    started = time.perf_counter()
+    # Обработчики печатают отладочный вывод, который здесь не нужен
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(
+            simulate_user(i, latencies, rounds, think_time) for i in range(1, concurrency + 1)
+        ))
+    elapsed = time.perf_counter() - started
+    print(
+        f'{concurrency:>4} польз.: {len(latencies) / elapsed:8.1f} выз/с, '
+        f'p50={percentile(latencies, 0.50) * 1000:7.2f} мс, '
+        f'p99={percentile(latencies, 0.99) * 1000:7.2f} мс'
+    )
+
+def main():
+    levels = [int(arg) for arg in sys.argv[1:]] or [1, 10, 100]
+    Base.metadata.create_all(engine)
+    seed_users(max(levels))
+    print(f'С паузами между действиями (в среднем {THINK_TIME} с):')
+    for concurrency in levels:
+        asyncio.run(run(concurrency, rounds=10, think_time=THINK_TIME))
+    print('Без пауз (пропускная способность):')
+    for concurrency in levels:
+        asyncio.run(run(concurrency))
+
+if __name__ == '__main__':
+    main()
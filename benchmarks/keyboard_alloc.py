@@ -0,0 +1,128 @@
+"""Клавиатуры приёмки: сборка на каждую отправку против готовых из реестра.
+
+Запуск из корня проекта:
+    python -m benchmarks.keyboard_alloc [число проходов]
+
+Проигрывает шаги приёмки, которые отправляют статические клавиатуры
+(меню приёмки, отмена, категории, типы, возврат назад, неверный ввод),
+через настоящий ExtBot с заглушкой Bot API — вместе с сериализацией
+запроса. Во втором варианте перед каждой отправкой клавиатура собирается
+заново, как раньше делали обработчики. Выводятся время прохода, число
+созданных объектов клавиатур и пик временной памяти (tracemalloc).
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+os.environ.setdefault('DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from telegram import ReplyKeyboardMarkup, KeyboardButton
+from telegram.ext import ExtBot
+from telegram.request import BaseRequest
+
+from models import TrainCategory
+from handlers.keyboards import MARKUPS, MARKUPS_JSON
+from handlers.reception import (
+    start_reception,
+    handle_reception_choice,
+    handle_train_number,
+    handle_train_category,
+    handle_train_type
+)
+
+CHAT_ID = 1
+MARKUP_NAMES = {markup_json: name for name, markup_json in MARKUPS_JSON.items()}
+
+# Шаги приёмки без обращений к базе: (обработчик, текст сообщения)
+FLOW = [
+    (start_reception, '🚂 Приёмка состава'),
+    (handle_reception_choice, '🆕 Новая приёмка'),
+    (handle_train_number, '1234'),
+    (handle_train_category, TrainCategory.RAIL_BUS.value),
+    (handle_train_type, '↩️ Назад'),
+    (handle_train_category, TrainCategory.ELEKTRICHKA.value),
+    (handle_reception_choice, 'не кнопка'),
+]
+
+class FakeRequest(BaseRequest):
+    """Отвечает на любой метод Bot API отправленным сообщением"""
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        if request_data is not None:
+            request_data.json_payload  # Сериализация, как перед настоящей отправкой
+        result = {'message_id': 1, 'date': 0, 'chat': {'id': CHAT_ID, 'type': 'private'}, 'text': ''}
+        if url.endswith('/getMe'):
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+def rebuild(markup: ReplyKeyboardMarkup, counter: list) -> ReplyKeyboardMarkup:
+    """Собирает такую же клавиатуру заново, как обработчики до реестра"""
+    keyboard = [[KeyboardButton(button.text) for button in row] for row in markup.keyboard]
+    counter[0] += 1 + sum(len(row) for row in keyboard)
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+
+class FakeMessage:
+    def __init__(self, bot, text, counter=None):
+        self.bot = bot
+        self.text = text
+        self.counter = counter
+
+    async def reply_text(self, text, reply_markup=None, **kwargs):
+        if self.counter is not None and reply_markup in MARKUP_NAMES:
+            reply_markup = rebuild(MARKUPS[MARKUP_NAMES[reply_markup]], self.counter)
+        return await self.bot.send_message(CHAT_ID, text, reply_markup=reply_markup, **kwargs)
+
+async def run_flow(bot, context, counter):
+    for handler, text in FLOW:
+        update = SimpleNamespace(
+            effective_user=SimpleNamespace(id=CHAT_ID, username=None),
+            message=FakeMessage(bot, text, counter),
+            callback_query=None
+        )
+        await handler(update, context)
+
+async def measure(label: str, bot, passes: int, per_send: bool):
+    context = SimpleNamespace(user_data={})
+    counter = [0] if per_send else None
+
+    started = time.perf_counter()
+    for _ in range(passes):
+        await run_flow(bot, context, counter)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    await run_flow(bot, context, [0] if per_send else None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    built = counter[0] / passes if per_send else 0
+    print(
+        f'{label:<22} {elapsed / passes * 1e6:8.1f} мкс/проход, '
+        f'объектов клавиатур: {built:5.1f}, пик памяти {peak / 1024:6.1f} КиБ'
+    )
+
+async def run(passes: int):
+    bot = ExtBot('1:bench', request=FakeRequest())
+    await bot.initialize()
+    print(f'Отправок за проход: {len(FLOW)}')
+    await measure('сборка на отправку', bot, passes, per_send=True)
+    await measure('реестр (готовый JSON)', bot, passes, per_send=False)
+
+def main():
+    passes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    asyncio.run(run(passes))
+
+if __name__ == '__main__':
+    main()
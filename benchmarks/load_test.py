@@ -0,0 +1,337 @@
+"""Нагрузочный стенд: настоящий бот против локального Bot API.
+
+Запуск из корня проекта:
+    python -m benchmarks.load_test [инспекторов] [администраторов] [кругов] [result.json]
+
+Поднимает FakeBotApi, собирает приложение из main.py (build_application)
+с BOT_API_URL на него и запускает его, как run_polling(), на временных
+базах. Виртуальные инспекторы проходят полный сценарий: /start,
+«🚂 Приёмка состава», номер, категория и тип состава, каждый блок
+кнопками ✅/⚠️ (с замечанием), история, отчёт, экспорт PDF и возврат.
+Администраторы открывают панель, список пользователей и статистику.
+Каждый шаг — обновление в getUpdates; задержка шага — время до ответа
+бота, которым обработчик заканчивает работу.
+
+Результат — JSON (в файл result.json, если он указан, иначе в stdout
+после сводки): пропускная способность и p50/p95/p99 задержки по
+обработчикам с коммитом прогона, чтобы сравнивать прогоны между
+коммитами.
+"""
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+# Бот работает только с временными базами и локальным Bot API
+_workdir = tempfile.mkdtemp()
+os.environ['DB_PATH'] = os.path.join(_workdir, 'bot.db')
+os.environ['ARCHIVE_DB_PATH'] = os.path.join(_workdir, 'archive.db')
+os.environ['PERSISTENCE_DB_PATH'] = os.path.join(_workdir, 'persistence.db')
+os.environ['BOT_TOKEN'] = '1:load-test'
+
+# Виртуальные пользователи нажимают кнопки намного чаще людей, и лимиты
+# Telegram в планировщике отправки (около сообщения в секунду в чат, ~30
+# в секунду на бота) измеряли бы только себя. По умолчанию они сняты;
+# чтобы прогнать стенд с ними, задайте OUTBOUND_* явно
+os.environ.setdefault('OUTBOUND_GLOBAL_RATE', '100000')
+os.environ.setdefault('OUTBOUND_CHAT_RATE', '100000')
+os.environ.setdefault('OUTBOUND_CHAT_BURST', '100000')
+
+import main as bot
+from benchmarks.fake_bot_api import FakeBotApi
+from models import User, UserRole, Railway, TrainCategory, TrainType
+from database import session_scope
+from init_db import init_db
+from callbacks import CallbackAction, unpack_callback
+
+THINK_TIME = 0.05  # секунд между шагами пользователя (в среднем)
+FAIL_RATE = 0.1  # доля блоков, отмечаемых неисправными
+STEP_TIMEOUT = 30  # секунд на ответ бота
+POLL_TIMEOUT = 10  # секунд long polling getUpdates
+
+ADMIN_ID_OFFSET = 100000
+
+TRAIN_TYPES = {
+    TrainCategory.ELEKTRICHKA: (TrainType.EP2D, TrainType.EP3D),
+    TrainCategory.RAIL_BUS: (TrainType.RA1, TrainType.RA2, TrainType.RA3),
+}
+
+class StepFailed(Exception):
+    """Бот не ответил на шаг сценария как ожидалось"""
+
+class LoadStats:
+    """Задержки и ошибки шагов по обработчикам"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, handler: str, latency: float):
+        self.latencies.setdefault(handler, []).append(latency)
+
+    def error(self, handler: str):
+        self.errors[handler] = self.errors.get(handler, 0) + 1
+
+    def report(self) -> dict:
+        """Задержки по обработчикам; шаги, которые ни разу не удались, — только с ошибками"""
+        report = {}
+        for handler in sorted(self.latencies.keys() | self.errors.keys()):
+            latencies = self.latencies.get(handler, [])
+            report[handler] = {'count': len(latencies), 'errors': self.errors.get(handler, 0)}
+            if latencies:
+                report[handler].update({
+                    'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                    'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                    'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                    'max_ms': round(max(latencies) * 1000, 2)
+                })
+        return report
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+def has_text(fragment: str):
+    return lambda reply: fragment in reply.text
+
+def sent_document(reply) -> bool:
+    return reply.method == 'sendDocument'
+
+def has_button(action: CallbackAction):
+    return lambda reply: find_button(reply, action) is not None
+
+def find_button(reply, action: CallbackAction):
+    for _, data in reply.buttons:
+        callback = unpack_callback(data) if data else None
+        if callback is not None and callback.action == action:
+            return data
+    return None
+
+class VirtualUser:
+    """Пользователь Telegram: шлёт сообщения и нажимает кнопки, дожидаясь ответа"""
+
+    _query_ids = itertools.count(1)
+
+    def __init__(self, api: FakeBotApi, user_id: int, stats: LoadStats, rng: random.Random):
+        self.api = api
+        self.user_id = user_id
+        self.stats = stats
+        self.rng = rng
+        self.steps = 0
+        self._feed = api.chat(user_id)
+        self._user = {'id': user_id, 'is_bot': False, 'first_name': f'Пользователь {user_id}'}
+        self._message_ids = itertools.count(1)
+
+    async def say(self, handler: str, text: str, expect):
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': self.user_id, 'type': 'private'},
+            'from': self._user,
+            'text': text
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+        return await self._step(handler, {'message': message}, expect)
+
+    async def press(self, handler: str, reply, action: CallbackAction, expect):
+        data = find_button(reply, action)
+        if data is None:
+            self.stats.error(handler)
+            raise StepFailed(f'{handler}: нет кнопки {action.name}')
+        return await self._step(handler, {'callback_query': {
+            'id': str(next(self._query_ids)),
+            'from': self._user,
+            'chat_instance': str(self.user_id),
+            'message': reply.message,
+            'data': data
+        }}, expect)
+
+    async def _step(self, handler: str, update: dict, expect):
+        await asyncio.sleep(self.rng.uniform(0, 2 * THINK_TIME))
+        # Ответы предыдущих шагов уже разобраны
+        while not self._feed.empty():
+            self._feed.get_nowait()
+
+        started = time.perf_counter()
+        self.api.push_update(update)
+        self.steps += 1
+        while True:
+            try:
+                reply = await asyncio.wait_for(self._feed.get(), started + STEP_TIMEOUT - time.perf_counter())
+            except (asyncio.TimeoutError, ValueError):
+                self.stats.error(handler)
+                raise StepFailed(f'{handler}: нет ответа за {STEP_TIMEOUT} с')
+            if reply.text.startswith('❌'):
+                # Бот ответил сообщением об ошибке — шаг не выполнен
+                self.stats.error(handler)
+                raise StepFailed(f'{handler}: {reply.text.splitlines()[0]}')
+            if expect(reply):
+                self.stats.record(handler, reply.received_at - started)
+                return reply
+
+async def inspector_round(user: VirtualUser, number: int):
+    """Приёмка состава поблочно, история, отчёт и PDF"""
+    rng = user.rng
+    await user.say('start', '/start', has_text('Добро пожаловать'))
+    await user.say('start_reception', '🚂 Приёмка состава', has_text('Приёмка состава'))
+    await user.say('handle_reception_choice', '🆕 Новая приёмка', has_text('номер состава'))
+    await user.say('handle_train_number', f'{user.user_id}-{number}', has_text('категорию состава'))
+    category = rng.choice(list(TRAIN_TYPES))
+    await user.say('handle_train_category', category.value, has_text('тип состава'))
+
+    block_or_done = lambda reply: has_button(CallbackAction.BLOCK_OK)(reply) or 'завершена' in reply.text
+    reply = await user.say('handle_train_type', rng.choice(TRAIN_TYPES[category]).value, block_or_done)
+    while 'завершена' not in reply.text:
+        if rng.random() < FAIL_RATE:
+            await user.press('handle_block_fail', reply, CallbackAction.BLOCK_FAIL, has_text('Опишите'))
+            reply = await user.say('handle_block_notes', 'Трещина корпуса', block_or_done)
+        else:
+            reply = await user.press('handle_block_ok', reply, CallbackAction.BLOCK_OK, block_or_done)
+
+    history = await user.say('show_reception_history', '📋 История приёмок', has_button(CallbackAction.HISTORY_VIEW))
+    report = await user.press('show_reception_report', history, CallbackAction.HISTORY_VIEW,
+                              has_button(CallbackAction.EXPORT_PDF))
+    await user.press('handle_export_pdf', report, CallbackAction.EXPORT_PDF, sent_document)
+    await user.press('history_back', history, CallbackAction.HISTORY_BACK, has_text('Добро пожаловать'))
+
+async def admin_round(user: VirtualUser, number: int):
+    """Панель администратора: список пользователей и статистика"""
+    await user.say('start', '/start', has_text('Добро пожаловать'))
+    await user.say('admin_menu', '⚙️ Панель администратора', has_text('Панель администратора'))
+    await user.say('view_users', '👥 Управление пользователями', has_button(CallbackAction.USER_SELECT))
+    await user.say('show_statistics', '📊 Статистика', has_text('Статистика системы'))
+    await user.say('show_main_menu', '🔙 Вернуться в главное меню', has_text('Добро пожаловать'))
+
+async def run_user(scenario, user: VirtualUser, rounds: int, completed: list):
+    try:
+        for number in range(rounds):
+            await scenario(user, number)
+            completed.append(scenario.__name__)
+    except StepFailed as e:
+        print(f'⚠️ Пользователь {user.user_id}: {e}', file=sys.stderr)
+
+def seed_users(inspectors: int, admins: int):
+    init_db()
+    with session_scope() as session:
+        for user_id, role in itertools.chain(
+            ((user_id, UserRole.USER) for user_id in range(1, inspectors + 1)),
+            ((ADMIN_ID_OFFSET + user_id, UserRole.ADMIN) for user_id in range(1, admins + 1))
+        ):
+            session.merge(User(
+                id=user_id, full_name=f'Сотрудник {user_id}', position='Инспектор',
+                railway=Railway.YUGO_VOSTOCHNAYA, branch='Депо', phone='+79000000000', role=role
+            ))
+
+async def start_application(application):
+    """Запуск как в run_polling(), но в уже работающем цикле событий"""
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.updater.start_polling(poll_interval=0, timeout=POLL_TIMEOUT)
+    await application.start()
+
+async def stop_application(application):
+    await application.updater.stop()
+    await application.stop()
+    if application.post_stop:
+        await application.post_stop(application)
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+async def load_test(inspectors: int, admins: int, rounds: int, seed: int = 23) -> dict:
+    api = FakeBotApi()
+    await api.start()
+    bot.BOT_API_URL = api.url
+    application = bot.build_application()
+    await start_application(application)
+
+    stats = LoadStats()
+    completed = []
+    rng = random.Random(seed)
+    users = [
+        (inspector_round, VirtualUser(api, user_id, stats, random.Random(rng.random())))
+        for user_id in range(1, inspectors + 1)
+    ] + [
+        (admin_round, VirtualUser(api, ADMIN_ID_OFFSET + user_id, stats, random.Random(rng.random())))
+        for user_id in range(1, admins + 1)
+    ]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_user(scenario, user, rounds, completed) for scenario, user in users))
+    elapsed = time.perf_counter() - started
+
+    await stop_application(application)
+    await api.stop()
+
+    steps = sum(user.steps for _, user in users)
+    handlers = stats.report()
+    return {
+        'commit': git_commit(),
+        'inspectors': inspectors,
+        'admins': admins,
+        'rounds': rounds,
+        'think_time_s': THINK_TIME,
+        'elapsed_s': round(elapsed, 3),
+        'updates': steps,
+        'updates_per_s': round(steps / elapsed, 1),
+        'receptions': completed.count(inspector_round.__name__),
+        'receptions_per_min': round(completed.count(inspector_round.__name__) / elapsed * 60, 1),
+        'errors': sum(handler['errors'] for handler in handlers.values()),
+        'bot_api_requests': api.methods,
+        'handlers': handlers
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    inspectors = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    admins = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    output = sys.argv[4] if len(sys.argv) > 4 else None
+
+    # Обработчики печатают отладочный вывод, который здесь не нужен
+    with contextlib.redirect_stdout(io.StringIO()):
+        seed_users(inspectors, admins)
+        logging.disable(logging.WARNING)
+        result = asyncio.run(load_test(inspectors, admins, rounds))
+
+    print(
+        f'{result["updates"]} обновлений за {result["elapsed_s"]} с ({result["updates_per_s"]}/с), '
+        f'приёмок {result["receptions"]}, ошибок {result["errors"]}'
+    )
+    for name, handler in result['handlers'].items():
+        errors = f'  ошибок {handler["errors"]}' if handler['errors'] else ''
+        if not handler['count']:
+            print(f'  {name:<24} {handler["count"]:6d}{errors}')
+            continue
+        print(
+            f'  {name:<24} {handler["count"]:6d}  p50 {handler["p50_ms"]:8.2f}  '
+            f'p95 {handler["p95_ms"]:8.2f}  p99 {handler["p99_ms"]:8.2f} мс{errors}'
+        )
+
+    report = json.dumps(result, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f'Результат записан в {output}')
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
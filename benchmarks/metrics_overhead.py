@@ -0,0 +1,107 @@
+"""Цена метрик: обёртка обработчика, выгрузка и эндпоинт /metrics.
+
+Запуск из корня проекта:
+    python -m benchmarks.metrics_overhead [вызовов]
+
+Сравнивается вызов пустого обработчика напрямую и через обёртку
+instrument_application() (на пустом обработчике видна вся добавка), а
+также время построения выгрузки для всех обработчиков бота из main.py.
+Затем MetricsExporter поднимается на свободном порту и в файл, и
+проверяется, что GET /metrics и файл отдают те же ряды.
+"""
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+
+# Обработчики бота собираются с временными базами
+_workdir = tempfile.mkdtemp()
+os.environ['DB_PATH'] = os.path.join(_workdir, 'bot.db')
+os.environ['ARCHIVE_DB_PATH'] = os.path.join(_workdir, 'archive.db')
+os.environ['PERSISTENCE_DB_PATH'] = os.path.join(_workdir, 'persistence.db')
+os.environ['BOT_TOKEN'] = '1:bench'
+
+from telegram.ext import ApplicationBuilder, TypeHandler
+
+from metrics import MetricsExporter, instrument_application, registry
+
+RENDERS = 200
+
+async def noop(update, context):
+    return None
+
+async def call_cost(calls: int) -> tuple:
+    """Время вызова пустого обработчика без обёртки и с ней, мкс"""
+    application = ApplicationBuilder().token('1:bench').updater(None).build()
+    handler = TypeHandler(object, noop)
+    application.add_handler(handler)
+    instrument_application(application)
+
+    results = []
+    for callback in (noop, handler.callback):
+        started = time.perf_counter()
+        for _ in range(calls):
+            await callback(None, None)
+        results.append((time.perf_counter() - started) / calls * 1e6)
+    return tuple(results)
+
+def render_cost() -> tuple:
+    """Время построения выгрузки со всеми обработчиками бота, мс, и её размер"""
+    import main as bot
+    bot.build_application()
+    started = time.perf_counter()
+    for _ in range(RENDERS):
+        text = registry.render()
+    return (time.perf_counter() - started) / RENDERS * 1000, text
+
+async def fetch(port: int, path: str) -> tuple:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return head.split(b' ', 2)[1].decode(), body.decode()
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+async def export() -> list:
+    """Эндпоинт и файл: статус ответа и совпадение с render()"""
+    path = os.path.join(_workdir, 'bot.prom')
+    exporter = MetricsExporter(registry, port=free_port(), path=path, interval=3600)
+    await exporter.start()
+    status, body = await fetch(exporter.port, '/metrics')
+    missing, _ = await fetch(exporter.port, '/other')
+    await exporter.stop()
+    with open(path, encoding='utf-8') as f:
+        written = f.read()
+    expected = registry.render()
+    return [
+        (status == '200' and body == expected, f'GET /metrics: {status}, {len(body)} байт'),
+        (missing == '404', f'другой путь: {missing}'),
+        (written == expected, f'файл {path}: {len(written)} байт'),
+    ]
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    raw, instrumented = asyncio.run(call_cost(calls))
+    print(f'вызов обработчика: напрямую {raw:.2f} мкс, с метриками {instrumented:.2f} мкс '
+          f'(+{instrumented - raw:.2f} мкс)')
+
+    render_ms, text = render_cost()
+    series = sum(1 for line in text.splitlines() if not line.startswith('#'))
+    print(f'выгрузка: {series} рядов, {len(text)} байт, {render_ms:.2f} мс')
+
+    failed = False
+    for ok, message in asyncio.run(export()):
+        print(f"{'✅' if ok else '❌'} {message}")
+        failed = failed or not ok
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Всплеск уведомлений на фоне ответов пользователям: без планировщика и с ним.
+
+Запуск из корня проекта:
+    python -m benchmarks.outbound_burst [уведомлений] [пользователей] [секунд]
+
+Заглушка Bot API ведёт себя как Telegram: не больше 30 сообщений в
+секунду на бота и около одного в секунду в чат (всплеск до 3), сверх
+этого — 429 с retry_after = 1. Одновременно с рассылкой уведомлений
+администраторам каждый пользователь раз в секунду получает ответ.
+Без планировщика отправки, получившие 429, теряются (их обработчик падает
+с RetryAfter); с планировщиком они ждут маркеров, и ответы пользователям
+идут впереди уведомлений. Выводятся задержки ответов, потери, число 429
+и время доставки всех уведомлений.
+
+Второй замер — частые нажатия в чек-листе: пользователь TAPS раз подряд
+правит одно сообщение (editMessageText). Заглушка считает правки в лимит
+чата наравне с сообщениями. Выводятся число правок, дошедших до Bot API,
+429, и когда пользователь увидел последнее состояние чек-листа.
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+from telegram.request import BaseRequest
+
+from outbound import OutboundScheduler, TokenBucket, NOTIFICATION, priority_args
+
+API_LATENCY = 0.02  # секунд на запрос к Bot API
+ADMIN_CHATS = 50
+USER_CHAT_OFFSET = 1000
+TAPS = 10
+TAP_INTERVAL = 0.2  # секунд между нажатиями
+
+class FakeTelegram(BaseRequest):
+    """Bot API с ограничениями Telegram на частоту сообщений"""
+
+    def __init__(self):
+        self.too_many = 0
+        self.edits = 0
+        # (чат, сообщение) -> (текст последней правки, когда она пришла)
+        self.texts = {}
+        self._global = TokenBucket(30, 30, time.monotonic())
+        self._chats = {}
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        await asyncio.sleep(API_LATENCY)
+        if url.endswith('/getMe'):
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+            return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+        chat_id = request_data.parameters['chat_id']
+        now = time.monotonic()
+        chat = self._chats.setdefault(chat_id, TokenBucket(1, 3, now))
+        if self._global.delay(now) or chat.delay(now):
+            self.too_many += 1
+            return 429, json.dumps({
+                'ok': False,
+                'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1}
+            }).encode()
+        self._global.take()
+        chat.take()
+        if url.endswith('/editMessageText'):
+            self.edits += 1
+            self.texts[chat_id, request_data.parameters['message_id']] = (request_data.parameters['text'], now)
+        result = {'message_id': 1, 'date': 0, 'chat': {'id': chat_id, 'type': 'private'}, 'text': ''}
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+async def send(bot, chat_id: int, latencies: list, lost: list, **kwargs):
+    started = time.monotonic()
+    try:
+        await bot.send_message(chat_id, 'Сообщение', **kwargs)
+    except RetryAfter:
+        lost.append(chat_id)
+        return
+    latencies.append(time.monotonic() - started)
+
+async def user_replies(bot, chat_id: int, seconds: int, latencies: list, lost: list):
+    """Ответ пользователю раз в секунду, как на его нажатия"""
+    tasks = []
+    for _ in range(seconds):
+        tasks.append(asyncio.create_task(send(bot, chat_id, latencies, lost)))
+        await asyncio.sleep(1)
+    await asyncio.gather(*tasks)
+
+async def measure(label: str, scheduler, notifications: int, users: int, seconds: int):
+    request = FakeTelegram()
+    bot = ExtBot('1:bench', request=request, rate_limiter=scheduler)
+    await bot.initialize()
+
+    replies, replies_lost = [], []
+    delivered, notifications_lost = [], []
+    started = time.monotonic()
+
+    async def broadcast():
+        await asyncio.gather(*(
+            send(bot, index % ADMIN_CHATS + 1, delivered, notifications_lost,
+                 **priority_args(bot, NOTIFICATION))
+            for index in range(notifications)
+        ))
+        return time.monotonic() - started
+
+    broadcast_time, *_ = await asyncio.gather(
+        broadcast(),
+        *(user_replies(bot, USER_CHAT_OFFSET + user, seconds, replies, replies_lost) for user in range(users))
+    )
+    await bot.shutdown()
+
+    quantiles = statistics.quantiles(replies, n=20) if len(replies) > 1 else [0.0] * 19
+    print(
+        f'{label:<16} ответы: p50 {statistics.median(replies) * 1000:6.0f} мс, '
+        f'p95 {quantiles[18] * 1000:6.0f} мс, потеряно {len(replies_lost):3d}/{users * seconds}; '
+        f'уведомления: потеряно {len(notifications_lost):3d}/{notifications}, '
+        f'все за {broadcast_time:4.1f} с; 429: {request.too_many}'
+    )
+
+async def measure_edits(label: str, scheduler):
+    """TAPS правок одного сообщения с интервалом TAP_INTERVAL"""
+    request = FakeTelegram()
+    bot = ExtBot('1:bench', request=request, rate_limiter=scheduler)
+    await bot.initialize()
+    chat_id = USER_CHAT_OFFSET
+    lost = []
+    started = time.monotonic()
+
+    async def tap(index: int):
+        await asyncio.sleep(index * TAP_INTERVAL)
+        try:
+            await bot.edit_message_text(f'Состояние {index}', chat_id=chat_id, message_id=1)
+        except RetryAfter:
+            lost.append(index)
+
+    await asyncio.gather(*(tap(index) for index in range(TAPS)))
+    await bot.shutdown()
+
+    text, shown_at = request.texts.get((chat_id, 1), ('', started))
+    final = 'последнее' if text == f'Состояние {TAPS - 1}' else f'устаревшее («{text}»)'
+    print(
+        f'{label:<16} правок в API: {request.edits:2d}/{TAPS}, потеряно {len(lost):2d}, 429: {request.too_many}; '
+        f'на экране {final} состояние через {shown_at - started:4.1f} с '
+        f'(последнее нажатие — {(TAPS - 1) * TAP_INTERVAL:.1f} с)'
+    )
+
+def main():
+    notifications = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    seconds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    print(f'Уведомлений: {notifications} ({ADMIN_CHATS} админов), пользователей: {users} '
+          f'(ответ раз в секунду, {seconds} с)')
+    asyncio.run(measure('без планировщика', None, notifications, users, seconds))
+    asyncio.run(measure('с планировщиком', OutboundScheduler(), notifications, users, seconds))
+    print(f'Нажатия в чек-листе: {TAPS} правок одного сообщения раз в {TAP_INTERVAL} с')
+    asyncio.run(measure_edits('без планировщика', None))
+    asyncio.run(measure_edits('с планировщиком', OutboundScheduler()))
+
+if __name__ == '__main__':
+    main()
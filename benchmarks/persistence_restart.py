@@ -0,0 +1,126 @@
+"""Время перезапуска бота с сохранёнными диалогами и стоимость сброса.
+
+Запуск из корня проекта:
+    python -m benchmarks.persistence_restart [число диалогов]
+
+Заполняет хранилище диалогами четырёх постоянных ConversationHandler и
+user_data, затем замеряет Application.initialize() — время от запуска до
+готовности принимать обновления. Для сравнения то же делается с
+PicklePersistence. Последним замером 1% пользователей меняет данные и
+сравнивается стоимость очередного сброса. Bot API подменяется заглушкой,
+поэтому токен и сеть не нужны.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp()
+os.environ.setdefault('DB_PATH', os.path.join(BENCH_DIR, 'bench.db'))
+
+from telegram.ext import ApplicationBuilder, PicklePersistence
+from telegram.request import BaseRequest
+
+from models import TrainCategory
+from persistence import SQLitePersistence
+from handlers.registration import registration_handler
+from handlers.admin import admin_handler
+from handlers.profile import edit_profile_handler
+from handlers.reception import reception_handler, CHECK_BLOCKS
+
+HANDLERS = [registration_handler, admin_handler, edit_profile_handler, reception_handler]
+
+class FakeRequest(BaseRequest):
+    """Отвечает на getMe, остальные методы при инициализации не вызываются"""
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+def build_application(persistence):
+    application = (
+        ApplicationBuilder()
+        .token('1:bench')
+        .request(FakeRequest())
+        .updater(None)
+        .persistence(persistence)
+        .build()
+    )
+    for handler in HANDLERS:
+        application.add_handler(handler)
+    return application
+
+def user_data(user_id: int) -> dict:
+    return {
+        'train_number': f'{user_id:04d}',
+        'train_category': TrainCategory.ELEKTRICHKA,
+        'reception_id': user_id,
+        'current_block_index': 0
+    }
+
+async def seed(make_persistence, conversations: int):
+    # Хранилище заполняется после обычного запуска Application, как в работающем боте
+    application = build_application(make_persistence())
+    await application.initialize()
+    persistence = application.persistence
+    await asyncio.gather(*(
+        persistence.update_conversation(HANDLERS[user_id % len(HANDLERS)].name, (user_id, user_id), CHECK_BLOCKS)
+        for user_id in range(1, conversations + 1)
+    ), *(
+        persistence.update_user_data(user_id, user_data(user_id))
+        for user_id in range(1, conversations + 1)
+    ))
+    await persistence.flush()
+
+async def restart(make_persistence, conversations: int):
+    application = build_application(make_persistence())
+    started = time.perf_counter()
+    await application.initialize()
+    elapsed = time.perf_counter() - started
+
+    loaded = sum(len(handler._conversations) for handler in HANDLERS)
+    assert loaded == conversations, (loaded, conversations)
+    assert len(application.user_data) == conversations
+    return application, elapsed
+
+async def flush_changes(application, conversations: int):
+    """Меняет данные 1% пользователей и сбрасывает их так, как это делает Application"""
+    for user_id in range(1, conversations + 1, 100):
+        application.user_data[user_id]['current_block_index'] += 1
+        application._user_ids_to_be_updated_in_persistence.add(user_id)
+    started = time.perf_counter()
+    await application.update_persistence()
+    await application.persistence.flush()
+    return time.perf_counter() - started
+
+async def measure(label: str, make_persistence, conversations: int):
+    await seed(make_persistence, conversations)
+    application, elapsed = await restart(make_persistence, conversations)
+    flush = await flush_changes(application, conversations)
+    print(f'{label:<18} запуск {elapsed * 1000:8.1f} мс, сброс 1% изменений {flush * 1000:8.1f} мс')
+    return application
+
+async def run(conversations: int):
+    sqlite_path = os.path.join(BENCH_DIR, 'persistence.db')
+    pickle_path = os.path.join(BENCH_DIR, 'persistence.pickle')
+    print(f'Диалогов: {conversations}')
+    application = await measure('SQLitePersistence', lambda: SQLitePersistence(sqlite_path), conversations)
+    print(f'  строк записано за сброс: {application.persistence.rows_written}')
+    # on_flush=True — самый выгодный для него режим: файл пишется целиком один раз за сброс
+    await measure('PicklePersistence', lambda: PicklePersistence(pickle_path, on_flush=True), conversations)
+
+def main():
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    asyncio.run(run(conversations))
+
+if __name__ == '__main__':
+    main()
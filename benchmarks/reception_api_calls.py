@@ -0,0 +1,169 @@
+"""Вызовы Bot API и запросы к базе на одну приёмку: по блоку против чек-листа.
+
+Запуск из корня проекта:
+    python -m benchmarks.reception_api_calls [число неисправных блоков]
+
+Проходит приёмку РА3 (9 блоков) обоими способами с поддельными
+Update/Context и считает вызовы Bot API (sendMessage, editMessageText,
+answerCallbackQuery, ...) и SQL-запросы. В режиме чек-листа неисправные
+блоки отмечаются кнопкой ⚠️ с замечанием, остальные — одной кнопкой
+«Остальные исправны». В итог входят и общие для обоих режимов шаги до
+создания приёмки (номер, категория и тип состава); они выводятся отдельно.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from collections import Counter
+from types import SimpleNamespace
+
+os.environ.setdefault('DB_PATH', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from sqlalchemy import event, select
+
+from models import Base, User, Railway, TrainType, TrainCategory, BlockInTrain
+from database import engine, async_engine, read_engine, async_read_engine, session_scope
+from writer import writer
+from handlers.reception import (
+    handle_reception_choice,
+    handle_train_number,
+    handle_train_category,
+    handle_train_type,
+    handle_block_notes,
+    handle_checklist_notes
+)
+from callbacks import CallbackAction, callback_router, pack_callback, unpack_callback
+
+USER_ID = 1
+
+class FakeApi:
+    """Считает вызовы методов Bot API"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.setup_calls = 0
+        self.message_ids = 0
+
+    def call(self, method: str):
+        self.calls[method] += 1
+
+    def new_message(self, text=''):
+        self.message_ids += 1
+        return FakeMessage(self, text, self.message_ids)
+
+class FakeMessage:
+    def __init__(self, api, text='', message_id=0):
+        self.api = api
+        self.text = text
+        self.message_id = message_id
+
+    async def reply_text(self, *args, **kwargs):
+        self.api.call('sendMessage')
+        return self.api.new_message()
+
+class FakeQuery:
+    def __init__(self, api, data):
+        self.api = api
+        self.data = data
+        self.message = api.new_message()
+
+    async def answer(self, *args, **kwargs):
+        self.api.call('answerCallbackQuery')
+
+    async def edit_message_text(self, *args, **kwargs):
+        self.api.call('editMessageText')
+
+    async def edit_message_reply_markup(self, *args, **kwargs):
+        self.api.call('editMessageReplyMarkup')
+
+class FakeBot:
+    def __init__(self, api):
+        self.api = api
+
+    async def edit_message_text(self, *args, **kwargs):
+        self.api.call('editMessageText')
+
+def make_update(api, text=None, data=None):
+    return SimpleNamespace(
+        effective_user=SimpleNamespace(id=USER_ID, username=None),
+        effective_chat=SimpleNamespace(id=USER_ID),
+        message=FakeMessage(api, text) if text is not None else None,
+        callback_query=FakeQuery(api, data) if data is not None else None
+    )
+
+def block_ids(reception_id: int) -> list:
+    with session_scope() as session:
+        return session.scalars(
+            select(BlockInTrain.id)
+            .filter(BlockInTrain.reception_id == reception_id)
+            .order_by(BlockInTrain.position)
+        ).all()
+
+async def press(api, context, action: CallbackAction, object_id: int):
+    """Нажатие инлайн-кнопки через маршрутизатор, как его вызывает PTB"""
+    data = pack_callback(action, object_id)
+    context.matches = [unpack_callback(data)]
+    return await callback_router.dispatch(make_update(api, data=data), context)
+
+async def start(api, context, mode: str):
+    await handle_reception_choice(make_update(api, mode), context)
+    await handle_train_number(make_update(api, '1234'), context)
+    await handle_train_category(make_update(api, TrainCategory.RAIL_BUS.value), context)
+    api.setup_calls = sum(api.calls.values())
+    await handle_train_type(make_update(api, TrainType.RA3.value), context)
+
+async def by_block(api, context, faults: int):
+    await start(api, context, '🆕 Новая приёмка')
+    for index, block_id in enumerate(block_ids(context.user_data['reception_id'])):
+        if index < faults:
+            await press(api, context, CallbackAction.BLOCK_FAIL, block_id)
+            await handle_block_notes(make_update(api, 'Трещина'), context)
+        else:
+            await press(api, context, CallbackAction.BLOCK_OK, block_id)
+
+async def by_checklist(api, context, faults: int):
+    await start(api, context, '☑️ Приёмка списком')
+    reception_id = context.user_data['reception_id']
+    for block_id in block_ids(reception_id)[:faults]:
+        await press(api, context, CallbackAction.CHECKLIST_FAIL, block_id)
+        await handle_checklist_notes(make_update(api, 'Трещина'), context)
+    await press(api, context, CallbackAction.CHECKLIST_REST, reception_id)
+    await press(api, context, CallbackAction.CHECKLIST_DONE, reception_id)
+
+async def measure(label: str, flow, faults: int, statements: Counter):
+    api = FakeApi()
+    context = SimpleNamespace(user_data={}, bot=FakeBot(api))
+    statements.clear()
+    # Обработчики печатают отладочный вывод, который здесь не нужен
+    with contextlib.redirect_stdout(io.StringIO()):
+        await flow(api, context, faults)
+    calls = ', '.join(f'{method} {count}' for method, count in sorted(api.calls.items()))
+    print(
+        f'{label:<10} вызовов API: {sum(api.calls.values()):3d} ({calls}), из них до выбора типа '
+        f'{api.setup_calls}; SQL-запросов: {statements["sql"]}'
+    )
+
+def main():
+    faults = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    Base.metadata.create_all(engine)
+    with session_scope() as session:
+        session.merge(User(
+            id=USER_ID, full_name='Инспектор', position='Инспектор',
+            railway=Railway.YUGO_VOSTOCHNAYA, branch='Депо', phone='+79000000000'
+        ))
+
+    statements = Counter()
+    def count(*args):
+        statements['sql'] += 1
+    for db_engine in (engine, async_engine.sync_engine, read_engine, async_read_engine.sync_engine):
+        event.listen(db_engine, 'before_cursor_execute', count)
+
+    print(f'Приёмка РА3, неисправных блоков: {faults}')
+    asyncio.run(measure('по блоку', by_block, faults, statements))
+    asyncio.run(measure('чек-лист', by_checklist, faults, statements))
+    writer.stop()
+
+if __name__ == '__main__':
+    main()
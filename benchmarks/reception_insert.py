@@ -0,0 +1,95 @@
+"""Стоимость создания одной приёмки: поштучный ORM-путь и пакетный create_receptions().
+
+Запуск из корня проекта:
+    python -m benchmarks.reception_insert [размер таблицы ...]
+
+Таблица заполняется до заданного числа приёмок (по умолчанию 1 000 и
+100 000), после чего замеряется создание приёмок по одной в транзакции,
+как это делает handle_train_type. Оба пути делают одну и ту же работу:
+сверка версии каталога, приёмка, её блоки и счётчики статистики. Из
+ROUNDS замеров берётся лучший, чтобы не мерить шум fsync.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, BlockInTrain, TrainReception, TrainType, User, Railway
+from database import create_db_engine
+from repository import create_receptions, create_reception
+from checklists import checklist_catalog
+from stats import increment_counters, receptions_day_counter, RECEPTIONS_TOTAL, RECEPTIONS_OPEN
+
+SAMPLE = 200
+ROUNDS = 5
+FILL_BATCH = 5000
+
+def create_reception_orm(session, train_number, train_type, user_id):
+    """Прежний путь: flush приёмки ради id и session.add на каждый блок.
+
+    Работа та же, что у create_receptions(): версия каталога, блоки из
+    неё и счётчики статистики в той же транзакции.
+    """
+    checklist_catalog.refresh(session)
+    version = checklist_catalog.current_version
+    names = checklist_catalog.blocks(train_type, version)
+    reception = TrainReception(
+        train_number=train_number, train_type=train_type, user_id=user_id,
+        checklist_version=version, blocks_total=len(names), is_completed=not names
+    )
+    session.add(reception)
+    session.flush()
+    for position, block_number in enumerate(names):
+        session.add(BlockInTrain(reception_id=reception.id, block_number=block_number, position=position))
+    session.flush()
+    increment_counters(session, {
+        RECEPTIONS_TOTAL: 1,
+        RECEPTIONS_OPEN: 1 if names else 0,
+        receptions_day_counter(reception.created_at.date()): 1
+    })
+    return reception.id
+
+def fill(make_session, size):
+    for start in range(0, size, FILL_BATCH):
+        with make_session() as session:
+            create_receptions(session, [
+                {'train_number': f'{i:06d}', 'train_type': TrainType.EP3D, 'user_id': 1}
+                for i in range(start, min(size, start + FILL_BATCH))
+            ])
+            session.commit()
+
+def measure(make_session, create):
+    best = None
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for i in range(SAMPLE):
+            with make_session() as session:
+                create(session, f'{i:06d}', TrainType.EP3D, 1)
+                session.commit()
+        elapsed = (time.perf_counter() - started) / SAMPLE * 1_000_000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 100_000]
+    for size in sizes:
+        results = []
+        for create in (create_reception_orm, create_reception):
+            db_engine = create_db_engine(os.path.join(tempfile.mkdtemp(), 'bench.db'))
+            Base.metadata.create_all(db_engine)
+            make_session = sessionmaker(bind=db_engine)
+            with make_session() as session:
+                session.add(User(
+                    id=1, full_name='Инспектор', position='Инспектор',
+                    railway=Railway.YUGO_VOSTOCHNAYA, branch='Депо', phone='+79000000000'
+                ))
+                session.commit()
+            fill(make_session, size)
+            results.append(measure(make_session, create))
+            db_engine.dispose()
+        print(f'{size:>8} приёмок: ORM {results[0]:8.1f} мкс, пакетно {results[1]:8.1f} мкс на приёмку')
+
+if __name__ == '__main__':
+    main()
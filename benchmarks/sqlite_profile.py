@@ -0,0 +1,111 @@
+"""Сравнение пропускной способности SQLite: настройки по умолчанию и профиль из database.py.
+
+Запуск из корня проекта:
+    python -m benchmarks.sqlite_profile [число операций]
+
+Для каждого профиля создаётся отдельный временный файл базы. Замеряются
+запись (одна вставка на транзакцию, как в обработчиках), чтение по
+первичному ключу и смешанная нагрузка: один писатель и несколько
+читателей в потоках, с подсчётом ошибок "database is locked".
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, BlockInTrain, TrainReception, TrainType, User, Railway
+from database import create_db_engine
+
+def make_default_engine(path):
+    return create_engine(f'sqlite:///{path}')
+
+def prepare(db_engine):
+    Base.metadata.create_all(db_engine)
+    with sessionmaker(bind=db_engine)() as session:
+        session.add(User(
+            id=1, full_name='Инспектор', position='Инспектор',
+            railway=Railway.YUGO_VOSTOCHNAYA, branch='Депо', phone='+79000000000'
+        ))
+        session.add(TrainReception(id=1, train_number='0001', train_type=TrainType.EP2D, user_id=1))
+        session.commit()
+
+def bench_writes(db_engine, count):
+    make_session = sessionmaker(bind=db_engine)
+    started = time.perf_counter()
+    for i in range(count):
+        with make_session() as session:
+            session.add(BlockInTrain(reception_id=1, block_number=f'Блок {i}', position=i))
+            session.commit()
+    return count / (time.perf_counter() - started)
+
+def bench_reads(db_engine, count):
+    make_session = sessionmaker(bind=db_engine)
+    started = time.perf_counter()
+    for _ in range(count):
+        with make_session() as session:
+            session.get(BlockInTrain, random.randint(1, count))
+    return count / (time.perf_counter() - started)
+
+def bench_mixed(db_engine, count, readers=4):
+    make_session = sessionmaker(bind=db_engine)
+    errors = []
+    reads = []
+
+    def writer():
+        for i in range(count):
+            try:
+                with make_session() as session:
+                    block = session.get(BlockInTrain, i + 1)
+                    block.is_checked = True
+                    session.commit()
+            except OperationalError as e:
+                errors.append(e)
+
+    def reader():
+        done = 0
+        for _ in range(count):
+            try:
+                with make_session() as session:
+                    session.scalars(select(BlockInTrain).filter(
+                        BlockInTrain.reception_id == 1,
+                        BlockInTrain.is_checked == False
+                    ).limit(1)).first()
+                done += 1
+            except OperationalError as e:
+                errors.append(e)
+        reads.append(done)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return (count + sum(reads)) / elapsed, len(errors)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    profiles = [('по умолчанию', make_default_engine), ('настроенный', create_db_engine)]
+
+    for name, factory in profiles:
+        path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        db_engine = factory(path)
+        prepare(db_engine)
+        writes = bench_writes(db_engine, count)
+        reads = bench_reads(db_engine, count)
+        mixed, errors = bench_mixed(db_engine, count)
+        db_engine.dispose()
+        print(
+            f'{name:>14}: запись {writes:9.1f} оп/с, чтение {reads:9.1f} оп/с, '
+            f'смешанная {mixed:9.1f} оп/с, блокировок {errors}'
+        )
+
+if __name__ == '__main__':
+    main()
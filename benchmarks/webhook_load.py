@@ -0,0 +1,182 @@
+"""Режим webhook под нагрузкой: подтверждения, обработка и отказы.
+
+Запуск из корня проекта:
+    python -m benchmarks.webhook_load [обновлений] [соединений]
+
+Application с заглушкой Bot API (она же принимает setWebhook) запускается
+через run_webhook() на локальном порту. Клиент, как Telegram, держит
+несколько keep-alive соединений и шлёт по каждому POST с обновлениями
+подряд, не дожидаясь их обработки, а на 503 повторяет обновление позже.
+Обработчик обновления имитирует работу с задержкой HANDLER_LATENCY.
+Выводятся задержки подтверждений, скорость приёма, сколько обновлений
+обработано, а также ответы на неверный секрет, чужой путь, битый JSON и
+переполнение очереди.
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, TypeHandler
+from telegram.request import BaseRequest
+
+from webhook import WebhookServer, run_webhook
+
+API_LATENCY = 0.01  # секунд на запрос к Bot API
+HANDLER_LATENCY = 0.0005  # секунд на обработку обновления
+RETRY_DELAY = 0.05  # через сколько клиент повторяет обновление после 503
+SECRET = 'bench-secret'
+PATH = '/telegram'
+
+class FakeRequest(BaseRequest):
+    """Bot API: getMe, setWebhook и остальные методы как отправка сообщения"""
+
+    def __init__(self):
+        self.webhook = None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        await asyncio.sleep(API_LATENCY)
+        if url.endswith('/getMe'):
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        elif url.endswith('/setWebhook'):
+            self.webhook = request_data.parameters
+            result = True
+        else:
+            result = {'message_id': 1, 'date': 0, 'chat': {'id': 1, 'type': 'private'}, 'text': ''}
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+def update_body(update_id: int) -> bytes:
+    user = {'id': 1000 + update_id % 50, 'is_bot': False, 'first_name': 'Инспектор'}
+    return json.dumps({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user['id'], 'type': 'private'},
+            'from': user,
+            'text': '📋 История приёмок'
+        }
+    }).encode()
+
+def http_request(body: bytes, secret: str = SECRET, path: str = PATH) -> bytes:
+    return (
+        f'POST {path} HTTP/1.1\r\n'
+        f'Host: localhost\r\n'
+        f'Content-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        f'X-Telegram-Bot-Api-Secret-Token: {secret}\r\n\r\n'
+    ).encode() + body
+
+async def post(reader, writer, request: bytes) -> int:
+    """Отправляет запрос по открытому соединению и возвращает статус ответа"""
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    return int(head.split(b' ', 2)[1])
+
+async def client(port: int, update_ids, latencies: list, statuses: dict, retry: bool = True):
+    """Одно keep-alive соединение, как у Telegram: обновления подряд,
+    после 503 — повтор того же обновления (если retry)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for update_id in update_ids:
+        while True:
+            started = time.perf_counter()
+            status = await post(reader, writer, http_request(update_body(update_id)))
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status != 503 or not retry:
+                break
+            await asyncio.sleep(RETRY_DELAY)
+    writer.close()
+
+async def single(port: int, request: bytes) -> int:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    status = await post(reader, writer, request)
+    writer.close()
+    return status
+
+def build_application(processed: list):
+    async def handle(update: Update, context):
+        await asyncio.sleep(HANDLER_LATENCY)
+        processed.append(update.update_id)
+
+    request = FakeRequest()
+    application = ApplicationBuilder().token('1:bench').request(request).updater(None).build()
+    application.add_handler(TypeHandler(Update, handle))
+    return application, request
+
+async def load(updates: int, connections: int):
+    processed = []
+    application, request = build_application(processed)
+    stop = asyncio.Event()
+    port = 8787
+    running = asyncio.create_task(run_webhook(
+        application, url=f'https://bot.example{PATH}', listen='127.0.0.1', port=port,
+        secret=SECRET, stop=stop
+    ))
+    while request.webhook is None:
+        await asyncio.sleep(0.01)
+
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, range(index, updates, connections), latencies, statuses)
+        for index in range(connections)
+    ))
+    acked = time.perf_counter() - started
+    while len(processed) < updates and time.perf_counter() - started < 30:
+        await asyncio.sleep(0.01)
+    done = time.perf_counter() - started
+
+    bad_secret = await single(port, http_request(update_body(0), secret='wrong'))
+    bad_path = await single(port, http_request(update_body(0), path='/other'))
+    bad_json = await single(port, http_request(b'{not json'))
+    stop.set()
+    await running
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f'setWebhook: secret_token передан — {request.webhook.get("secret_token") == SECRET}, '
+        f'max_connections {request.webhook.get("max_connections")}'
+    )
+    print(
+        f'приём: {updates} обновлений (с повторами) за {acked:5.2f} с ({updates / acked:6.0f}/с), '
+        f'подтверждение p50 {statistics.median(latencies) * 1000:5.2f} мс, '
+        f'p99 {quantiles[98] * 1000:5.2f} мс; статусы {statuses}'
+    )
+    print(
+        f'обработка: {len(processed)} обновлений за {done:5.2f} с, '
+        f'дубликатов {len(processed) - len(set(processed))}'
+    )
+    print(f'неверный секрет: {bad_secret}, чужой путь: {bad_path}, битый JSON: {bad_json}')
+
+async def overflow(updates: int, max_queue: int):
+    """Очередь не разбирается — сверх max_queue обновлений ответ 503"""
+    application, _ = build_application([])
+    await application.initialize()
+    server = WebhookServer(application, PATH, SECRET, max_queue=max_queue)
+    await server.start('127.0.0.1', 0)
+    statuses = {}
+    await client(server.port, range(updates), [], statuses, retry=False)
+    await server.stop()
+    await application.shutdown()
+    print(f'переполнение: очередь {max_queue}, отправлено {updates} — статусы {statuses}')
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    print(f'Обновлений: {updates}, соединений: {connections}')
+    asyncio.run(load(updates, connections))
+    asyncio.run(overflow(200, 100))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+import binascii
+from datetime import datetime, timedelta
+from enum import IntEnum
+from typing import NamedTuple, Optional
+from telegram import Update
+from telegram.ext import ContextTypes, CallbackQueryHandler
+
+from models import Railway
+
+# Формат callback_data: <версия><действие><поля>. Версия и действие — по
+# одному символу алфавита base64url, поля упакованы в байты (целые —
+# varint, строки — длина и UTF-8) и записаны base64url без '='. Первые два
+# символа — префикс, по которому маршрутизатор находит обработчик
+# поиском в словаре, не разбирая остальное.
+
+CALLBACK_VERSION = 1
+
+# Ограничение Telegram на длину callback_data (байт)
+MAX_CALLBACK_DATA = 64
+
+_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+_EPOCH = datetime(1970, 1, 1)
+
+class CallbackAction(IntEnum):
+    """Действия инлайн-кнопок.
+
+    Коды попадают в уже отправленные сообщения, поэтому их нельзя менять и
+    переиспользовать — только добавлять новые (не больше 64).
+    """
+    BLOCK_OK = 1
+    BLOCK_FAIL = 2
+    CHECKLIST_OK = 3
+    CHECKLIST_FAIL = 4
+    CHECKLIST_REST = 5
+    CHECKLIST_DONE = 6
+    HISTORY_VIEW = 7
+    HISTORY_OLDER = 8
+    HISTORY_NEWER = 9
+    HISTORY_BACK = 10
+    EXPORT_PDF = 11
+    USER_SELECT = 12
+    USERS_NEXT = 13
+    USERS_PREV = 14
+    USERS_FILTER = 15
+    USERS_RAILWAY = 16
+    ADMIN_BACK = 17
+    MAKE_ADMIN = 18
+    BLOCK_USER = 19
+    UNBLOCK_USER = 20
+    USERS_BACK = 21
+    USERS_NEXT_AFTER = 22
+    USERS_PREV_BEFORE = 23
+
+# Типы полей действий: int (неотрицательное), str, datetime или Enum
+CALLBACK_FIELDS = {
+    CallbackAction.BLOCK_OK: (int,),  # id блока
+    CallbackAction.BLOCK_FAIL: (int,),
+    CallbackAction.CHECKLIST_OK: (int,),  # id блока
+    CallbackAction.CHECKLIST_FAIL: (int,),
+    CallbackAction.CHECKLIST_REST: (int,),  # id приёмки
+    CallbackAction.CHECKLIST_DONE: (int,),
+    CallbackAction.HISTORY_VIEW: (int,),  # id приёмки
+    CallbackAction.HISTORY_OLDER: (datetime, int),  # курсор (created_at, id)
+    CallbackAction.HISTORY_NEWER: (datetime, int),
+    CallbackAction.HISTORY_BACK: (),
+    CallbackAction.EXPORT_PDF: (int,),  # id приёмки
+    CallbackAction.USER_SELECT: (int,),  # Telegram ID пользователя
+    # Курсор — только id: ФИО читается отдельным запросом. Остались для уже
+    # отправленных кнопок и ФИО, не помещающихся в callback_data
+    CallbackAction.USERS_NEXT: (int,),
+    CallbackAction.USERS_PREV: (int,),
+    CallbackAction.USERS_NEXT_AFTER: (str, int),  # курсор (ФИО в нижнем регистре, id)
+    CallbackAction.USERS_PREV_BEFORE: (str, int),
+    CallbackAction.USERS_FILTER: (str,),  # all / blocked / admin / railway
+    CallbackAction.USERS_RAILWAY: (Railway,),
+    CallbackAction.ADMIN_BACK: (),
+    CallbackAction.MAKE_ADMIN: (int,),
+    CallbackAction.BLOCK_USER: (int,),
+    CallbackAction.UNBLOCK_USER: (int,),
+    CallbackAction.USERS_BACK: (),
+}
+
+class Callback(NamedTuple):
+    """Разобранная callback_data"""
+    action: CallbackAction
+    values: tuple
+
+def callback_prefix(action: CallbackAction) -> str:
+    return _ALPHABET[CALLBACK_VERSION] + _ALPHABET[action]
+
+# Префикс -> (действие, типы полей): единственный поиск при разборе
+_SCHEMAS = {callback_prefix(action): (action, CALLBACK_FIELDS[action]) for action in CallbackAction}
+
+def pack_callback(action: CallbackAction, *values) -> str:
+    """Кодирует действие и его поля в callback_data"""
+    fields = CALLBACK_FIELDS[action]
+    if len(values) != len(fields):
+        raise ValueError(f'{action.name}: ожидается полей {len(fields)}, передано {len(values)}')
+
+    payload = bytearray()
+    for field, value in zip(fields, values):
+        if field is int:
+            _write_varint(payload, value)
+        elif field is datetime:
+            _write_varint(payload, (value - _EPOCH) // timedelta(microseconds=1))
+        elif field is str:
+            encoded = value.encode()
+            _write_varint(payload, len(encoded))
+            payload += encoded
+        else:
+            _write_varint(payload, list(field).index(value))
+
+    encoded = binascii.b2a_base64(payload, newline=False).decode().rstrip('=')
+    data = callback_prefix(action) + encoded.replace('+', '-').replace('/', '_')
+    if len(data) > MAX_CALLBACK_DATA:
+        raise ValueError(f'{action.name}: callback_data длиннее {MAX_CALLBACK_DATA} байт')
+    return data
+
+def unpack_callback(data: str) -> Optional[Callback]:
+    """Разбирает callback_data; None — чужой формат, другая версия или мусор"""
+    schema = _SCHEMAS.get(data[:2])
+    if schema is None:
+        return None
+    action, fields = schema
+    try:
+        encoded = data[2:].replace('-', '+').replace('_', '/')
+        payload = binascii.a2b_base64(encoded + '=' * (-len(encoded) % 4), strict_mode=True)
+        values = []
+        offset = 0
+        for field in fields:
+            number, offset = _read_varint(payload, offset)
+            if field is int:
+                values.append(number)
+            elif field is datetime:
+                values.append(_EPOCH + timedelta(microseconds=number))
+            elif field is str:
+                values.append(payload[offset:offset + number].decode())
+                offset += number
+            else:
+                values.append(list(field)[number])
+    except (binascii.Error, ValueError, IndexError):
+        return None
+    if offset != len(payload):
+        return None
+    return Callback(action, tuple(values))
+
+def _write_varint(payload: bytearray, value: int):
+    if value < 0:
+        raise ValueError('Отрицательные числа в callback_data не поддерживаются')
+    while value > 0x7F:
+        payload.append(value & 0x7F | 0x80)
+        value >>= 7
+    payload.append(value)
+
+def _read_varint(payload: bytes, offset: int):
+    value = shift = 0
+    while True:
+        byte = payload[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+class CallbackRouter:
+    """Маршрутизатор нажатий инлайн-кнопок по префиксу callback_data.
+
+    Обработчик регистрируется на действие декоратором route() и вызывается
+    как callback(update, context, *поля). handler(*действия) создаёт один
+    CallbackQueryHandler на состояние диалога: проверка префикса — поиск
+    во множестве, callback_data разбирается один раз, и разобранный
+    Callback доступен также в context.matches[0] (так обработчик одного
+    из нескольких действий узнаёт, какое нажато).
+    """
+
+    def __init__(self):
+        self._routes = {}
+
+    def route(self, *actions: CallbackAction):
+        def decorator(callback):
+            for action in actions:
+                if action in self._routes:
+                    raise ValueError(f'Для {action.name} уже зарегистрирован обработчик')
+                self._routes[action] = callback
+            return callback
+        return decorator
+
+    def handler(self, *actions: CallbackAction) -> CallbackQueryHandler:
+        """CallbackQueryHandler, принимающий только перечисленные действия"""
+        prefixes = frozenset(callback_prefix(action) for action in actions)
+
+        def match(data) -> Optional[Callback]:
+            if isinstance(data, str) and data[:2] in prefixes:
+                return unpack_callback(data)
+            return None
+
+        return CallbackQueryHandler(self.dispatch, pattern=match)
+
+    def callback(self, action: CallbackAction):
+        """Обработчик, зарегистрированный на действие"""
+        return self._routes[action]
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        action, values = context.matches[0]
+        return await self._routes[action](update, context, *values)
+
+    def stale_handler(self) -> CallbackQueryHandler:
+        """Отвечает на кнопки, которые никто не обработал (старый формат,
+        устаревшее состояние диалога), чтобы у пользователя не висели часы"""
+        return CallbackQueryHandler(_answer_stale)
+
+async def _answer_stale(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.callback_query.answer('Кнопка устарела, откройте меню заново')
+
+callback_router = CallbackRouter()
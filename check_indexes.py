@@ -0,0 +1,59 @@
+import sys
+from datetime import datetime
+from sqlalchemy import create_engine, select, func, text, and_, tuple_
+from models import Base, User, UserRole, TrainReception, BlockInTrain
+
+# Горячие запросы обработчиков, которые обязаны использовать индексы
+HOT_QUERIES = {
+    'show_reception_history': select(TrainReception).filter(
+        TrainReception.user_id == 1
+    ).order_by(TrainReception.created_at.desc(), TrainReception.id.desc()).limit(11),
+    'show_reception_history (page N)': select(TrainReception).filter(
+        TrainReception.user_id == 1,
+        tuple_(TrainReception.created_at, TrainReception.id) < tuple_(datetime(2026, 1, 1), 1000)
+    ).order_by(TrainReception.created_at.desc(), TrainReception.id.desc()).limit(11),
+    'show_next_block': select(TrainReception, BlockInTrain).outerjoin(BlockInTrain, and_(
+        BlockInTrain.reception_id == TrainReception.id,
+        BlockInTrain.position == TrainReception.next_block_position
+    )).filter(TrainReception.id == 1),
+    'view_users': select(User).order_by(User.full_name_lower, User.id).limit(21),
+    'view_users (page N, blocked)': select(User).filter(
+        User.is_blocked == True,
+        tuple_(User.full_name_lower, User.id) > tuple_('иванов', 1000)
+    ).order_by(User.full_name_lower, User.id).limit(21),
+    'view_users (name prefix)': select(User).filter(
+        User.full_name_lower >= 'ив', User.full_name_lower < 'ив\uffff'
+    ).order_by(User.full_name_lower, User.id).limit(21),
+    'show_statistics (admins)': select(func.count()).select_from(User).filter(
+        User.role == UserRole.ADMIN
+    ),
+    'show_statistics (blocked)': select(func.count()).select_from(User).filter(
+        User.is_blocked == True
+    ),
+}
+
+def explain(connection, statement):
+    """Возвращает строки EXPLAIN QUERY PLAN для запроса"""
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))]
+
+def is_full_scan(detail: str) -> bool:
+    """Полный просмотр таблицы или сортировка во временном B-дереве"""
+    return (detail.startswith('SCAN') and 'INDEX' not in detail) or 'TEMP B-TREE' in detail
+
+def check_indexes():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+
+    failed = []
+    with engine.connect() as connection:
+        for name, statement in HOT_QUERIES.items():
+            plan = explain(connection, statement)
+            ok = not any(is_full_scan(detail) for detail in plan)
+            print(f"{'✅' if ok else '❌'} {name}: {'; '.join(plan)}")
+            if not ok:
+                failed.append(name)
+    return failed
+
+if __name__ == "__main__":
+    sys.exit(1 if check_indexes() else 0)
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+os.environ.setdefault('DB_PATH', os.path.join(tempfile.mkdtemp(), 'check_queries.db'))
+
+from sqlalchemy import select
+from models import Base, BlockInTrain, User, UserRole, Railway, TrainType
+from database import engine, session_scope
+from query_profiler import QueryBudgetExceeded, expect_queries
+from repository import create_reception, mark_block_checked
+from user_cache import user_cache
+from writer import writer
+from handlers.reports import show_reception_report
+from handlers.pdf_generator import generate_reception_pdf
+from handlers.reception import show_next_block
+from handlers.admin import view_users
+
+# Допустимое число запросов к БД на один вызов обработчика
+QUERY_BUDGET = {
+    'show_reception_report': 2,
+    'generate_reception_pdf': 2,
+    # Приёмка со следующим блоком одним запросом
+    'show_next_block': 1,
+    # Проверка прав администратора (промах кэша) и страница пользователей
+    'view_users': 2,
+    # Записи через поток writer считаются в обновлении, которое их отправило:
+    # приёмка, её блоки и счётчики; блок, приёмка и счётчик неисправностей
+    'writer: create_reception': 3,
+    'writer: mark_block_checked': 3,
+}
+
+def prepare_reception():
+    Base.metadata.create_all(engine)
+    with session_scope() as session:
+        session.merge(User(
+            id=1, full_name='Инспектор', position='Инспектор', role=UserRole.ADMIN,
+            railway=Railway.YUGO_VOSTOCHNAYA, branch='Депо', phone='+79000000000'
+        ))
+        reception_id = create_reception(session, '0001', TrainType.EP3D, 1)
+    with session_scope() as session:
+        for block_id in range(1, 9):
+            mark_block_checked(session, block_id, 'Исправен' if block_id % 3 else 'Трещина')
+    return reception_id
+
+def prepare_open_block():
+    """Непроверенный блок новой приёмки"""
+    with session_scope() as session:
+        reception_id = create_reception(session, '0002', TrainType.EP3D, 1)
+        return session.scalars(
+            select(BlockInTrain.id).filter(BlockInTrain.reception_id == reception_id).order_by(BlockInTrain.position)
+        ).first()
+
+async def reply_text(*args, **kwargs):
+    pass
+
+def callback_update():
+    """Нажатие кнопки пользователем 1 (только то, что читают обработчики)"""
+    message = SimpleNamespace(reply_text=reply_text)
+    return SimpleNamespace(
+        callback_query=SimpleNamespace(message=message),
+        effective_user=SimpleNamespace(id=1),
+        effective_message=message
+    )
+
+async def run_text_report(reception_id):
+    await show_reception_report(callback_update(), SimpleNamespace(user_data={}), reception_id)
+
+async def run_next_block(reception_id):
+    await show_next_block(callback_update(), SimpleNamespace(user_data={'reception_id': reception_id}))
+
+async def run_view_users():
+    # Проверка прав идёт мимо кэша, как у первого нажатия после запуска
+    user_cache.invalidate(1)
+    await view_users(callback_update(), SimpleNamespace(user_data={}))
+
+async def run_writer(operation, *args):
+    return await writer.submit(operation, *args)
+
+def run_pdf_report(reception_id):
+    try:
+        os.remove(generate_reception_pdf(reception_id))
+    except ValueError as e:
+        # Без шрифтов Calibri reportlab не строит документ, но все запросы
+        # к БД к этому моменту уже выполнены
+        print(f"⚠️ PDF не построен: {str(e).splitlines()[-1]}")
+
+def check_queries():
+    reception_id = prepare_reception()
+    block_id = prepare_open_block()
+    runners = {
+        'show_reception_report': lambda: asyncio.run(run_text_report(reception_id)),
+        'generate_reception_pdf': lambda: run_pdf_report(reception_id),
+        'show_next_block': lambda: asyncio.run(run_next_block(reception_id)),
+        'view_users': lambda: asyncio.run(run_view_users()),
+        'writer: create_reception': lambda: asyncio.run(run_writer(create_reception, '0003', TrainType.EP3D, 1)),
+        'writer: mark_block_checked': lambda: asyncio.run(run_writer(mark_block_checked, block_id, 'Трещина')),
+    }
+
+    failed = []
+    for name, run in runners.items():
+        budget = QUERY_BUDGET[name]
+        try:
+            with expect_queries(budget, name) as log:
+                run()
+        except QueryBudgetExceeded as e:
+            print(f"❌ {e}")
+            failed.append(name)
+            continue
+        print(f"✅ {name}: {log.count} запросов (допустимо {budget})")
+    writer.stop()
+    return failed
+
+if __name__ == "__main__":
+    sys.exit(1 if check_queries() else 0)
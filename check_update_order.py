@@ -0,0 +1,140 @@
+import asyncio
+import json
+import random
+import sys
+from telegram import Update
+from telegram.ext import ApplicationBuilder, ConversationHandler, MessageHandler, filters
+from telegram.request import BaseRequest
+from update_processor import ChatUpdateProcessor
+
+# Нагрузка: чаты, нажатия в каждом чате и одновременных обработчиков
+CHATS = 50
+UPDATES_PER_CHAT = 40
+CONCURRENCY = 8
+
+# Обработчик диалога чередует состояния, как шаги приёмки
+STEP_A, STEP_B = range(2)
+
+class FakeRequest(BaseRequest):
+    """Bot API без сети: getMe и пустой ответ на остальные методы"""
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        result = True
+        if url.endswith('/getMe'):
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Check', 'username': 'check_bot'}
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+def build_application(processor):
+    """Бот с диалогом, который записывает, в каком состоянии обработано
+    каждое нажатие, и отмечает одновременную обработку в одном чате"""
+    log = {}
+    active = {}
+    peak = {'chat': 0, 'total': 0, 'running': 0}
+
+    def step(name, next_state):
+        async def callback(update: Update, context):
+            chat_id = update.effective_chat.id
+            active[chat_id] = active.get(chat_id, 0) + 1
+            peak['running'] += 1
+            peak['chat'] = max(peak['chat'], active[chat_id])
+            peak['total'] = max(peak['total'], peak['running'])
+            log.setdefault(chat_id, []).append((name, int(update.message.text)))
+            # Медленный шаг: запись в БД, построение PDF
+            await asyncio.sleep(random.uniform(0, 0.004))
+            active[chat_id] -= 1
+            peak['running'] -= 1
+            return next_state
+        return callback
+
+    text = filters.TEXT & ~filters.COMMAND
+    application = (
+        ApplicationBuilder()
+        .token('1:check')
+        .request(FakeRequest())
+        .updater(None)
+        .concurrent_updates(processor)
+        .build()
+    )
+    application.add_handler(ConversationHandler(
+        entry_points=[MessageHandler(text, step('entry', STEP_A))],
+        states={
+            STEP_A: [MessageHandler(text, step('A', STEP_B))],
+            STEP_B: [MessageHandler(text, step('B', STEP_A))],
+        },
+        fallbacks=[]
+    ))
+    return application, log, peak
+
+def make_update(bot, update_id: int, chat_id: int, seq: int) -> Update:
+    user = {'id': chat_id, 'is_bot': False, 'first_name': 'Инспектор'}
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': seq + 1,
+            'date': 0,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': user,
+            'text': str(seq)
+        }
+    }, bot)
+
+async def run(processor):
+    application, log, peak = build_application(processor)
+    await application.initialize()
+    await application.start()
+
+    # Нажатия всех чатов вперемешку, внутри чата — по порядку
+    order = [chat_id for chat_id in range(1, CHATS + 1) for _ in range(UPDATES_PER_CHAT)]
+    random.shuffle(order)
+    sent = {}
+    for update_id, chat_id in enumerate(order):
+        seq = sent.get(chat_id, 0)
+        sent[chat_id] = seq + 1
+        application.update_queue.put_nowait(make_update(application.bot, update_id, chat_id, seq))
+
+    await application.update_queue.join()
+    await application.stop()
+    await application.shutdown()
+    return log, peak
+
+def expected_steps():
+    names = ['entry'] + ['A', 'B'] * UPDATES_PER_CHAT
+    return list(zip(names, range(UPDATES_PER_CHAT)))
+
+def check_update_order():
+    random.seed(22)
+    processor = ChatUpdateProcessor(concurrency=CONCURRENCY)
+    log, peak = asyncio.run(run(processor))
+
+    expected = expected_steps()
+    broken = [chat_id for chat_id in range(1, CHATS + 1) if log.get(chat_id) != expected]
+    checks = [
+        (not broken, f'порядок и состояния диалога в каждом чате (нарушены в {len(broken)} из {CHATS})'),
+        (peak['chat'] == 1, f'в чате одновременно не больше одного обновления (было {peak["chat"]})'),
+        (1 < peak['total'] <= CONCURRENCY,
+         f'разные чаты параллельно, не больше {CONCURRENCY} (было {peak["total"]})'),
+        (processor.stats()['pending'] == 0, 'все обновления обработаны'),
+    ]
+    for ok, message in checks:
+        print(f"{'✅' if ok else '❌'} {message}")
+    stats = processor.stats()
+    print(f"   обработано {stats['processed']}, ожидание до начала: "
+          f"среднее {stats['wait_avg'] * 1000:.1f} мс, максимум {stats['wait_max'] * 1000:.1f} мс")
+
+    # Для сравнения: concurrent_updates без очереди по чатам ломает диалоги
+    random.seed(22)
+    log, peak = asyncio.run(run(CHATS * UPDATES_PER_CHAT))
+    broken = sum(1 for chat_id in range(1, CHATS + 1) if log.get(chat_id) != expected)
+    print(f"ℹ️ concurrent_updates без очереди по чатам: нарушен порядок в {broken} из {CHATS} чатов")
+
+    return [message for ok, message in checks if not ok]
+
+if __name__ == "__main__":
+    sys.exit(1 if check_update_order() else 0)
@@ -0,0 +1,240 @@
+import html
+import json
+import os
+import sys
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+from sqlalchemy import select, func, insert
+from sqlalchemy.orm import Session as OrmSession
+
+from models import TrainType, ChecklistVersion, ChecklistBlock, ChecklistItem
+from train_blocks import TRAIN_BLOCKS, BLOCK_DESCRIPTIONS, BLOCK_CHECKLIST
+
+# Как часто проверять, не опубликована ли новая версия каталога (сек)
+CHECKLIST_REFRESH_INTERVAL = float(os.getenv('CHECKLIST_REFRESH_INTERVAL', '30'))
+
+# Версия, соответствующая train_blocks.py. Она же заполняется миграцией и
+# используется, пока в базе нет ни одной версии
+BUILTIN_VERSION = 1
+
+class BlockDefinition(NamedTuple):
+    """Блок проверки в исходном виде: название, описание, критерии"""
+    name: str
+    description: str
+    items: tuple
+
+class BlockPrompt(NamedTuple):
+    """Заранее сформированный HTML подсказки блока.
+
+    Между title и body подставляется только счётчик прогресса.
+    """
+    title: str
+    body: str
+
+    def render(self, checked: int, total: int) -> str:
+        return f'{self.title}({checked}/{total}){self.body}'
+
+class CompiledChecklist(NamedTuple):
+    """Скомпилированная версия каталога"""
+    version: int
+    definition: MappingProxyType  # тип состава -> кортеж BlockDefinition
+    blocks: MappingProxyType  # тип состава -> кортеж названий блоков по порядку
+    prompts: MappingProxyType  # (тип состава, название блока) -> BlockPrompt
+
+def builtin_definition() -> dict:
+    """Каталог из train_blocks.py: тип состава -> список BlockDefinition"""
+    return {
+        train_type: [
+            BlockDefinition(name, BLOCK_DESCRIPTIONS[name], tuple(BLOCK_CHECKLIST[name]))
+            for name in names
+        ]
+        for train_type, names in TRAIN_BLOCKS.items()
+    }
+
+def render_prompt(block: BlockDefinition) -> BlockPrompt:
+    """Формирует HTML подсказки блока (текст каталога экранируется)"""
+    items = ''.join(f'• {html.escape(item)}\n' for item in block.items)
+    return BlockPrompt(
+        title=f'🔍 <b>Проверка блока: {html.escape(block.name)}</b> ',
+        body=(
+            f'\n\n📝 Описание:\n{html.escape(block.description)}\n\n'
+            f'✅ Критерии проверки:\n{items}'
+        )
+    )
+
+def compile_checklist(version: int, definition: dict) -> CompiledChecklist:
+    """Компилирует версию каталога в индекс подсказок"""
+    return CompiledChecklist(
+        version=version,
+        definition=MappingProxyType({
+            train_type: tuple(blocks) for train_type, blocks in definition.items()
+        }),
+        blocks=MappingProxyType({
+            train_type: tuple(block.name for block in blocks)
+            for train_type, blocks in definition.items()
+        }),
+        prompts=MappingProxyType({
+            (train_type, block.name): render_prompt(block)
+            for train_type, blocks in definition.items()
+            for block in blocks
+        })
+    )
+
+class ChecklistCatalog:
+    """Версии каталога чек-листов, скомпилированные в памяти.
+
+    Версии в базе не изменяются, поэтому однажды скомпилированная версия
+    не перечитывается. refresh() не чаще refresh_interval проверяет
+    MAX(id) версий и компилирует только новые — так опубликованная версия
+    подхватывается без перезапуска бота. Новые приёмки закрепляют за собой
+    current_version, а подсказки выводятся по закреплённой версии, поэтому
+    публикация не меняет блоки уже начатых приёмок.
+
+    refresh() вызывают и поток записи (create_receptions), и цикл событий,
+    поэтому словарь версий не изменяется на месте: новые версии
+    собираются в новый словарь, который подменяет старый одним
+    присваиванием, и чтение обходится без блокировки.
+    """
+
+    def __init__(self, refresh_interval: float = CHECKLIST_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._versions = {BUILTIN_VERSION: compile_checklist(BUILTIN_VERSION, builtin_definition())}
+        self._current = BUILTIN_VERSION
+        self._checked_at = None
+        # Только для слияния при подмене: два одновременных refresh() не теряют версии друг друга
+        self._lock = threading.Lock()
+
+    @property
+    def current_version(self) -> int:
+        return self._current
+
+    def refresh(self, session: OrmSession, force: bool = False):
+        """Подгружает из базы опубликованные версии, которых ещё нет в памяти"""
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = now
+
+        latest = session.scalar(select(func.max(ChecklistVersion.id)))
+        if latest is None or latest in self._versions:
+            return
+
+        known = [version for version in self._versions if version != BUILTIN_VERSION]
+        definitions = _load_definitions(session, max(known, default=0))
+        compiled = {
+            version: compile_checklist(version, definition)
+            for version, definition in definitions.items()
+        }
+        with self._lock:
+            versions = {**self._versions, **compiled}
+            # Сначала словарь, затем номер: прочитавший current_version
+            # найдёт эту версию в словаре
+            self._versions = versions
+            self._current = max(versions)
+
+    def blocks(self, train_type: TrainType, version: int = None) -> tuple:
+        """Названия блоков типа состава по порядку"""
+        return self._versions[version or self._current].blocks.get(train_type, ())
+
+    def prompt(self, version: int, train_type: TrainType, block_number: str) -> Optional[BlockPrompt]:
+        """Подсказка блока закреплённой версии или None, если версия ещё не загружена"""
+        checklist = self._versions.get(version)
+        return checklist.prompts.get((train_type, block_number)) if checklist else None
+
+    def definition(self, version: int = None) -> dict:
+        """Исходный вид версии (для выгрузки в JSON)"""
+        return dict(self._versions[version or self._current].definition)
+
+def _load_definitions(session: OrmSession, after_version: int) -> dict:
+    """Читает версии новее after_version двумя запросами: блоки и критерии"""
+    blocks = session.execute(
+        select(ChecklistBlock)
+        .filter(ChecklistBlock.version_id > after_version)
+        .order_by(ChecklistBlock.version_id, ChecklistBlock.train_type, ChecklistBlock.position)
+    ).scalars().all()
+
+    items = {}
+    for block_id, text in session.execute(
+        select(ChecklistItem.block_id, ChecklistItem.text)
+        .join(ChecklistBlock, ChecklistBlock.id == ChecklistItem.block_id)
+        .filter(ChecklistBlock.version_id > after_version)
+        .order_by(ChecklistItem.block_id, ChecklistItem.position)
+    ):
+        items.setdefault(block_id, []).append(text)
+
+    definitions = {}
+    for block in blocks:
+        definitions.setdefault(block.version_id, {}).setdefault(block.train_type, []).append(
+            BlockDefinition(block.name, block.description, tuple(items.get(block.id, ())))
+        )
+    return definitions
+
+def publish_checklist(session: OrmSession, definition: dict, comment: str = None) -> int:
+    """Сохраняет каталог новой версией и возвращает её номер.
+
+    Работающий бот подхватит её при следующем refresh().
+    """
+    version_id = session.scalar(
+        insert(ChecklistVersion).values(comment=comment).returning(ChecklistVersion.id)
+    )
+    for train_type, blocks in definition.items():
+        for position, block in enumerate(blocks):
+            block_id = session.scalar(
+                insert(ChecklistBlock).values(
+                    version_id=version_id,
+                    train_type=train_type,
+                    position=position,
+                    name=block.name,
+                    description=block.description
+                ).returning(ChecklistBlock.id)
+            )
+            if block.items:
+                session.execute(insert(ChecklistItem), [
+                    {'block_id': block_id, 'position': item_position, 'text': text}
+                    for item_position, text in enumerate(block.items)
+                ])
+    return version_id
+
+def seed_checklists(session: OrmSession):
+    """Сохраняет встроенный каталог первой версией, если версий в базе ещё нет"""
+    if session.scalar(select(func.max(ChecklistVersion.id))) is None:
+        publish_checklist(session, builtin_definition(), 'train_blocks.py')
+
+def definition_to_json(definition: dict) -> str:
+    return json.dumps({
+        train_type.value: [
+            {'name': block.name, 'description': block.description, 'items': list(block.items)}
+            for block in blocks
+        ]
+        for train_type, blocks in definition.items()
+    }, ensure_ascii=False, indent=2)
+
+def definition_from_json(data: str) -> dict:
+    return {
+        TrainType(train_type): [
+            BlockDefinition(block['name'], block['description'], tuple(block['items']))
+            for block in blocks
+        ]
+        for train_type, blocks in json.loads(data).items()
+    }
+
+checklist_catalog = ChecklistCatalog()
+
+if __name__ == "__main__":
+    # python checklists.py export [версия] > checklist.json
+    # python checklists.py publish checklist.json [комментарий]
+    from database import session_scope
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'export'
+    with session_scope() as session:
+        checklist_catalog.refresh(session, force=True)
+        if command == 'publish':
+            with open(sys.argv[2], encoding='utf-8') as file:
+                definition = definition_from_json(file.read())
+            version = publish_checklist(session, definition, ' '.join(sys.argv[3:]) or None)
+            print(f"Опубликована версия каталога: {version}")
+        else:
+            version = int(sys.argv[2]) if len(sys.argv) > 2 else None
+            print(definition_to_json(checklist_catalog.definition(version)))
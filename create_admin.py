@@ -1,5 +1,6 @@
 from models import User, UserRole, Railway, Base
 from database import session_scope, engine
+from stats import rebuild_counters
 
 def init_db():
     """Инициализация базы данных и создание таблиц"""
@@ -22,6 +23,8 @@ def create_admin():
                 is_blocked=False
             )
             session.merge(admin)  # merge вместо add, чтобы избежать конфликтов
+            session.flush()
+            rebuild_counters(session)  # Пересчитываем статистику с учётом админа
             print("Admin created successfully!")
     except Exception as e:
         print(f"Error creating admin: {str(e)}")
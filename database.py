@@ -1,13 +1,131 @@
-from sqlalchemy import create_engine
+import os
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, scoped_session
-from contextlib import contextmanager
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from contextlib import contextmanager, asynccontextmanager
+from query_profiler import query_profiler
 
-# Создаем движок базы данных
-engine = create_engine('sqlite:///bot.db')
+load_dotenv()
+
+# Настройки базы данных (задаются в .env рядом с BOT_TOKEN)
+DB_PATH = os.getenv('DB_PATH', 'bot.db')
+DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL')
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+DB_BUSY_TIMEOUT = int(os.getenv('DB_BUSY_TIMEOUT', '5000'))  # мс
+DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', '-65536'))  # отрицательное значение — в КиБ
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))  # байт
+DB_TEMP_STORE = os.getenv('DB_TEMP_STORE', 'MEMORY')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', '10'))
+
+# Архив завершённых приёмок (см. archive.py)
+ARCHIVE_DB_PATH = os.getenv('ARCHIVE_DB_PATH', 'archive.db')
+
+def sqlite_pragmas():
+    """Возвращает PRAGMA, применяемые к каждому новому соединению"""
+    return {
+        'journal_mode': DB_JOURNAL_MODE,
+        'synchronous': DB_SYNCHRONOUS,
+        'busy_timeout': DB_BUSY_TIMEOUT,
+        'cache_size': DB_CACHE_SIZE,
+        'mmap_size': DB_MMAP_SIZE,
+        'temp_store': DB_TEMP_STORE,
+    }
+
+def sqlite_read_pragmas():
+    """PRAGMA для соединений только на чтение.
+
+    journal_mode не задаём: его переключение — запись в файл базы.
+    query_only дополнительно запрещает изменения на уровне соединения.
+    """
+    pragmas = sqlite_pragmas()
+    pragmas.pop('journal_mode')
+    pragmas['query_only'] = 1
+    return pragmas
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return on_connect
+
+def create_db_engine(path: str = DB_PATH, is_async: bool = False, pragmas: dict = None,
+                     read_only: bool = False):
+    """Создаёт движок SQLite с настроенными PRAGMA и пулом соединений.
+
+    В режиме WAL читатели не блокируются писателем, поэтому держим пул
+    постоянных соединений: PRAGMA и кэш страниц живут вместе с соединением.
+    При read_only=True файл открывается в режиме mode=ro со своим пулом,
+    и такие соединения никогда не берут блокировку записи.
+    """
+    if pragmas is None:
+        pragmas = sqlite_read_pragmas() if read_only else sqlite_pragmas()
+
+    database = f'file:{path}?mode=ro&uri=true' if read_only else path
+    pool_size = DB_READ_POOL_SIZE if read_only else DB_POOL_SIZE
+
+    if is_async:
+        db_engine = create_async_engine(
+            f'sqlite+aiosqlite:///{database}',
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size,
+            max_overflow=DB_MAX_OVERFLOW
+        )
+        event.listen(db_engine.sync_engine, 'connect', _apply_pragmas(pragmas))
+    else:
+        db_engine = create_engine(
+            f'sqlite:///{database}',
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=DB_MAX_OVERFLOW
+        )
+        event.listen(db_engine, 'connect', _apply_pragmas(pragmas))
+    return db_engine
+
+# Синхронный движок для скриптов (check_db.py, create_admin.py, init_db.py)
+engine = create_db_engine()
 
-# Создаем фабрику сессий
 Session = scoped_session(sessionmaker(bind=engine))
 
+# Асинхронный движок для обработчиков бота, чтобы не блокировать цикл событий
+async_engine = create_db_engine(is_async=True)
+
+AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+# Движки только для чтения: отчёты, история, статистика. Отдельный пул,
+# поэтому тяжёлые чтения не занимают соединения пишущего движка
+read_engine = create_db_engine(read_only=True)
+
+ReadSession = sessionmaker(bind=read_engine)
+
+async_read_engine = create_db_engine(is_async=True, read_only=True)
+
+AsyncReadSession = async_sessionmaker(bind=async_read_engine, expire_on_commit=False)
+
+# Движок архивной базы для переноса приёмок (archive.py)
+archive_engine = create_db_engine(ARCHIVE_DB_PATH)
+
+# Отчёты читают из архива только на чтение (mode=ro): поиск приёмки не
+# создаёт archive.db, если архивации ещё не было
+archive_read_engine = create_db_engine(ARCHIVE_DB_PATH, read_only=True)
+
+ArchiveSession = sessionmaker(bind=archive_read_engine)
+
+async_archive_read_engine = create_db_engine(ARCHIVE_DB_PATH, is_async=True, read_only=True)
+
+AsyncArchiveSession = async_sessionmaker(bind=async_archive_read_engine, expire_on_commit=False)
+
+# Время запросов, привязка к обновлениям Telegram и поиск N+1 (см. query_profiler.py)
+query_profiler.attach(
+    engine, async_engine, read_engine, async_read_engine,
+    archive_engine, archive_read_engine, async_archive_read_engine
+)
+
 @contextmanager
 def session_scope():
     """Контекстный менеджер для работы с сессией базы данных"""
@@ -21,3 +139,52 @@ def session_scope():
     finally:
         session.close()
         Session.remove()  # Очищаем сессию из реестра потоков
+
+@asynccontextmanager
+async def async_session_scope():
+    """Асинхронный контекстный менеджер для работы с сессией базы данных"""
+    session = AsyncSession()
+    try:
+        yield session
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        raise e
+    finally:
+        await session.close()
+
+@contextmanager
+def read_session_scope():
+    """Контекстный менеджер для сессии только на чтение"""
+    session = ReadSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@asynccontextmanager
+async def async_read_session_scope():
+    """Асинхронный контекстный менеджер для сессии только на чтение"""
+    session = AsyncReadSession()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+@contextmanager
+def archive_session_scope():
+    """Контекстный менеджер для чтения из архивной базы"""
+    session = ArchiveSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@asynccontextmanager
+async def async_archive_session_scope():
+    """Асинхронный контекстный менеджер для чтения из архивной базы"""
+    session = AsyncArchiveSession()
+    try:
+        yield session
+    finally:
+        await session.close()
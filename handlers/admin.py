@@ -1,87 +1,227 @@
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters, CallbackQueryHandler
-from models import User, UserRole
-from database import session_scope
+import functools
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
+from models import User, Railway
+from database import async_read_session_scope
+from writer import writer
+from user_cache import user_cache
+from repository import get_users_page, set_user_admin, set_user_blocked
+from stats import get_statistics
+from callbacks import CallbackAction, callback_router, pack_callback
+from outbound import NOTIFICATION, priority_args
+from .notifications import admin_notifier
 from .common import show_main_menu
+from .keyboards import ADMIN_PANEL, USERS_RAILWAY_FILTER
 
 # Состояния админского меню
 ADMIN_MENU, VIEW_USERS, SELECT_USER, CONFIRM_ACTION = range(4)
 
+# Кнопки админского меню (обрабатываются и при открытом списке пользователей)
+ADMIN_MENU_BUTTONS = ["👥 Управление пользователями", "📊 Статистика", "🔙 Вернуться в главное меню"]
+
+# Число пользователей на одной странице списка
+USERS_PAGE_SIZE = 20
+
+# callback_data кнопок фильтра списка пользователей
+USERS_FILTER_BUTTONS = {
+    value: pack_callback(CallbackAction.USERS_FILTER, value)
+    for value in ('all', 'blocked', 'admin', 'railway')
+}
+
+# Кнопки списка пользователей и карточки пользователя
+USERS_LIST_ACTIONS = (
+    CallbackAction.USERS_NEXT,
+    CallbackAction.USERS_PREV,
+    CallbackAction.USERS_NEXT_AFTER,
+    CallbackAction.USERS_PREV_BEFORE,
+    CallbackAction.USERS_FILTER,
+    CallbackAction.USERS_RAILWAY,
+    CallbackAction.USER_SELECT,
+    CallbackAction.ADMIN_BACK
+)
+USER_CARD_ACTIONS = (
+    CallbackAction.MAKE_ADMIN,
+    CallbackAction.BLOCK_USER,
+    CallbackAction.UNBLOCK_USER,
+    CallbackAction.USERS_BACK
+)
+
 def admin_required(func):
     """Декоратор для проверки прав администратора"""
-    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-        with session_scope() as session:
-            user = session.query(User).filter(User.id == update.effective_user.id).first()
-            if not user or not user.is_admin:
-                await update.message.reply_text(
-                    '⛔️ У вас нет прав администратора для выполнения этой команды.'
-                )
-                return ConversationHandler.END
-        return await func(update, context)
+    @functools.wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args):
+        user = await user_cache.get(update.effective_user.id)
+        if not user or not user.is_admin:
+            await update.effective_message.reply_text(
+                '⛔️ У вас нет прав администратора для выполнения этой команды.'
+            )
+            return ConversationHandler.END
+        return await func(update, context, *args)
     return wrapper
 
 @admin_required
 async def admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать админское меню"""
-    keyboard = [
-        [KeyboardButton("👥 Управление пользователями")],
-        [KeyboardButton("📊 Статистика")],
-        [KeyboardButton("🔙 Вернуться в главное меню")]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    
-    await update.message.reply_text(
+    await update.effective_message.reply_text(
         '⚙️ Панель администратора\n'
         'Выберите действие:',
-        reply_markup=reply_markup
+        reply_markup=ADMIN_PANEL
     )
     return ADMIN_MENU
 
 @admin_required
 async def view_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Просмотр списка пользователей"""
-    with session_scope() as session:
-        users = session.query(User).all()
-        
-        if not users:
-            await update.message.reply_text('📝 Список пользователей пуст.')
-            return ADMIN_MENU
-        
-        # Создаем инлайн-кнопки для каждого пользователя
-        keyboard = []
-        for user in users:
-            status = "👑" if user.is_admin else "🚫" if user.is_blocked else "✅"
-            button = InlineKeyboardButton(
-                f"{status} {user.full_name} ({user.position})",
-                callback_data=f"user_{user.id}"
-            )
-            keyboard.append([button])
-        
-        keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="back_to_admin")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(
-            "👥 Список пользователей\n"
-            "Нажмите на пользователя для управления:",
-            reply_markup=reply_markup
+    """Просмотр списка пользователей (первая страница с текущими фильтрами)"""
+    message = update.callback_query.message if update.callback_query else update.message
+    users_filter = context.user_data.setdefault('users_filter', {})
+    
+    text, reply_markup = await build_users_page(users_filter)
+    await message.reply_text(text, reply_markup=reply_markup)
+    return SELECT_USER
+
+def page_button(text: str, action: CallbackAction, by_id: CallbackAction, user: User) -> InlineKeyboardButton:
+    """Кнопка листания с курсором (ФИО, id) крайнего пользователя страницы"""
+    try:
+        callback_data = pack_callback(action, user.full_name_lower, user.id)
+    except ValueError:
+        # ФИО не помещается в 64 байта callback_data — курсор только по id
+        callback_data = pack_callback(by_id, user.id)
+    return InlineKeyboardButton(text, callback_data=callback_data)
+
+async def build_users_page(users_filter: dict, after: tuple = None, before: tuple = None):
+    """Формирует страницу списка пользователей с фильтрами и листанием"""
+    async with async_read_session_scope() as session:
+        users, has_next, has_prev = await session.run_sync(
+            get_users_page,
+            USERS_PAGE_SIZE,
+            after,
+            before,
+            users_filter.get('blocked'),
+            users_filter.get('admin'),
+            Railway[users_filter['railway']] if users_filter.get('railway') else None,
+            users_filter.get('branch'),
+            users_filter.get('prefix')
         )
+    
+    # Создаем инлайн-кнопки для каждого пользователя
+    keyboard = []
+    for user in users:
+        status = "👑" if user.is_admin else "🚫" if user.is_blocked else "✅"
+        button = InlineKeyboardButton(
+            f"{status} {user.full_name} ({user.position})",
+            callback_data=pack_callback(CallbackAction.USER_SELECT, user.id)
+        )
+        keyboard.append([button])
+    
+    navigation = []
+    if users and has_prev:
+        navigation.append(page_button("◀︎", CallbackAction.USERS_PREV_BEFORE, CallbackAction.USERS_PREV, users[0]))
+    if users and has_next:
+        navigation.append(page_button("▶︎", CallbackAction.USERS_NEXT_AFTER, CallbackAction.USERS_NEXT, users[-1]))
+    if navigation:
+        keyboard.append(navigation)
+    
+    keyboard.append([
+        InlineKeyboardButton("Все", callback_data=USERS_FILTER_BUTTONS['all']),
+        InlineKeyboardButton("🚫", callback_data=USERS_FILTER_BUTTONS['blocked']),
+        InlineKeyboardButton("👑", callback_data=USERS_FILTER_BUTTONS['admin']),
+        InlineKeyboardButton("🚂 Дорога", callback_data=USERS_FILTER_BUTTONS['railway'])
+    ])
+    keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data=pack_callback(CallbackAction.ADMIN_BACK))])
+    
+    # Описание активных фильтров
+    active = []
+    if users_filter.get('blocked'):
+        active.append("заблокированные")
+    if users_filter.get('admin'):
+        active.append("администраторы")
+    if users_filter.get('railway'):
+        active.append(Railway[users_filter['railway']].value)
+    if users_filter.get('branch'):
+        active.append(f"отделение «{users_filter['branch']}»")
+    if users_filter.get('prefix'):
+        active.append(f"ФИО на «{users_filter['prefix']}»")
+    
+    text = "👥 Список пользователей\n"
+    if active:
+        text += f"🔎 Фильтр: {', '.join(active)}\n"
+    if not users:
+        text += "\n📝 Пользователи не найдены.\n"
+    text += (
+        "Нажмите на пользователя для управления.\n"
+        "Для поиска отправьте начало ФИО, для фильтра по отделению — #отделение"
+    )
+    return text, InlineKeyboardMarkup(keyboard)
+
+@callback_router.route(CallbackAction.USERS_NEXT, CallbackAction.USERS_PREV, CallbackAction.USERS_NEXT_AFTER,
+                       CallbackAction.USERS_PREV_BEFORE, CallbackAction.USERS_FILTER, CallbackAction.USERS_RAILWAY)
+@admin_required
+async def handle_users_page(update: Update, context: ContextTypes.DEFAULT_TYPE, *values):
+    """Листание и фильтры списка пользователей"""
+    query = update.callback_query
+    await query.answer()
+    
+    users_filter = context.user_data.setdefault('users_filter', {})
+    action = context.matches[0].action
+    value = values[-1]
+    after = before = None
+    
+    if action == CallbackAction.USERS_NEXT_AFTER:
+        after = values
+    elif action == CallbackAction.USERS_PREV_BEFORE:
+        before = values
+    elif action == CallbackAction.USERS_NEXT:
+        after = (None, value)
+    elif action == CallbackAction.USERS_PREV:
+        before = (None, value)
+    elif action == CallbackAction.USERS_FILTER and value == 'railway':
+        # Показываем выбор дороги
+        await query.message.edit_text("🚂 Выберите дорогу:", reply_markup=USERS_RAILWAY_FILTER)
         return SELECT_USER
+    elif action == CallbackAction.USERS_FILTER:
+        users_filter.clear()
+        if value == 'blocked':
+            users_filter['blocked'] = True
+        elif value == 'admin':
+            users_filter['admin'] = True
+    elif action == CallbackAction.USERS_RAILWAY:
+        users_filter['railway'] = value.name
+    
+    text, reply_markup = await build_users_page(users_filter, after, before)
+    await query.message.edit_text(text, reply_markup=reply_markup)
+    return SELECT_USER
+
+@admin_required
+async def handle_users_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Поиск пользователей по началу ФИО или по отделению (#отделение)"""
+    text = update.message.text.strip()
+    users_filter = context.user_data.setdefault('users_filter', {})
+    
+    if text.startswith('#'):
+        users_filter['branch'] = text[1:].strip() or None
+    else:
+        users_filter['prefix'] = text or None
+    
+    return await view_users(update, context)
+
+@callback_router.route(CallbackAction.ADMIN_BACK)
+@admin_required
+async def handle_back_to_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Возврат из списка пользователей в админское меню"""
+    await update.callback_query.answer()
+    return await admin_menu(update, context)
 
+@callback_router.route(CallbackAction.USER_SELECT)
 @admin_required
-async def handle_user_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_user_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
     """Обработка выбора пользователя"""
     query = update.callback_query
     await query.answer()
     
-    if query.data == "back_to_admin":
-        await admin_menu(update, context)
-        return ADMIN_MENU
-    
-    user_id = int(query.data.split('_')[1])
     context.user_data['selected_user_id'] = user_id
     
-    with session_scope() as session:
-        user = session.query(User).get(user_id)
+    async with async_read_session_scope() as session:
+        user = await session.get(User, user_id)
         if not user:
             await query.message.edit_text("❌ Пользователь не найден")
             return ADMIN_MENU
@@ -92,15 +232,15 @@ async def handle_user_selection(update: Update, context: ContextTypes.DEFAULT_TY
         keyboard = []
         if not user.is_admin:
             keyboard.append([InlineKeyboardButton("👑 Назначить администратором", 
-                                                callback_data=f"make_admin_{user_id}")])
+                                                callback_data=pack_callback(CallbackAction.MAKE_ADMIN, user_id))])
         if user.is_blocked:
             keyboard.append([InlineKeyboardButton("✅ Разблокировать", 
-                                                callback_data=f"unblock_{user_id}")])
+                                                callback_data=pack_callback(CallbackAction.UNBLOCK_USER, user_id))])
         else:
             keyboard.append([InlineKeyboardButton("🚫 Заблокировать", 
-                                                callback_data=f"block_{user_id}")])
+                                                callback_data=pack_callback(CallbackAction.BLOCK_USER, user_id))])
         
-        keyboard.append([InlineKeyboardButton("🔙 Назад к списку", callback_data="back_to_list")])
+        keyboard.append([InlineKeyboardButton("🔙 Назад к списку", callback_data=pack_callback(CallbackAction.USERS_BACK))])
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         await query.message.edit_text(
@@ -114,81 +254,89 @@ async def handle_user_selection(update: Update, context: ContextTypes.DEFAULT_TY
         )
         return CONFIRM_ACTION
 
+@callback_router.route(CallbackAction.USERS_BACK)
 @admin_required
-async def handle_user_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_back_to_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Возврат из карточки пользователя к списку"""
+    await update.callback_query.answer()
+    return await view_users(update, context)
+
+@callback_router.route(CallbackAction.MAKE_ADMIN, CallbackAction.BLOCK_USER, CallbackAction.UNBLOCK_USER)
+@admin_required
+async def handle_user_action(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
     """Обработка действий с пользователем"""
     query = update.callback_query
     await query.answer()
     
-    if query.data == "back_to_list":
-        await view_users(update, context)
-        return SELECT_USER
+    action = context.matches[0].action
     
-    action, user_id = query.data.split('_')[0:2]
-    user_id = int(user_id)
+    # Запись идёт через поток записи, как и остальные записи обработчиков
+    if action == CallbackAction.MAKE_ADMIN:
+        user = await writer.submit(set_user_admin, user_id)
+    else:
+        user = await writer.submit(set_user_blocked, user_id, action == CallbackAction.BLOCK_USER)
+    if not user:
+        await query.message.edit_text("❌ Пользователь не найден")
+        return ADMIN_MENU
     
-    with session_scope() as session:
-        user = session.query(User).get(user_id)
-        if not user:
-            await query.message.edit_text("❌ Пользователь не найден")
-            return ADMIN_MENU
-        
-        if action == "make_admin":
-            user.is_admin = True
-            message = f"👑 Пользователь {user.full_name} назначен администратором"
-        elif action == "block":
-            user.is_blocked = True
-            message = f"🚫 Пользователь {user.full_name} заблокирован"
-        elif action == "unblock":
-            user.is_blocked = False
-            message = f"✅ Пользователь {user.full_name} разблокирован"
-        
-        session.commit()
-        
-        # Отправляем уведомление пользователю о изменении его статуса
-        try:
-            if action == "make_admin":
-                await context.bot.send_message(
-                    user_id,
-                    "🎉 Поздравляем! Вам предоставлены права администратора."
-                )
-            elif action == "block":
-                await context.bot.send_message(
-                    user_id,
-                    "⛔️ Ваш аккаунт был заблокирован администратором."
-                )
-            elif action == "unblock":
-                await context.bot.send_message(
-                    user_id,
-                    "✅ Ваш аккаунт был разблокирован администратором."
-                )
-        except:
-            pass  # Игнорируем ошибки отправки уведомлений
-        
-        await query.message.edit_text(
-            f"{message}\n"
-            "Возвращаемся к списку пользователей..."
-        )
-        await view_users(update, context)
-        return SELECT_USER
+    user_cache.update(user)
+    if action == CallbackAction.MAKE_ADMIN:
+        admin_notifier.invalidate_admins()
+        message = f"👑 Пользователь {user.full_name} назначен администратором"
+    elif action == CallbackAction.BLOCK_USER:
+        message = f"🚫 Пользователь {user.full_name} заблокирован"
+    else:
+        message = f"✅ Пользователь {user.full_name} разблокирован"
+    
+    # Отправляем уведомление пользователю о изменении его статуса
+    try:
+        if action == CallbackAction.MAKE_ADMIN:
+            await context.bot.send_message(
+                user_id,
+                "🎉 Поздравляем! Вам предоставлены права администратора.",
+                **priority_args(context.bot, NOTIFICATION)
+            )
+        elif action == CallbackAction.BLOCK_USER:
+            await context.bot.send_message(
+                user_id,
+                "⛔️ Ваш аккаунт был заблокирован администратором.",
+                **priority_args(context.bot, NOTIFICATION)
+            )
+        elif action == CallbackAction.UNBLOCK_USER:
+            await context.bot.send_message(
+                user_id,
+                "✅ Ваш аккаунт был разблокирован администратором.",
+                **priority_args(context.bot, NOTIFICATION)
+            )
+    except:
+        pass  # Игнорируем ошибки отправки уведомлений
+    
+    await query.message.edit_text(
+        f"{message}\n"
+        "Возвращаемся к списку пользователей..."
+    )
+    await view_users(update, context)
+    return SELECT_USER
 
 @admin_required
 async def show_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать статистику"""
-    with session_scope() as session:
-        total_users = session.query(User).count()
-        admin_users = session.query(User).filter(User.is_admin == True).count()
-        blocked_users = session.query(User).filter(User.is_blocked == True).count()
-        active_users = total_users - blocked_users
-        
-        await update.message.reply_text(
-            "📊 Статистика системы\n\n"
-            f"👥 Всего пользователей: {total_users}\n"
-            f"✅ Активных пользователей: {active_users}\n"
-            f"👑 Администраторов: {admin_users}\n"
-            f"🚫 Заблокированных: {blocked_users}\n"
-        )
-        return ADMIN_MENU
+    async with async_read_session_scope() as session:
+        stats = await session.run_sync(get_statistics)
+    
+    await update.message.reply_text(
+        "📊 Статистика системы\n\n"
+        f"👥 Всего пользователей: {stats['users_total']}\n"
+        f"✅ Активных пользователей: {stats['users_active']}\n"
+        f"👑 Администраторов: {stats['users_admin']}\n"
+        f"🚫 Заблокированных: {stats['users_blocked']}\n\n"
+        f"🚂 Всего приёмок: {stats['receptions_total']}\n"
+        f"📅 Сегодня: {stats['receptions_today']}\n"
+        f"🗓 На этой неделе: {stats['receptions_week']}\n"
+        f"🔄 Незавершённых: {stats['receptions_open']}\n"
+        f"⚠️ С неисправностями: {stats['receptions_faulty']}\n"
+    )
+    return ADMIN_MENU
 
 @admin_required
 async def handle_admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -216,14 +364,18 @@ admin_handler = ConversationHandler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, handle_admin_menu)
         ],
         SELECT_USER: [
-            CallbackQueryHandler(handle_user_selection)
+            callback_router.handler(*USERS_LIST_ACTIONS),
+            MessageHandler(filters.Text(ADMIN_MENU_BUTTONS), handle_admin_menu),
+            MessageHandler(filters.TEXT & ~filters.COMMAND, handle_users_search)
         ],
         CONFIRM_ACTION: [
-            CallbackQueryHandler(handle_user_action)
+            callback_router.handler(*USER_CARD_ACTIONS)
         ]
     },
     fallbacks=[
         MessageHandler(filters.Text(["🔙 Вернуться в главное меню"]), show_main_menu),
         CommandHandler("cancel", show_main_menu)
-    ]
+    ],
+    name='admin',
+    persistent=True
 )
@@ -1,30 +1,17 @@
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
+from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
-from models import User
-from database import session_scope
+from user_cache import user_cache
+from handlers.keyboards import main_menu
 
 async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает главное меню"""
-    with session_scope() as session:
-        user = session.query(User).filter(User.id == update.effective_user.id).first()
-        
-        keyboard = [
-            [KeyboardButton("🚂 Приёмка состава")],
-            [KeyboardButton("📋 История приёмок")],
-            [KeyboardButton("👤 Мой профиль")]
-        ]
-        
-        # Добавляем кнопку админки для администраторов
-        if user and user.is_admin:
-            keyboard.append([KeyboardButton("⚙️ Панель администратора")])
-        
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-        
-        await update.message.reply_text(
-            f'👋 Добро пожаловать, {user.full_name if user else "гость"}!\n'
-            'Выберите действие:',
-            reply_markup=reply_markup
-        )
+    user = await user_cache.get(update.effective_user.id)
+    
+    await update.effective_message.reply_text(
+        f'👋 Добро пожаловать, {user.full_name if user else "гость"}!\n'
+        'Выберите действие:',
+        reply_markup=main_menu(bool(user and user.is_admin))
+    )
     
     return ConversationHandler.END
 
@@ -0,0 +1,101 @@
+from types import MappingProxyType
+from telegram import (
+    ReplyKeyboardMarkup,
+    ReplyKeyboardRemove,
+    KeyboardButton,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup
+)
+
+from models import Railway, TrainCategory, TrainType
+from callbacks import CallbackAction, pack_callback
+
+# Статические клавиатуры бота собираются один раз при импорте. Объекты
+# telegram неизменяемы, поэтому одни и те же экземпляры раздаются всем
+# обработчикам. Константы модуля — готовый JSON: строку в reply_markup
+# PTB отправляет как есть, не вызывая to_dict() и json.dumps на каждой
+# отправке.
+
+_markups = {}
+_markups_json = {}
+
+def _register(name: str, markup) -> str:
+    _markups[name] = markup
+    _markups_json[name] = markup.to_json()
+    return _markups_json[name]
+
+def _reply_keyboard(*rows) -> ReplyKeyboardMarkup:
+    return ReplyKeyboardMarkup(
+        [[KeyboardButton(text) for text in row] for row in rows],
+        resize_keyboard=True
+    )
+
+MAIN_MENU = _register('main_menu', _reply_keyboard(
+    ['🚂 Приёмка состава'],
+    ['📋 История приёмок'],
+    ['👤 Мой профиль']
+))
+
+ADMIN_MAIN_MENU = _register('admin_main_menu', _reply_keyboard(
+    ['🚂 Приёмка состава'],
+    ['📋 История приёмок'],
+    ['👤 Мой профиль'],
+    ['⚙️ Панель администратора']
+))
+
+RECEPTION_MENU = _register('reception_menu', _reply_keyboard(
+    ['🆕 Новая приёмка', '☑️ Приёмка списком'],
+    ['📋 История приёмок'],
+    ['↩️ Главное меню']
+))
+
+# Меню под пустой историей: смотреть пока нечего
+NEW_RECEPTION_MENU = _register('new_reception_menu', _reply_keyboard(
+    ['🆕 Новая приёмка', '☑️ Приёмка списком'],
+    ['↩️ Главное меню']
+))
+
+CANCEL = _register('cancel', _reply_keyboard(['↩️ Отмена']))
+
+REMOVE_KEYBOARD = _register('remove_keyboard', ReplyKeyboardRemove())
+
+BACK_TO_MAIN_MENU = _register('back_to_main_menu', _reply_keyboard(['↩️ Главное меню']))
+
+TRAIN_CATEGORIES = _register('train_categories', _reply_keyboard(
+    [TrainCategory.ELEKTRICHKA.value, TrainCategory.RAIL_BUS.value],
+    ['↩️ Отмена']
+))
+
+# Типы составов по категории
+TRAIN_TYPES = MappingProxyType({
+    TrainCategory.ELEKTRICHKA: _register('train_types_elektrichka', _reply_keyboard(
+        [TrainType.EP2D.value, TrainType.EP3D.value],
+        ['↩️ Назад']
+    )),
+    TrainCategory.RAIL_BUS: _register('train_types_rail_bus', _reply_keyboard(
+        [TrainType.RA1.value, TrainType.RA2.value, TrainType.RA3.value],
+        ['↩️ Назад']
+    )),
+})
+
+RAILWAYS = _register('railways', _reply_keyboard(*([railway.value] for railway in Railway)))
+
+ADMIN_PANEL = _register('admin_panel', _reply_keyboard(
+    ['👥 Управление пользователями'],
+    ['📊 Статистика'],
+    ['🔙 Вернуться в главное меню']
+))
+
+# Выбор дороги для фильтра списка пользователей
+USERS_RAILWAY_FILTER = _register('users_railway_filter', InlineKeyboardMarkup([
+    [InlineKeyboardButton(railway.value, callback_data=pack_callback(CallbackAction.USERS_RAILWAY, railway))]
+    for railway in Railway
+]))
+
+# Реестры по имени: объекты и их JSON
+MARKUPS = MappingProxyType(_markups)
+MARKUPS_JSON = MappingProxyType(_markups_json)
+
+def main_menu(is_admin: bool) -> str:
+    """Главное меню (с кнопкой админ-панели для администраторов)"""
+    return ADMIN_MAIN_MENU if is_admin else MAIN_MENU
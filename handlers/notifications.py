@@ -1,18 +1,153 @@
+import asyncio
+import os
+import time
+from typing import NamedTuple
 from telegram.ext import ContextTypes
+from sqlalchemy import select
 from models import User, UserRole
-from database import session_scope
-
-async def notify_admins(context: ContextTypes.DEFAULT_TYPE, message: str):
-    """Отправка уведомления всем администраторам"""
-    with session_scope() as session:
-        admins = session.query(User).filter(User.role == UserRole.ADMIN).all()
-        
-        for admin in admins:
+from database import async_read_session_scope
+from outbound import NOTIFICATION, priority_args
+
+# Сколько одновременных отправок уведомлений, на сколько кэшируется список
+# администраторов (сек) и окно сводки (сек; 0 — без сводок)
+NOTIFY_CONCURRENCY = int(os.getenv('NOTIFY_CONCURRENCY', '8'))
+NOTIFY_ADMINS_TTL = float(os.getenv('NOTIFY_ADMINS_TTL', '60'))
+NOTIFY_DIGEST_WINDOW = float(os.getenv('NOTIFY_DIGEST_WINDOW', '10'))
+
+# Предел длины сообщения Telegram
+MAX_MESSAGE_LENGTH = 4096
+
+class DigestItem(NamedTuple):
+    """Строка сводки: заголовок сводки и краткое описание события"""
+    title: str
+    line: str
+
+class AdminNotifier:
+    """Рассылка уведомлений администраторам в фоне.
+
+    notify() только ставит рассылку в очередь задач и сразу возвращается,
+    так что ответ пользователю не ждёт отправок администраторам. Список
+    администраторов читается одним запросом id и кэшируется на
+    admins_ttl; одновременных отправок не больше concurrency.
+
+    Уведомления со сводкой (DigestItem) копятся digest_window секунд с
+    первого события и уходят каждому администратору одним сообщением с
+    заголовком и строками событий; одиночное событие отправляется полным
+    текстом.
+    """
+
+    def __init__(self, concurrency: int = NOTIFY_CONCURRENCY, admins_ttl: float = NOTIFY_ADMINS_TTL,
+                 digest_window: float = NOTIFY_DIGEST_WINDOW):
+        self.admins_ttl = admins_ttl
+        self.digest_window = digest_window
+        self.sent = 0
+        self.failed = 0
+        self._concurrency = concurrency
+        self._semaphore = None
+        self._admins = None
+        self._admins_expire = 0.0
+        self._digests = {}
+        self._tasks = set()
+        self._stopping = asyncio.Event()
+
+    def notify(self, bot, message: str, digest: DigestItem = None):
+        """Ставит уведомление в очередь (со сводкой — в сводку по digest.title)"""
+        if digest is None or self.digest_window <= 0 or self._stopping.is_set():
+            self._spawn(self._send_all(bot, message))
+            return
+
+        pending = self._digests.get(digest.title)
+        if pending is None:
+            pending = self._digests[digest.title] = []
+            self._spawn(self._send_digest(bot, digest.title))
+        pending.append((message, digest.line))
+
+    def invalidate_admins(self):
+        """Сбрасывает кэш списка администраторов (после смены роли)"""
+        self._admins = None
+
+    async def stop(self):
+        """Отправляет накопленные сводки, не дожидаясь окна, и дожидается всех
+        рассылок (при остановке бота, пока он ещё может отправлять)"""
+        self._stopping.set()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self):
+        """Отправлено, ошибок, рассылок в работе"""
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'pending': len(self._tasks)
+        }
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _admin_ids(self) -> tuple:
+        if self._admins is None or time.monotonic() >= self._admins_expire:
+            async with async_read_session_scope() as session:
+                self._admins = tuple(await session.scalars(
+                    select(User.id).filter(User.role == UserRole.ADMIN)
+                ))
+            self._admins_expire = time.monotonic() + self.admins_ttl
+        return self._admins
+
+    async def _send_digest(self, bot, title: str):
+        # Окно копит события; при остановке сводка уходит сразу
+        try:
+            await asyncio.wait_for(self._stopping.wait(), self.digest_window)
+        except asyncio.TimeoutError:
+            pass
+        pending = self._digests.pop(title)
+
+        if len(pending) == 1:
+            await self._send_all(bot, pending[0][0])
+            return
+        for message in _split_digest(f'{title} ({len(pending)})', [line for _, line in pending]):
+            await self._send_all(bot, message)
+
+    async def _send_all(self, bot, message: str):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        try:
+            admin_ids = await self._admin_ids()
+        except Exception as e:
+            self.failed += 1
+            print(f"Ошибка получения списка администраторов: {e}")
+            return
+        await asyncio.gather(*(self._send(bot, admin_id, message) for admin_id in admin_ids))
+
+    async def _send(self, bot, admin_id: int, message: str):
+        async with self._semaphore:
             try:
-                await context.bot.send_message(
-                    chat_id=admin.id,
+                await bot.send_message(
+                    chat_id=admin_id,
                     text=message,
-                    parse_mode='HTML'
+                    parse_mode='HTML',
+                    **priority_args(bot, NOTIFICATION)
                 )
+                self.sent += 1
             except Exception as e:
-                print(f"Ошибка отправки уведомления админу {admin.id}: {e}")
+                self.failed += 1
+                print(f"Ошибка отправки уведомления админу {admin_id}: {e}")
+
+def _split_digest(header: str, lines: list) -> list:
+    """Текст сводки, разбитый на сообщения не длиннее MAX_MESSAGE_LENGTH"""
+    messages = []
+    current = header
+    for line in lines:
+        if len(current) + 1 + len(line) > MAX_MESSAGE_LENGTH:
+            messages.append(current)
+            current = header
+        current += '\n' + line
+    messages.append(current)
+    return messages
+
+admin_notifier = AdminNotifier()
+
+async def notify_admins(context: ContextTypes.DEFAULT_TYPE, message: str, digest: DigestItem = None):
+    """Отправка уведомления всем администраторам (в фоне, не дожидаясь отправки)"""
+    admin_notifier.notify(context.bot, message, digest)
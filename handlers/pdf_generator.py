@@ -8,8 +8,8 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
-from models import TrainReception
-from database import session_scope
+from database import read_session_scope, archive_session_scope
+from repository import get_reception_report, get_archived_reception_report
 
 # Регистрируем шрифт Calibri
 CALIBRI_PATH = "C:/Windows/Fonts/calibri.ttf"
@@ -23,8 +23,12 @@ except:
 
 def generate_reception_pdf(reception_id: int) -> str:
     """Генерирует PDF-отчет о приёмке состава"""
-    with session_scope() as session:
-        reception = session.query(TrainReception).get(reception_id)
+    with read_session_scope() as session, archive_session_scope() as archive_session:
+        # Старые завершённые приёмки могли быть перенесены в архив
+        reception = (
+            get_reception_report(session, reception_id)
+            or get_archived_reception_report(archive_session, reception_id)
+        )
         if not reception:
             raise ValueError("Приёмка не найдена")
         
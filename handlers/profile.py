@@ -1,4 +1,4 @@
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
+from telegram import Update
 from telegram.ext import (
     ContextTypes, 
     CommandHandler, 
@@ -8,16 +8,20 @@ from telegram.ext import (
 )
 
 from models import User, Railway
-from database import session_scope
+from database import async_read_session_scope
+from writer import writer
+from repository import update_profile
+from user_cache import user_cache
 from handlers.common import show_main_menu, cancel
+from handlers.keyboards import RAILWAYS
 
 # Состояния редактирования профиля
 EDIT_NAME, EDIT_POSITION, EDIT_RAILWAY, EDIT_BRANCH = range(4)
 
 async def show_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает профиль пользователя"""
-    with session_scope() as session:
-        user = session.query(User).filter(User.id == update.effective_user.id).first()
+    async with async_read_session_scope() as session:
+        user = await session.get(User, update.effective_user.id)
         if not user:
             await update.message.reply_text(
                 '❌ Ошибка: профиль не найден.\n'
@@ -76,12 +80,9 @@ async def edit_position(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['position'] = position
     
     # Создаем клавиатуру с дорогами
-    keyboard = [[KeyboardButton(railway.value)] for railway in Railway]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    
     await update.message.reply_text(
         '🚂 Выберите вашу дорогу:',
-        reply_markup=reply_markup
+        reply_markup=RAILWAYS
     )
     return EDIT_RAILWAY
 
@@ -109,31 +110,30 @@ async def edit_branch(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return EDIT_BRANCH
     
     try:
-        with session_scope() as session:
-            user = session.query(User).filter(User.id == update.effective_user.id).first()
-            if not user:
-                await update.message.reply_text('❌ Ошибка: пользователь не найден')
-                return ConversationHandler.END
-            
-            # Обновляем данные пользователя
-            user.full_name = context.user_data['full_name']
-            user.position = context.user_data['position']
-            user.railway = context.user_data['railway']
-            user.branch = branch
-            
-            # Сохраняем изменения
-            session.commit()
-            
-            await update.message.reply_text(
-                '✅ Профиль успешно обновлен!\n\n'
-                f'👤 ФИО: {user.full_name}\n'
-                f'💼 Должность: {user.position}\n'
-                f'🚂 Дорога: {user.railway.value}\n'
-                f'🏢 Отделение: {user.branch}'
-            )
-            
-            return await show_main_menu(update, context)
-            
+        # Сохраняем изменения через поток записи, как и остальные записи обработчиков
+        user = await writer.submit(
+            update_profile,
+            update.effective_user.id,
+            context.user_data['full_name'],
+            context.user_data['position'],
+            context.user_data['railway'],
+            branch
+        )
+        if not user:
+            await update.message.reply_text('❌ Ошибка: пользователь не найден')
+            return ConversationHandler.END
+        user_cache.update(user)
+        
+        await update.message.reply_text(
+            '✅ Профиль успешно обновлен!\n\n'
+            f'👤 ФИО: {user.full_name}\n'
+            f'💼 Должность: {user.position}\n'
+            f'🚂 Дорога: {user.railway.value}\n'
+            f'🏢 Отделение: {user.branch}'
+        )
+        
+        return await show_main_menu(update, context)
+        
     except Exception as e:
         print(f"❌ Ошибка при обновлении профиля: {str(e)}")
         await update.message.reply_text(
@@ -151,7 +151,9 @@ edit_profile_handler = ConversationHandler(
         EDIT_RAILWAY: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_railway)],
         EDIT_BRANCH: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_branch)],
     },
-    fallbacks=[CommandHandler('cancel', cancel)]
+    fallbacks=[CommandHandler('cancel', cancel)],
+    name='edit_profile',
+    persistent=True
 )
 
 # Создаем обработчик для кнопки "Мой профиль"
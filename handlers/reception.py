@@ -1,36 +1,70 @@
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
     CommandHandler,
     MessageHandler,
-    CallbackQueryHandler,
     filters
 )
+import html
 from datetime import datetime
 
 from models import User, TrainReception, TrainType, TrainCategory, BlockInTrain
-from database import session_scope
+from database import async_read_session_scope
+from writer import writer
+from repository import (
+    create_reception,
+    get_next_block,
+    mark_block_checked,
+    set_block_result,
+    mark_remaining_ok,
+    get_checklist,
+    get_reception_history
+)
 from handlers.common import show_main_menu, cancel
-from train_blocks import TRAIN_BLOCKS, BLOCK_DESCRIPTIONS, BLOCK_CHECKLIST
+from handlers.keyboards import (
+    RECEPTION_MENU,
+    NEW_RECEPTION_MENU,
+    CANCEL,
+    BACK_TO_MAIN_MENU,
+    TRAIN_CATEGORIES,
+    TRAIN_TYPES
+)
+from checklists import checklist_catalog
+from callbacks import CallbackAction, callback_router, pack_callback
 from handlers.reports import show_reception_report, handle_export_pdf
+from metrics import handler_failed
 
 # Состояния приёмки
-CHOOSE_ACTION, ENTER_TRAIN_NUMBER, CHOOSE_TRAIN_CATEGORY, CHOOSE_TRAIN_TYPE, CHECK_BLOCKS, ENTER_NOTES, VIEW_HISTORY = range(7)
+(CHOOSE_ACTION, ENTER_TRAIN_NUMBER, CHOOSE_TRAIN_CATEGORY, CHOOSE_TRAIN_TYPE, CHECK_BLOCKS, ENTER_NOTES,
+ VIEW_HISTORY, CHECKLIST, CHECKLIST_NOTES) = range(9)
+
+# Число приёмок на одной странице истории
+HISTORY_PAGE_SIZE = 10
+
+# Кнопки списка истории: просмотр, экспорт, возврат и листание по курсору
+HISTORY_ACTIONS = (
+    CallbackAction.HISTORY_VIEW,
+    CallbackAction.HISTORY_OLDER,
+    CallbackAction.HISTORY_NEWER,
+    CallbackAction.HISTORY_BACK,
+    CallbackAction.EXPORT_PDF
+)
+
+# Кнопки сообщения-чек-листа
+CHECKLIST_ACTIONS = (
+    CallbackAction.CHECKLIST_OK,
+    CallbackAction.CHECKLIST_FAIL,
+    CallbackAction.CHECKLIST_REST,
+    CallbackAction.CHECKLIST_DONE
+)
 
 async def start_reception(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало процесса приёмки"""
-    keyboard = [
-        [KeyboardButton('🆕 Новая приёмка')],
-        [KeyboardButton('📋 История приёмок')],
-        [KeyboardButton('↩️ Главное меню')]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    
     await update.message.reply_text(
         '🚂 <b>Приёмка состава</b>\n\n'
         'Выберите действие:',
-        reply_markup=reply_markup,
+        reply_markup=RECEPTION_MENU,
         parse_mode='HTML'
     )
     return CHOOSE_ACTION
@@ -45,24 +79,18 @@ async def handle_reception_choice(update: Update, context: ContextTypes.DEFAULT_
     if choice == '📋 История приёмок':
         return await show_reception_history(update, context)
     
-    if choice == '🆕 Новая приёмка':
-        keyboard = [[KeyboardButton('↩️ Отмена')]]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    if choice in ('🆕 Новая приёмка', '☑️ Приёмка списком'):
+        # В режиме списка все блоки показываются одним сообщением-чек-листом
+        context.user_data['checklist_mode'] = choice == '☑️ Приёмка списком'
         await update.message.reply_text(
             '🔢 Введите номер состава:',
-            reply_markup=reply_markup
+            reply_markup=CANCEL
         )
         return ENTER_TRAIN_NUMBER
     
-    keyboard = [
-        [KeyboardButton('🆕 Новая приёмка')],
-        [KeyboardButton('📋 История приёмок')],
-        [KeyboardButton('↩️ Главное меню')]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
     await update.message.reply_text(
         '⚠️ Пожалуйста, используйте кнопки меню',
-        reply_markup=reply_markup
+        reply_markup=RECEPTION_MENU
     )
     return CHOOSE_ACTION
 
@@ -83,16 +111,9 @@ async def handle_train_number(update: Update, context: ContextTypes.DEFAULT_TYPE
     context.user_data['train_number'] = train_number
     
     # Показываем клавиатуру с категориями составов
-    keyboard = [
-        [KeyboardButton(TrainCategory.ELEKTRICHKA.value), 
-         KeyboardButton(TrainCategory.RAIL_BUS.value)],
-        [KeyboardButton('↩️ Отмена')]
-    ]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    
     await update.message.reply_text(
         'Выберите категорию состава:',
-        reply_markup=reply_markup
+        reply_markup=TRAIN_CATEGORIES
     )
     return CHOOSE_TRAIN_CATEGORY
 
@@ -107,36 +128,16 @@ async def handle_train_category(update: Update, context: ContextTypes.DEFAULT_TY
         train_category = TrainCategory(category)
         context.user_data['train_category'] = train_category  # Сохраняем сам enum, а не его значение
         
-        if train_category == TrainCategory.ELEKTRICHKA:
-            keyboard = [
-                [KeyboardButton(TrainType.EP2D.value), KeyboardButton(TrainType.EP3D.value)],
-                [KeyboardButton('↩️ Назад')]
-            ]
-        else:  # TrainCategory.RAIL_BUS
-            keyboard = [
-                [KeyboardButton(TrainType.RA1.value), KeyboardButton(TrainType.RA2.value), 
-                 KeyboardButton(TrainType.RA3.value)],
-                [KeyboardButton('↩️ Назад')]
-            ]
-        
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
         await update.message.reply_text(
             'Выберите тип состава:',
-            reply_markup=reply_markup
+            reply_markup=TRAIN_TYPES[train_category]
         )
         return CHOOSE_TRAIN_TYPE
         
     except ValueError:
-        keyboard = [
-            [KeyboardButton(TrainCategory.ELEKTRICHKA.value), 
-             KeyboardButton(TrainCategory.RAIL_BUS.value)],
-            [KeyboardButton('↩️ Отмена')]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-        
         await update.message.reply_text(
             '⚠️ Пожалуйста, выберите категорию состава из предложенных вариантов.',
-            reply_markup=reply_markup
+            reply_markup=TRAIN_CATEGORIES
         )
         return CHOOSE_TRAIN_CATEGORY
 
@@ -146,15 +147,9 @@ async def handle_train_type(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if type_text == '↩️ Назад':
         # Возвращаемся к выбору категории
-        keyboard = [
-            [KeyboardButton(TrainCategory.ELEKTRICHKA.value), 
-             KeyboardButton(TrainCategory.RAIL_BUS.value)],
-            [KeyboardButton('↩️ Отмена')]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
         await update.message.reply_text(
             'Выберите категорию состава:',
-            reply_markup=reply_markup
+            reply_markup=TRAIN_CATEGORIES
         )
         return CHOOSE_TRAIN_CATEGORY
     
@@ -168,49 +163,28 @@ async def handle_train_type(update: Update, context: ContextTypes.DEFAULT_TYPE):
         elif train_category == TrainCategory.RAIL_BUS and train_type not in [TrainType.RA1, TrainType.RA2, TrainType.RA3]:
             raise ValueError("Неверный тип для категории Рельсовый автобус")
         
-        # Создаем новую приёмку в БД
-        with session_scope() as session:
-            reception = TrainReception(
-                train_number=context.user_data['train_number'],
-                train_type=train_type,
-                user_id=update.effective_user.id
-            )
-            session.add(reception)
-            session.flush()
-            
-            # Добавляем блоки для проверки
-            blocks = TRAIN_BLOCKS.get(train_type, [])
-            for block_number in blocks:
-                block = BlockInTrain(
-                    reception_id=reception.id,
-                    block_number=block_number
-                )
-                session.add(block)
-            
-            context.user_data['reception_id'] = reception.id
-            context.user_data['current_block_index'] = 0
+        # Создаем новую приёмку в БД вместе с блоками для проверки. Через
+        # поток записи, как и отметки блоков: собственные соединения
+        # обработчиков соперничали бы с ним за блокировку записи SQLite
+        reception_id = await writer.submit(
+            create_reception,
+            context.user_data['train_number'],
+            train_type,
+            update.effective_user.id
+        )
+        
+        context.user_data['reception_id'] = reception_id
+        context.user_data['current_block_index'] = 0
         
+        if context.user_data.get('checklist_mode'):
+            return await show_checklist(update, context)
         return await show_next_block(update, context)
         
     except ValueError as e:
-        keyboard = []
         train_category = context.user_data.get('train_category')
-        if train_category == TrainCategory.ELEKTRICHKA:
-            keyboard = [
-                [KeyboardButton(TrainType.EP2D.value), KeyboardButton(TrainType.EP3D.value)],
-                [KeyboardButton('↩️ Назад')]
-            ]
-        else:
-            keyboard = [
-                [KeyboardButton(TrainType.RA1.value), KeyboardButton(TrainType.RA2.value), 
-                 KeyboardButton(TrainType.RA3.value)],
-                [KeyboardButton('↩️ Назад')]
-            ]
-        
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
         await update.message.reply_text(
             '⚠️ Пожалуйста, выберите тип состава из предложенных вариантов.',
-            reply_markup=reply_markup
+            reply_markup=TRAIN_TYPES.get(train_category, TRAIN_TYPES[TrainCategory.RAIL_BUS])
         )
         return CHOOSE_TRAIN_TYPE
 
@@ -219,60 +193,49 @@ async def show_next_block(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Определяем, откуда пришел запрос
     message = update.callback_query.message if update.callback_query else update.message
     
-    with session_scope() as session:
-        # Получаем текущую приёмку
-        reception = session.query(TrainReception).filter(
-            TrainReception.id == context.user_data['reception_id']
-        ).first()
+    async with async_read_session_scope() as session:
+        # Приёмка и её следующий блок по счётчику прогресса — одним запросом
+        reception, block = await session.run_sync(get_next_block, context.user_data['reception_id'])
         
         if not reception:
             await message.reply_text(
                 '❌ Ошибка: приёмка не найдена',
-                reply_markup=ReplyKeyboardMarkup([[KeyboardButton('↩️ Главное меню')]], 
-                                               resize_keyboard=True)
+                reply_markup=BACK_TO_MAIN_MENU
             )
             return ConversationHandler.END
         
-        # Получаем следующий непроверенный блок
-        block = session.query(BlockInTrain).filter(
-            BlockInTrain.reception_id == reception.id,
-            BlockInTrain.is_checked == False
-        ).first()
-        
         if not block:
             # Все блоки проверены
-            reception.is_completed = True
-            session.commit()
-            
-            keyboard = [
-                [KeyboardButton('🆕 Новая приёмка')],
-                [KeyboardButton('📋 История приёмок')],
-                [KeyboardButton('↩️ Главное меню')]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-            
             await message.reply_text(
                 '✅ Приёмка состава завершена!\n'
+                f'Проверено блоков: {reception.blocks_checked}/{reception.blocks_total}, '
+                f'неисправностей: {reception.faults_found}\n'
                 'Выберите дальнейшее действие:',
-                reply_markup=reply_markup
+                reply_markup=RECEPTION_MENU
             )
             return CHOOSE_ACTION
         
-        # Показываем информацию о блоке
-        block_info = (
-            f'🔍 <b>Проверка блока: {block.block_number}</b>\n\n'
-            f'📝 Описание:\n{BLOCK_DESCRIPTIONS[block.block_number]}\n\n'
-            '✅ Критерии проверки:\n'
-        )
-        
-        for item in BLOCK_CHECKLIST[block.block_number]:
-            block_info += f'• {item}\n'
+        # Подсказка блока заранее собрана по версии каталога, закреплённой за приёмкой
+        prompt = checklist_catalog.prompt(reception.checklist_version, reception.train_type, block.block_number)
+        if prompt is None:
+            await session.run_sync(checklist_catalog.refresh, True)
+            prompt = checklist_catalog.prompt(reception.checklist_version, reception.train_type, block.block_number)
+        if prompt is None:
+            # В закреплённой версии каталога нет этого блока или типа состава
+            await message.reply_text(
+                f'❌ Чек-лист для состава {reception.train_type.value} не настроен '
+                f'(версия {reception.checklist_version}, блок «{block.block_number}»).\n'
+                'Обратитесь к администратору.',
+                reply_markup=BACK_TO_MAIN_MENU
+            )
+            return ConversationHandler.END
+        block_info = prompt.render(reception.blocks_checked + 1, reception.blocks_total)
         
         # Создаем клавиатуру для оценки блока
         keyboard = [
             [
-                InlineKeyboardButton("✅ Исправен", callback_data=f"block_ok_{block.id}"),
-                InlineKeyboardButton("⚠️ Неисправен", callback_data=f"block_fail_{block.id}")
+                InlineKeyboardButton("✅ Исправен", callback_data=pack_callback(CallbackAction.BLOCK_OK, block.id)),
+                InlineKeyboardButton("⚠️ Неисправен", callback_data=pack_callback(CallbackAction.BLOCK_FAIL, block.id))
             ]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -284,113 +247,255 @@ async def show_next_block(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return CHECK_BLOCKS
 
-async def handle_block_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработка результата проверки блока"""
+@callback_router.route(CallbackAction.BLOCK_FAIL)
+async def handle_block_fail(update: Update, context: ContextTypes.DEFAULT_TYPE, block_id: int):
+    """Блок неисправен: запрашиваем комментарий"""
     query = update.callback_query
     await query.answer()
     
-    action, block_id = query.data.split('_')[1:]
-    block_id = int(block_id)
+    async with async_read_session_scope() as session:
+        block = await session.get(BlockInTrain, block_id)
+    if not block:
+        await query.message.reply_text('❌ Ошибка: блок не найден')
+        return ConversationHandler.END
     
-    with session_scope() as session:
-        block = session.query(BlockInTrain).get(block_id)
-        if not block:
-            await query.message.reply_text('❌ Ошибка: блок не найден')
-            return ConversationHandler.END
-        
-        if action == 'fail':
-            # Если блок неисправен, запрашиваем комментарий
-            await query.message.reply_text(
-                '📝 Опишите неисправность:'
-            )
-            context.user_data['current_block_id'] = block_id
-            return ENTER_NOTES
-        else:
-            # Если блок исправен, отмечаем и переходим к следующему
-            block.is_checked = True
-            block.notes = "Исправен"
-            return await show_next_block(update, context)
+    await query.message.reply_text(
+        '📝 Опишите неисправность:'
+    )
+    context.user_data['current_block_id'] = block_id
+    return ENTER_NOTES
+
+@callback_router.route(CallbackAction.BLOCK_OK)
+async def handle_block_ok(update: Update, context: ContextTypes.DEFAULT_TYPE, block_id: int):
+    """Блок исправен: отмечаем (групповой фиксацией) и переходим к следующему"""
+    query = update.callback_query
+    await query.answer()
+    
+    reception_id = await writer.submit(mark_block_checked, block_id, "Исправен")
+    
+    if reception_id is None:
+        # Блок уже отмечен (повторное нажатие на старую кнопку)
+        return CHECK_BLOCKS
+    
+    return await show_next_block(update, context)
 
 async def handle_block_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка комментария о неисправности"""
     notes = update.message.text.strip()
     block_id = context.user_data['current_block_id']
     
-    with session_scope() as session:
-        block = session.query(BlockInTrain).get(block_id)
-        if block:
-            block.is_checked = True
-            block.notes = notes
+    await writer.submit(mark_block_checked, block_id, notes)
     
     return await show_next_block(update, context)
 
+async def build_checklist(reception_id: int):
+    """Текст и клавиатура сообщения-чек-листа приёмки.
+
+    Строка клавиатуры на блок: нажатие на название отмечает блок исправным,
+    ⚠️ — неисправным с замечанием; результат можно переключать. Возвращает
+    (приёмка, текст, клавиатура) или (None, None, None).
+    """
+    async with async_read_session_scope() as session:
+        reception = await session.run_sync(get_checklist, reception_id)
+    if not reception:
+        return None, None, None
+    
+    lines = [
+        f'☑️ <b>Приёмка состава №{html.escape(reception.train_number)}</b> ({reception.train_type.value})',
+        f'Проверено: {reception.blocks_checked}/{reception.blocks_total}, '
+        f'неисправностей: {reception.faults_found}',
+        ''
+    ]
+    keyboard = []
+    for block in reception.blocks:
+        name = html.escape(block.block_number)
+        if not block.is_checked:
+            icon = '⬜'
+            lines.append(f'{icon} {name}')
+        elif block.notes == 'Исправен':
+            icon = '✅'
+            lines.append(f'{icon} {name}')
+        else:
+            icon = '⚠️'
+            lines.append(f'{icon} {name}: <i>{html.escape(block.notes[:100])}</i>')
+        keyboard.append([
+            InlineKeyboardButton(
+                f'{icon} {block.block_number}',
+                callback_data=pack_callback(CallbackAction.CHECKLIST_OK, block.id)
+            ),
+            InlineKeyboardButton('⚠️', callback_data=pack_callback(CallbackAction.CHECKLIST_FAIL, block.id))
+        ])
+    
+    if reception.is_completed:
+        lines.append('\n🏁 Все блоки проверены')
+        keyboard.append([InlineKeyboardButton(
+            '🏁 Завершить', callback_data=pack_callback(CallbackAction.CHECKLIST_DONE, reception.id)
+        )])
+    else:
+        keyboard.append([InlineKeyboardButton(
+            '✅ Остальные исправны', callback_data=pack_callback(CallbackAction.CHECKLIST_REST, reception.id)
+        )])
+    return reception, '\n'.join(lines), InlineKeyboardMarkup(keyboard)
+
+async def show_checklist(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отправляет приёмку одним сообщением-чек-листом"""
+    message = update.callback_query.message if update.callback_query else update.message
+    reception, text, reply_markup = await build_checklist(context.user_data['reception_id'])
+    if not reception:
+        await message.reply_text('❌ Ошибка: приёмка не найдена', reply_markup=BACK_TO_MAIN_MENU)
+        return ConversationHandler.END
+    
+    checklist_message = await message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
+    # Дальше это сообщение только редактируется
+    context.user_data['checklist_message_id'] = checklist_message.message_id
+    return CHECKLIST
+
+@callback_router.route(CallbackAction.CHECKLIST_FAIL)
+async def handle_checklist_fail(update: Update, context: ContextTypes.DEFAULT_TYPE, block_id: int):
+    """⚠️ в чек-листе: запрос замечания к блоку"""
+    query = update.callback_query
+    await query.answer()
+    
+    async with async_read_session_scope() as session:
+        block = await session.get(BlockInTrain, block_id)
+    if not block:
+        return CHECKLIST
+    # Единственное дополнительное сообщение режима — запрос замечания
+    context.user_data['current_block_id'] = block_id
+    await query.message.reply_text(f'📝 Опишите неисправность блока «{block.block_number}»:')
+    return CHECKLIST_NOTES
+
+@callback_router.route(CallbackAction.CHECKLIST_DONE)
+async def handle_checklist_done(update: Update, context: ContextTypes.DEFAULT_TYPE, reception_id: int):
+    """Завершение приёмки списком"""
+    query = update.callback_query
+    await query.answer()
+    
+    # Убираем кнопки, текст чек-листа остаётся итогом приёмки
+    await query.edit_message_reply_markup(reply_markup=None)
+    await query.message.reply_text(
+        '✅ Приёмка состава завершена!\nВыберите дальнейшее действие:',
+        reply_markup=RECEPTION_MENU
+    )
+    return CHOOSE_ACTION
+
+@callback_router.route(CallbackAction.CHECKLIST_OK)
+async def handle_checklist_ok(update: Update, context: ContextTypes.DEFAULT_TYPE, block_id: int):
+    """Нажатие на название блока в чек-листе: блок исправен"""
+    await update.callback_query.answer()
+    reception_id = await writer.submit(set_block_result, block_id, 'Исправен')
+    return await refresh_checklist(update.callback_query, reception_id)
+
+@callback_router.route(CallbackAction.CHECKLIST_REST)
+async def handle_checklist_rest(update: Update, context: ContextTypes.DEFAULT_TYPE, reception_id: int):
+    """«Остальные исправны»: отмечает все непроверенные блоки"""
+    await update.callback_query.answer()
+    reception_id = await writer.submit(mark_remaining_ok, reception_id)
+    return await refresh_checklist(update.callback_query, reception_id)
+
+async def refresh_checklist(query, reception_id: int):
+    """Перерисовывает чек-лист после отметки"""
+    if reception_id is None:
+        # Ничего не изменилось (повторное нажатие) — сообщение не трогаем
+        return CHECKLIST
+    
+    _, text, reply_markup = await build_checklist(reception_id)
+    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+    return CHECKLIST
+
+async def handle_checklist_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Замечание к неисправному блоку чек-листа"""
+    notes = update.message.text.strip()
+    
+    reception_id = await writer.submit(set_block_result, context.user_data['current_block_id'], notes)
+    if reception_id is not None:
+        _, text, reply_markup = await build_checklist(reception_id)
+        await context.bot.edit_message_text(
+            text,
+            chat_id=update.effective_chat.id,
+            message_id=context.user_data['checklist_message_id'],
+            reply_markup=reply_markup,
+            parse_mode='HTML'
+        )
+    return CHECKLIST
+
 async def show_reception_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать историю приёмок"""
     # Отмечаем, откуда пришел пользователь
     context.user_data['from_main_menu'] = update.message.text == '📋 История приёмок'
-    print(f"Opening history from main menu: {context.user_data['from_main_menu']}")  # Отладочный вывод
     
-    with session_scope() as session:
-        # Получаем последние 10 приёмок пользователя
-        receptions = session.query(TrainReception).filter(
-            TrainReception.user_id == update.effective_user.id
-        ).order_by(TrainReception.created_at.desc()).limit(10).all()
-        
-        if not receptions:
-            keyboard = [
-                [KeyboardButton('🆕 Новая приёмка')],
-                [KeyboardButton('↩️ Главное меню')]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-            await update.message.reply_text(
-                '📝 История приёмок пуста.',
-                reply_markup=reply_markup
-            )
-            return CHOOSE_ACTION
-        
-        # Создаем инлайн-кнопки для каждой приёмки
-        keyboard = []
-        for reception in receptions:
-            status = "✅" if reception.is_completed else "🔄"
-            button = InlineKeyboardButton(
-                f"{status} {reception.train_type.value} №{reception.train_number} "
-                f"({reception.created_at.strftime('%d.%m.%Y %H:%M')})",
-                callback_data=f"view_reception_{reception.id}"
-            )
-            keyboard.append([button])
-            print(f"Created button with callback_data: view_reception_{reception.id}")  # Отладочный вывод
-        
-        # Добавляем кнопку возврата
-        keyboard.append([InlineKeyboardButton("↩️ Назад", callback_data="back_to_reception")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
+    receptions, reply_markup = await build_history_page(update.effective_user.id)
+    
+    if not receptions:
         await update.message.reply_text(
-            "📋 История приёмок\nВыберите приёмку для просмотра:",
-            reply_markup=reply_markup
+            '📝 История приёмок пуста.',
+            reply_markup=NEW_RECEPTION_MENU
         )
-        # Возвращаем соответствующее состояние VIEW_HISTORY
-        return 1 if context.user_data.get('from_main_menu') else VIEW_HISTORY
+        return CHOOSE_ACTION
+    
+    await update.message.reply_text(
+        "📋 История приёмок\nВыберите приёмку для просмотра:",
+        reply_markup=reply_markup
+    )
+    # Возвращаем соответствующее состояние VIEW_HISTORY
+    return 1 if context.user_data.get('from_main_menu') else VIEW_HISTORY
+
+async def build_history_page(user_id: int, older_than: tuple = None, newer_than: tuple = None):
+    """Формирует страницу истории приёмок с кнопками листания ◀︎/▶︎.
 
-async def handle_history_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    older_than/newer_than — курсор (created_at, id) из кнопки листания.
+    """
+    async with async_read_session_scope() as session:
+        receptions, has_older, has_newer = await session.run_sync(
+            get_reception_history, user_id, HISTORY_PAGE_SIZE, older_than, newer_than
+        )
+    
+    # Создаем инлайн-кнопки для каждой приёмки
+    keyboard = []
+    for reception in receptions:
+        status = "✅" if reception.is_completed else "🔄"
+        faults = f", ⚠️{reception.faults_found}" if reception.faults_found else ""
+        button = InlineKeyboardButton(
+            f"{status} {reception.train_type.value} №{reception.train_number} "
+            f"({reception.created_at.strftime('%d.%m.%Y %H:%M')}) "
+            f"{reception.blocks_checked}/{reception.blocks_total}{faults}",
+            callback_data=pack_callback(CallbackAction.HISTORY_VIEW, reception.id)
+        )
+        keyboard.append([button])
+    
+    # Кнопки листания несут курсор крайней приёмки страницы
+    navigation = []
+    if receptions and has_newer:
+        first = receptions[0]
+        navigation.append(InlineKeyboardButton(
+            "◀︎", callback_data=pack_callback(CallbackAction.HISTORY_NEWER, first.created_at, first.id)
+        ))
+    if receptions and has_older:
+        last = receptions[-1]
+        navigation.append(InlineKeyboardButton(
+            "▶︎", callback_data=pack_callback(CallbackAction.HISTORY_OLDER, last.created_at, last.id)
+        ))
+    if navigation:
+        keyboard.append(navigation)
+    
+    # Добавляем кнопку возврата
+    keyboard.append([InlineKeyboardButton("↩️ Назад", callback_data=pack_callback(CallbackAction.HISTORY_BACK))])
+    return receptions, InlineKeyboardMarkup(keyboard)
+
+@callback_router.route(*HISTORY_ACTIONS)
+async def handle_history_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, *values):
     """Обработка выбора приёмки из истории"""
     query = update.callback_query
-    print(f"Received callback query: {query}")  # Отладочный вывод
-    print(f"Callback data: {query.data}")  # Отладочный вывод
+    action = context.matches[0].action
     
     try:
         await query.answer()
         
-        if query.data == "back_to_reception":
+        if action == CallbackAction.HISTORY_BACK:
             # Возвращаемся к меню
-            keyboard = [
-                [KeyboardButton('🆕 Новая приёмка')],
-                [KeyboardButton('📋 История приёмок')],
-                [KeyboardButton('↩️ Главное меню')]
-            ]
-            reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
             await query.message.reply_text(
                 '🚂 Выберите действие:',
-                reply_markup=reply_markup
+                reply_markup=RECEPTION_MENU
             )
             # Возвращаем в соответствующее меню в зависимости от источника
             if context.user_data.get('from_main_menu'):
@@ -398,26 +503,32 @@ async def handle_history_selection(update: Update, context: ContextTypes.DEFAULT
                 return ConversationHandler.END
             return CHOOSE_ACTION
         
-        if query.data.startswith('view_reception_'):
+        if action in (CallbackAction.HISTORY_OLDER, CallbackAction.HISTORY_NEWER):
+            # Листаем историю, редактируя сообщение со списком
+            receptions, reply_markup = await build_history_page(
+                update.effective_user.id,
+                older_than=values if action == CallbackAction.HISTORY_OLDER else None,
+                newer_than=values if action == CallbackAction.HISTORY_NEWER else None
+            )
+            if receptions:
+                await query.message.edit_reply_markup(reply_markup=reply_markup)
+            return VIEW_HISTORY
+        
+        if action == CallbackAction.HISTORY_VIEW:
             # Показываем детали выбранной приёмки
-            reception_id = int(query.data.split('_')[2])
-            print(f"Showing reception with ID: {reception_id}")  # Отладочный вывод
+            reception_id, = values
             await show_reception_report(update, context, reception_id)
             # Возвращаем соответствующее состояние VIEW_HISTORY
             return VIEW_HISTORY
         
-        if query.data.startswith('export_pdf_'):
-            # Обработка экспорта в PDF
-            reception_id = int(query.data.split('_')[2])
-            print(f"Exporting reception with ID: {reception_id}")  # Отладочный вывод
-            await handle_export_pdf(update, context)
-            return VIEW_HISTORY
-        
-        print(f"Unknown callback data: {query.data}")  # Отладочный вывод
+        # Экспорт в PDF
+        reception_id, = values
+        await handle_export_pdf(update, context, reception_id)
         return VIEW_HISTORY
         
     except Exception as e:
-        print(f"Error in handle_history_selection: {str(e)}")  # Отладочный вывод
+        print(f"Ошибка обработки истории приёмок ({action.name}): {e}")
+        handler_failed()
         await query.message.reply_text(
             "❌ Произошла ошибка при обработке запроса.\n"
             "Пожалуйста, попробуйте еще раз или начните новую приёмку."
@@ -429,7 +540,7 @@ reception_handler = ConversationHandler(
     entry_points=[MessageHandler(filters.Text(['🚂 Приёмка состава']), start_reception)],
     states={
         CHOOSE_ACTION: [
-            MessageHandler(filters.Text(['🆕 Новая приёмка', '📋 История приёмок']), handle_reception_choice),
+            MessageHandler(filters.Text(['🆕 Новая приёмка', '☑️ Приёмка списком', '📋 История приёмок']), handle_reception_choice),
             MessageHandler(filters.Text(['↩️ Главное меню']), show_main_menu)
         ],
         ENTER_TRAIN_NUMBER: [
@@ -442,14 +553,21 @@ reception_handler = ConversationHandler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, handle_train_type)
         ],
         CHECK_BLOCKS: [
-            CallbackQueryHandler(handle_block_check, pattern=r'^block_(ok|fail)_\d+$'),
+            callback_router.handler(CallbackAction.BLOCK_OK, CallbackAction.BLOCK_FAIL),
             MessageHandler(filters.TEXT & ~filters.COMMAND, handle_block_notes)
         ],
         ENTER_NOTES: [
             MessageHandler(filters.TEXT & ~filters.COMMAND, handle_block_notes)
         ],
+        CHECKLIST: [
+            callback_router.handler(*CHECKLIST_ACTIONS)
+        ],
+        CHECKLIST_NOTES: [
+            callback_router.handler(*CHECKLIST_ACTIONS),
+            MessageHandler(filters.TEXT & ~filters.COMMAND, handle_checklist_notes)
+        ],
         VIEW_HISTORY: [
-            CallbackQueryHandler(handle_history_selection, pattern=r'^(view_reception_\d+|back_to_reception|export_pdf_\d+)$'),
+            callback_router.handler(*HISTORY_ACTIONS),
             MessageHandler(filters.Text(['↩️ Главное меню']), show_main_menu)
         ]
     },
@@ -458,5 +576,7 @@ reception_handler = ConversationHandler(
         MessageHandler(filters.Text(['↩️ Отмена', '↩️ Назад']), cancel),
         MessageHandler(filters.Text(['↩️ Главное меню']), show_main_menu)
     ],
-    allow_reentry=True
+    allow_reentry=True,
+    name='reception',
+    persistent=True
 )
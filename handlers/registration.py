@@ -1,4 +1,4 @@
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
+from telegram import Update
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
@@ -6,10 +6,14 @@ from telegram.ext import (
     MessageHandler,
     filters
 )
-from models import User, UserRole, Railway
-from database import session_scope
+import html
+from models import Railway
+from writer import writer
+from repository import register_user
+from user_cache import user_cache
 from .common import show_main_menu, cancel
-from .notifications import notify_admins
+from .notifications import notify_admins, DigestItem
+from .keyboards import RAILWAYS, REMOVE_KEYBOARD
 
 # Состояния регистрации
 ENTER_FULLNAME, ENTER_POSITION, ENTER_RAILWAY, ENTER_BRANCH, ENTER_PHONE = range(5)
@@ -17,13 +21,12 @@ ENTER_FULLNAME, ENTER_POSITION, ENTER_RAILWAY, ENTER_BRANCH, ENTER_PHONE = range
 async def start_registration(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начало регистрации"""
     # Проверяем, зарегистрирован ли пользователь
-    with session_scope() as session:
-        user = session.query(User).filter(User.id == update.effective_user.id).first()
-        if user:
-            await update.message.reply_text(
-                f'👋 С возвращением, {user.full_name}!'
-            )
-            return await show_main_menu(update, context)
+    user = await user_cache.get(update.effective_user.id)
+    if user:
+        await update.message.reply_text(
+            f'👋 С возвращением, {user.full_name}!'
+        )
+        return await show_main_menu(update, context)
 
     # Если пользователь не зарегистрирован, начинаем регистрацию
     await update.message.reply_text(
@@ -63,12 +66,9 @@ async def process_position(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['position'] = position
     
     # Создаем клавиатуру с дорогами
-    keyboard = [[KeyboardButton(railway.value)] for railway in Railway]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-    
     await update.message.reply_text(
         '🚂 Выберите вашу дорогу:',
-        reply_markup=reply_markup
+        reply_markup=RAILWAYS
     )
     return ENTER_RAILWAY
 
@@ -86,7 +86,7 @@ async def process_railway(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await update.message.reply_text(
         '🏢 Введите ваше отделение:',
-        reply_markup=ReplyKeyboardRemove()
+        reply_markup=REMOVE_KEYBOARD
     )
     return ENTER_BRANCH
 
@@ -115,41 +115,45 @@ async def process_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return ENTER_PHONE
     
-    # Сохраняем данные пользователя
+    # Сохраняем данные пользователя через поток записи: собственная
+    # транзакция обработчика соперничала бы с ним за блокировку записи SQLite
     try:
-        with session_scope() as session:
-            user = User(
-                id=update.effective_user.id,
-                username=update.effective_user.username,
-                full_name=context.user_data['full_name'],
-                position=context.user_data['position'],
-                railway=context.user_data['railway'],
-                branch=context.user_data['branch'],
-                phone=phone,
-                role=UserRole.USER,
-                is_active=True
-            )
-            session.add(user)
-            session.flush()  # Убеждаемся, что у объекта есть все данные
-            
-            # Сохраняем данные пользователя для использования после закрытия сессии
-            user_data = {
-                'full_name': user.full_name,
-                'position': user.position,
-                'railway': user.railway.value,
-                'branch': user.branch,
-                'phone': user.phone
-            }
+        user = await writer.submit(
+            register_user,
+            update.effective_user.id,
+            update.effective_user.username,
+            context.user_data['full_name'],
+            context.user_data['position'],
+            context.user_data['railway'],
+            context.user_data['branch'],
+            phone
+        )
+        user_data = {
+            'full_name': user.full_name,
+            'position': user.position,
+            'railway': user.railway.value,
+            'branch': user.branch,
+            'phone': user.phone
+        }
+        
+        # Запись зафиксирована, обновляем кэш (в нём мог быть сохранён промах)
+        user_cache.update(user)
             
-        # Уведомляем администраторов о новой регистрации
+        # Уведомляем администраторов о новой регистрации (в фоне). Регистрации,
+        # пришедшие в одно окно, собираются в одну сводку
+        escaped = {key: html.escape(value) for key, value in user_data.items()}
         await notify_admins(
             context,
             f'📝 Новая регистрация!\n\n'
-            f'👤 {user_data["full_name"]}\n'
-            f'📋 Должность: {user_data["position"]}\n'
-            f'🚂 Дорога: {user_data["railway"]}\n'
-            f'🏢 Отделение: {user_data["branch"]}\n'
-            f'📱 Телефон: {user_data["phone"]}'
+            f'👤 {escaped["full_name"]}\n'
+            f'📋 Должность: {escaped["position"]}\n'
+            f'🚂 Дорога: {escaped["railway"]}\n'
+            f'🏢 Отделение: {escaped["branch"]}\n'
+            f'📱 Телефон: {escaped["phone"]}',
+            DigestItem(
+                '📝 Новые регистрации',
+                f'👤 {escaped["full_name"]}, {escaped["position"]}, {escaped["branch"]}, {escaped["phone"]}'
+            )
         )
         
         # Отправляем приветственное сообщение
@@ -184,5 +188,7 @@ registration_handler = ConversationHandler(
         ENTER_BRANCH: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_branch)],
         ENTER_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, process_phone)],
     },
-    fallbacks=[CommandHandler('cancel', cancel)]
+    fallbacks=[CommandHandler('cancel', cancel)],
+    name='registration',
+    persistent=True
 )
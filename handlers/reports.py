@@ -1,16 +1,18 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+import asyncio
+import html
 import os
+import time
 
-from models import TrainReception, BlockInTrain
-from database import session_scope
-from train_blocks import BLOCK_DESCRIPTIONS
+from database import async_read_session_scope, async_archive_session_scope
+from repository import get_reception_report, get_archived_reception_report
+from callbacks import CallbackAction, pack_callback
 from handlers.pdf_generator import generate_reception_pdf
+from metrics import PDF_RENDER, handler_failed
 
 async def show_reception_report(update: Update, context: ContextTypes.DEFAULT_TYPE, reception_id: int = None):
     """Показывает подробный отчет о приёмке состава"""
-    print(f"Showing reception report for ID: {reception_id}")  # Отладочный вывод
-    
     if not reception_id and 'reception_id' in context.user_data:
         reception_id = context.user_data['reception_id']
     
@@ -23,15 +25,17 @@ async def show_reception_report(update: Update, context: ContextTypes.DEFAULT_TY
         return
     
     try:
-        with session_scope() as session:
-            reception = session.query(TrainReception).get(reception_id)
+        async with async_read_session_scope() as session, async_archive_session_scope() as archive_session:
+            # Старые завершённые приёмки могли быть перенесены в архив
+            reception = (
+                await session.run_sync(get_reception_report, reception_id)
+                or await archive_session.run_sync(get_archived_reception_report, reception_id)
+            )
             if not reception:
                 message = update.callback_query.message if update.callback_query else update.message
                 await message.reply_text('❌ Ошибка: приёмка не найдена')
                 return
             
-            print(f"Found reception: {reception.train_number}")  # Отладочный вывод
-            
             # Формируем заголовок отчета
             report = (
                 f'📋 <b>Отчет о приёмке состава №{reception.train_number}</b>\n\n'
@@ -47,40 +51,35 @@ async def show_reception_report(update: Update, context: ContextTypes.DEFAULT_TY
             # Добавляем информацию о каждом блоке
             for block in reception.blocks:
                 status = "✅ Исправен" if block.notes == "Исправен" else "⚠️ Неисправен"
-                report += f'\n<b>{block.block_number}</b>: {status}\n'
+                report += f'\n<b>{html.escape(block.block_number)}</b>: {status}\n'
                 if block.notes and block.notes != "Исправен":
                     report += f'📝 Замечания: {block.notes}\n'
             
             # Добавляем кнопку для экспорта в PDF
-            keyboard = [[InlineKeyboardButton("📄 Экспорт в PDF", callback_data=f"export_pdf_{reception_id}")]]
+            keyboard = [[InlineKeyboardButton("📄 Экспорт в PDF", callback_data=pack_callback(CallbackAction.EXPORT_PDF, reception_id))]]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
             message = update.callback_query.message if update.callback_query else update.message
-            print("Sending report message...")  # Отладочный вывод
             await message.reply_text(report, reply_markup=reply_markup, parse_mode='HTML')
-            print("Report sent successfully")  # Отладочный вывод
     
     except Exception as e:
-        print(f"Error in show_reception_report: {str(e)}")  # Отладочный вывод
+        print(f"Ошибка формирования отчёта о приёмке {reception_id}: {e}")
+        handler_failed()
         message = update.callback_query.message if update.callback_query else update.message
         await message.reply_text(
             "❌ Произошла ошибка при формировании отчета.\n"
             "Пожалуйста, попробуйте еще раз или обратитесь к администратору."
         )
 
-async def handle_export_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработка экспорта отчета в PDF"""
+async def handle_export_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE, reception_id: int):
+    """Обработка экспорта отчета в PDF (на нажатие уже ответил вызывающий)"""
     query = update.callback_query
-    await query.answer()
     
     try:
-        # Получаем ID приёмки из callback_data
-        reception_id = int(query.data.split('_')[2])
-        print(f"Generating PDF for reception_id: {reception_id}")
-        
-        # Генерируем PDF
-        filepath = generate_reception_pdf(reception_id)
-        print(f"PDF generated at: {filepath}")
+        # Генерируем PDF в отдельном потоке, чтобы не блокировать цикл событий
+        started = time.perf_counter()
+        filepath = await asyncio.to_thread(generate_reception_pdf, reception_id)
+        PDF_RENDER.labels().observe(time.perf_counter() - started)
         
         # Отправляем файл
         with open(filepath, 'rb') as pdf_file:
@@ -92,12 +91,10 @@ async def handle_export_pdf(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Удаляем временный файл
         os.remove(filepath)
-        print("PDF file sent and removed successfully")
         
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"❌ Ошибка при экспорте в PDF:\n{error_details}")
+        print(f"Ошибка экспорта приёмки {reception_id} в PDF: {e}")
+        handler_failed()
         await query.message.reply_text(
             f'❌ Произошла ошибка при создании PDF:\n{str(e)}'
         )
@@ -1,9 +1,14 @@
 from models import Base
-from database import engine
+from database import engine, session_scope
+from archive import init_archive
+from checklists import seed_checklists
 
 def init_db():
     # Создаем все таблицы
     Base.metadata.create_all(engine)
+    with session_scope() as session:
+        seed_checklists(session)
+    init_archive()
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
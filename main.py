@@ -6,22 +6,29 @@ from telegram.ext import (
     CommandHandler,
     MessageHandler,
     filters,
-    ContextTypes,
-    CallbackQueryHandler
+    ContextTypes
 )
+import asyncio
 import os
 from dotenv import load_dotenv
-from models import Base, User
-from database import engine, Session
-from handlers.registration import registration_handler, start_registration
+from query_profiler import query_profiler
+from user_cache import user_cache
+from writer import writer
+from persistence import SQLitePersistence
+from callbacks import callback_router
+from outbound import OutboundScheduler
+from update_processor import ChatUpdateProcessor
+from webhook import BOT_MODE, run_webhook
+from metrics import InstrumentedRequest, instrument_application, metrics_exporter, registry
+from handlers.registration import registration_handler
 from handlers.common import show_main_menu, cancel
 from handlers.admin import admin_handler
+from handlers.notifications import admin_notifier
 from handlers.profile import profile_handler, edit_profile_handler
 from handlers.reception import (
     reception_handler, 
     show_reception_history,
-    handle_history_selection,
-    VIEW_HISTORY as RECEPTION_VIEW_HISTORY
+    HISTORY_ACTIONS
 )
 
 # Загружаем переменные окружения
@@ -35,51 +42,85 @@ logging.basicConfig(
 
 TOKEN = os.getenv('BOT_TOKEN')
 
+# Адрес своего сервера Bot API (локальный telegram-bot-api, стенд нагрузки);
+# по умолчанию — api.telegram.org
+BOT_API_URL = os.getenv('BOT_API_URL')
+
 VIEW_HISTORY = 1
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /start"""
     # Проверяем, зарегистрирован ли пользователь
-    with Session() as session:
-        user = session.query(User).filter(User.id == update.effective_user.id).first()
-        if user:
-            return await show_main_menu(update, context)
-        else:
-            await update.message.reply_text(
-                '👋 Добро пожаловать! Для начала работы необходимо зарегистрироваться.\n'
-                'Используйте команду /register'
-            )
+    user = await user_cache.get(update.effective_user.id)
+    if user:
+        return await show_main_menu(update, context)
+    else:
+        await update.message.reply_text(
+            '👋 Добро пожаловать! Для начала работы необходимо зарегистрироваться.\n'
+            'Используйте команду /register'
+        )
 
 async def check_user_access(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Проверяет доступ пользователя к боту"""
-    with Session() as session:
-        user = session.query(User).filter(User.id == update.effective_user.id).first()
-        
-        if not user:
-            await update.message.reply_text(
-                "🚫 У вас нет доступа к боту.\n"
-                "Для получения доступа обратитесь к администратору."
-            )
-            return False
-        
-        if user.is_blocked:
-            await update.message.reply_text(
-                "⛔️ Ваш аккаунт заблокирован.\n"
-                "Для разблокировки обратитесь к администратору."
-            )
-            return False
-        
-        return True
+    user = await user_cache.get(update.effective_user.id)
+    
+    if not user:
+        await update.message.reply_text(
+            "🚫 У вас нет доступа к боту.\n"
+            "Для получения доступа обратитесь к администратору."
+        )
+        return False
+    
+    if user.is_blocked:
+        await update.message.reply_text(
+            "⛔️ Ваш аккаунт заблокирован.\n"
+            "Для разблокировки обратитесь к администратору."
+        )
+        return False
+    
+    return True
 
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик всех текстовых сообщений"""
     if not await check_user_access(update, context):
         return ConversationHandler.END
 
-def main():
-    """Основная функция запуска бота"""
-    # Инициализируем бота
-    application = ApplicationBuilder().token(TOKEN).build()
+async def start_metrics(application):
+    """Запускает выгрузку метрик (METRICS_PORT/METRICS_FILE)"""
+    await metrics_exporter.start()
+
+async def stop_notifications(application):
+    """Отправляет накопленные уведомления администраторам, пока бот работает"""
+    await admin_notifier.stop()
+
+async def stop_writer(application):
+    """Дописывает очередь операций записи и последний снимок метрик при остановке бота"""
+    writer.stop()
+    await metrics_exporter.stop()
+
+def build_application():
+    """Собирает приложение бота со всеми обработчиками"""
+    # Инициализируем бота. Состояния диалогов и user_data переживают перезапуск,
+    # обновления разных чатов обрабатываются параллельно (одного чата — по порядку),
+    # исходящие сообщения идут через планировщик с учётом лимитов Telegram
+    # Запросы к Bot API замеряются по методам; пул соединений как у ApplicationBuilder по умолчанию
+    persistence = SQLitePersistence()
+    processor = ChatUpdateProcessor()
+    scheduler = OutboundScheduler()
+    builder = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .request(InstrumentedRequest(connection_pool_size=256))
+        .persistence(persistence)
+        .concurrent_updates(processor)
+        .rate_limiter(scheduler)
+        .post_init(start_metrics)
+        .post_stop(stop_notifications)
+        .post_shutdown(stop_writer)
+    )
+    if BOT_API_URL:
+        builder = builder.base_url(f'{BOT_API_URL}/bot').base_file_url(f'{BOT_API_URL}/file/bot')
+    application = builder.build()
     
     # Добавляем обработчики в правильном порядке
     application.add_handler(CommandHandler("start", start))  # Сначала /start
@@ -97,18 +138,38 @@ def main():
         show_reception_history
     ))
     
-    # Добавляем глобальный обработчик для callback_query
-    application.add_handler(CallbackQueryHandler(
-        handle_history_selection,
-        pattern=r'^(view_reception_\d+|back_to_reception|export_pdf_\d+)$'
-    ))
+    # Добавляем глобальный обработчик для кнопок истории
+    application.add_handler(callback_router.handler(*HISTORY_ACTIONS))
     
     # Добавляем обработчик отмены
     application.add_handler(CommandHandler("cancel", cancel))
     
-    # Запускаем бота
-    print("Бот запущен!")
-    application.run_polling()
+    # Последним — ответ на кнопки, которые никто не обработал
+    application.add_handler(callback_router.stale_handler())
+    
+    # Замер времени и ошибок всех обработчиков, состояние компонентов — в метрики
+    instrument_application(application)
+    registry.register_stats('updates', processor.stats)
+    registry.register_stats('outbound', scheduler.stats, label='priority')
+    registry.register_stats('notifications', admin_notifier.stats)
+    registry.register_stats('writer', writer.stats)
+    registry.register_stats('user_cache', user_cache.stats)
+    registry.register_stats('persistence', persistence.stats)
+    registry.register_stats('db', query_profiler.stats)
+    return application
+
+def main():
+    """Основная функция запуска бота"""
+    application = build_application()
+    
+    # Запускаем бота: webhook (BOT_MODE=webhook) или long polling.
+    # run_polling() сам удаляет webhook, так что переключение работает в обе стороны
+    if BOT_MODE == 'webhook':
+        print("Бот запущен (webhook)!")
+        asyncio.run(run_webhook(application))
+    else:
+        print("Бот запущен!")
+        application.run_polling()
 
 if __name__ == '__main__':
     main()
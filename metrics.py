@@ -0,0 +1,354 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from telegram.ext import ApplicationHandlerStop, ConversationHandler
+from telegram.request import HTTPXRequest
+from callbacks import callback_router
+from query_profiler import query_profiler
+
+# Где отдавать метрики: HTTP-эндпоинт /metrics (METRICS_PORT, 0 — выключен)
+# и/или файл в формате Prometheus, перезаписываемый раз в METRICS_FILE_INTERVAL
+# секунд (для textfile collector node_exporter)
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_FILE = os.getenv('METRICS_FILE')
+METRICS_FILE_INTERVAL = float(os.getenv('METRICS_FILE_INTERVAL', '15'))
+
+# Границы корзин гистограмм, секунд
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PDF_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Границы корзин числа запросов к БД за вызов обработчика
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+class Histogram:
+    """Гистограмма наблюдений: счётчики корзин, сумма и число"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+class Metric:
+    """Семейство метрик с метками; labels() возвращает (и запоминает) ряд"""
+
+    def __init__(self, name: str, help: str, kind: str, label_names: tuple = (), buckets: tuple = None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+
+    def labels(self, *values):
+        series = self._series.get(values)
+        if series is None:
+            series = self._series[values] = Histogram(self.buckets) if self.kind == 'histogram' else Counter()
+        return series
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for values, series in sorted(self._series.items()):
+            labels = _labels(self.label_names, values)
+            if self.kind == 'counter':
+                lines.append(f'{self.name}{_braces(labels)} {series.value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_braces(labels + [_label("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_braces(labels)} {series.sum!r}')
+            lines.append(f'{self.name}_count{_braces(labels)} {series.count}')
+        return lines
+
+class Registry:
+    """Метрики бота и stats() компонентов, снимаемые при выгрузке"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def histogram(self, name: str, help: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Metric:
+        return self._add(Metric(name, help, 'histogram', label_names, buckets))
+
+    def counter(self, name: str, help: str, label_names: tuple = ()) -> Metric:
+        return self._add(Metric(name, help, 'counter', label_names))
+
+    def register_stats(self, component: str, stats, label: str = 'kind'):
+        """Выгружает числа из stats() компонента как bot_<component>_<ключ>.
+
+        Вложенные словари (например, очереди по приоритетам) становятся
+        метками label.
+        """
+        self._collectors.append((component, stats, label))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for component, stats, label in self._collectors:
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"Ошибка сбора метрик {component}: {e}")
+                continue
+            lines.extend(_render_stats(f'bot_{component}', values, label))
+        return '\n'.join(lines) + '\n'
+
+    def _add(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+def _label(name: str, value) -> str:
+    return f'{name}="{_escape(value)}"'
+
+def _labels(names: tuple, values: tuple) -> list:
+    return [_label(name, value) for name, value in zip(names, values)]
+
+def _braces(labels: list) -> str:
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _render_stats(prefix: str, values: dict, label: str) -> list:
+    samples = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            for name, nested in value.items():
+                if isinstance(nested, (int, float)):
+                    samples.setdefault(f'{prefix}_{name}', []).append(('{' + _label(label, key) + '}', nested))
+        elif isinstance(value, (int, float)):
+            samples.setdefault(f'{prefix}_{key}', []).append(('', value))
+    lines = []
+    for name, series in samples.items():
+        lines.append(f'# TYPE {name} gauge')
+        lines.extend(f'{name}{labels} {float(value)!r}' for labels, value in series)
+    return lines
+
+registry = Registry()
+
+HANDLER_LATENCY = registry.histogram(
+    'bot_handler_duration_seconds', 'Время работы обработчика обновления',
+    ('handler', 'conversation', 'state')
+)
+HANDLER_ERRORS = registry.counter(
+    'bot_handler_errors_total', 'Обработчики, завершившиеся ошибкой',
+    ('handler', 'conversation', 'state')
+)
+HANDLER_QUERIES = registry.histogram(
+    'bot_handler_db_queries', 'Запросов к БД за вызов обработчика',
+    ('handler', 'conversation', 'state'), buckets=QUERY_BUCKETS
+)
+API_LATENCY = registry.histogram(
+    'bot_api_request_duration_seconds', 'Время запроса к Bot API', ('method',)
+)
+API_ERRORS = registry.counter(
+    'bot_api_errors_total', 'Запросы к Bot API с ошибкой (исключение или HTTP-статус не 200)',
+    ('method', 'status')
+)
+PDF_RENDER = registry.histogram(
+    'bot_pdf_render_seconds', 'Время построения PDF-отчёта', buckets=PDF_BUCKETS
+)
+
+# Вызов обработчика отмечен как ошибка (см. handler_failed)
+_handler_failed = ContextVar('handler_failed', default=False)
+
+def handler_failed():
+    """Отмечает текущий вызов обработчика как ошибку — для обработчиков,
+    которые сами перехватывают исключение и отвечают пользователю"""
+    _handler_failed.set(True)
+
+def instrument_application(application):
+    """Оборачивает обработчики приложения (включая состояния диалогов)
+    замером времени, ошибок и запросов к БД (query_profiler)"""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            _instrument(handler, '', '')
+
+def _instrument(handler, conversation: str, state: str):
+    if isinstance(handler, ConversationHandler):
+        name = handler.name or ''
+        for child in handler.entry_points:
+            _instrument(child, name, 'entry')
+        for child_state, children in handler.states.items():
+            for child in children:
+                _instrument(child, name, str(child_state))
+        for child in handler.fallbacks:
+            _instrument(child, name, 'fallback')
+        return
+
+    callback = handler.callback
+    if getattr(callback, 'instrumented', False):
+        return
+
+    # Нажатия инлайн-кнопок идут через маршрутизатор — метки по обработчику действия
+    if callback == callback_router.dispatch:
+        routed = {}
+
+        def series(context):
+            action = context.matches[0].action
+            found = routed.get(action)
+            if found is None:
+                found = routed[action] = _series(callback_router.callback(action).__name__, conversation, state)
+            return found
+    else:
+        found = _series(getattr(callback, '__name__', type(callback).__name__), conversation, state)
+
+        def series(context):
+            return found
+
+    async def instrumented(update, context):
+        name, latency, errors, queries = series(context)
+        token = _handler_failed.set(False)
+        log, log_token = query_profiler.begin(getattr(update, 'update_id', None), name)
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except ApplicationHandlerStop:
+            raise
+        except Exception:
+            _handler_failed.set(True)
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+            query_profiler.finish(log, log_token)
+            queries.observe(log.count)
+            if _handler_failed.get():
+                errors.inc()
+            _handler_failed.reset(token)
+
+    instrumented.instrumented = True
+    instrumented.__name__ = getattr(callback, '__name__', 'callback')
+    handler.callback = instrumented
+
+def _series(handler: str, conversation: str, state: str) -> tuple:
+    labels = (handler, conversation, state)
+    return handler, HANDLER_LATENCY.labels(*labels), HANDLER_ERRORS.labels(*labels), HANDLER_QUERIES.labels(*labels)
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest с замером времени запросов к Bot API по методам"""
+
+    async def do_request(self, url, method, request_data=None, read_timeout=HTTPXRequest.DEFAULT_NONE,
+                         write_timeout=HTTPXRequest.DEFAULT_NONE, connect_timeout=HTTPXRequest.DEFAULT_NONE,
+                         pool_timeout=HTTPXRequest.DEFAULT_NONE):
+        api_method = url.rsplit('/', 1)[-1]
+        started = time.perf_counter()
+        try:
+            code, payload = await super().do_request(
+                url, method, request_data, read_timeout, write_timeout, connect_timeout, pool_timeout
+            )
+        except Exception as e:
+            API_LATENCY.labels(api_method).observe(time.perf_counter() - started)
+            API_ERRORS.labels(api_method, type(e).__name__).inc()
+            raise
+        API_LATENCY.labels(api_method).observe(time.perf_counter() - started)
+        if code != 200:
+            API_ERRORS.labels(api_method, str(code)).inc()
+        return code, payload
+
+class MetricsExporter:
+    """Выгрузка метрик: GET /metrics на METRICS_PORT и/или файл METRICS_FILE"""
+
+    def __init__(self, registry: Registry, listen: str = METRICS_LISTEN, port: int = METRICS_PORT,
+                 path: str = METRICS_FILE, interval: float = METRICS_FILE_INTERVAL):
+        self.registry = registry
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.interval = interval
+        self._server = None
+        self._task = None
+        # Периодическая запись идёт в потоке, и отмена задачи её не прерывает:
+        # последняя запись в stop() ждёт, пока та закончится
+        self._write_lock = threading.Lock()
+
+    async def start(self):
+        if self.port:
+            self._server = await asyncio.start_server(self._serve, self.listen, self.port)
+        if self.path:
+            self._task = asyncio.create_task(self._write_periodically())
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            # Последний снимок — с итогами работы до остановки
+            await asyncio.to_thread(self.write)
+
+    def write(self):
+        """Перезаписывает файл метрик целиком (через временный файл)"""
+        with self._write_lock:
+            with tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8', dir=os.path.dirname(os.path.abspath(self.path)),
+                prefix=os.path.basename(self.path) + '.', suffix='.tmp', delete=False
+            ) as f:
+                f.write(self.registry.render())
+            try:
+                # NamedTemporaryFile создаёт файл 0600, а node_exporter читает его от своего пользователя
+                os.chmod(f.name, 0o644)
+                os.replace(f.name, self.path)
+            except OSError:
+                os.unlink(f.name)
+                raise
+
+    async def _write_periodically(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.write)
+            except OSError as e:
+                print(f"Ошибка записи метрик в {self.path}: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 10)
+            while (await asyncio.wait_for(reader.readline(), 10)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = '200 OK', self.registry.render().encode()
+            else:
+                status, body = '404 Not Found', b''
+            writer.write(
+                f'HTTP/1.1 {status}\r\n'
+                f'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                f'Connection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+metrics_exporter = MetricsExporter(registry)
@@ -7,10 +7,11 @@ from sqlalchemy import (
     DateTime, 
     ForeignKey,
     Enum as SQLEnum,
-    Boolean
+    Boolean,
+    Index
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from database import engine
 
 # Создаем базовый класс для моделей
@@ -56,10 +57,23 @@ class UserRole(str, Enum):
 class User(Base):
     """Модель пользователя"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Список пользователей по алфавиту без учёта регистра (поиск по
+        # началу ФИО) и его фильтры; индексы по role/is_blocked обслуживают
+        # и подсчёты статистики
+        Index('ix_users_full_name_lower', 'full_name_lower'),
+        Index('ix_users_role_full_name_lower', 'role', 'full_name_lower'),
+        Index('ix_users_is_blocked_full_name_lower', 'is_blocked', 'full_name_lower'),
+        Index('ix_users_railway_full_name_lower', 'railway', 'full_name_lower'),
+        Index('ix_users_branch_full_name_lower', 'branch', 'full_name_lower'),
+    )
 
     id = Column(Integer, primary_key=True)
     username = Column(String, nullable=True)
     full_name = Column(String, nullable=False)
+    # ФИО в нижнем регистре для сортировки и поиска: lower() SQLite не
+    # переводит кириллицу, поэтому значение считает Python (см. _lower_full_name)
+    full_name_lower = Column(String, nullable=False)
     position = Column(String, nullable=False)
     railway = Column(SQLEnum(Railway), nullable=False)
     branch = Column(String, nullable=False)
@@ -74,10 +88,19 @@ class User(Base):
     @property
     def is_admin(self):
         return self.role == UserRole.ADMIN
+    
+    @validates('full_name')
+    def _lower_full_name(self, key, full_name):
+        self.full_name_lower = full_name.lower()
+        return full_name
 
 class TrainReception(Base):
     """Модель приёмки состава"""
     __tablename__ = 'train_receptions'
+    __table_args__ = (
+        # История приёмок пользователя: user_id + created_at DESC
+        Index('ix_train_receptions_user_id_created_at', 'user_id', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True)
     train_number = Column(String, nullable=False)
@@ -85,20 +108,83 @@ class TrainReception(Base):
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     created_at = Column(DateTime, default=datetime.now)
     is_completed = Column(Boolean, default=False)
+    # Версия каталога чек-листов, по которой созданы блоки и выводятся подсказки
+    checklist_version = Column(Integer, nullable=False, default=1)
+    
+    # Счётчики прогресса, обновляются вместе с отметкой блока
+    blocks_total = Column(Integer, nullable=False, default=0)
+    blocks_checked = Column(Integer, nullable=False, default=0)
+    faults_found = Column(Integer, nullable=False, default=0)
+    next_block_position = Column(Integer, nullable=False, default=0)
     
     # Отношения
     user = relationship("User", back_populates="receptions")
-    blocks = relationship("BlockInTrain", back_populates="reception")
+    blocks = relationship("BlockInTrain", back_populates="reception", order_by="BlockInTrain.position")
 
 class BlockInTrain(Base):
     """Модель блока в составе"""
     __tablename__ = 'blocks_in_train'
+    __table_args__ = (
+        # Поиск следующего непроверенного блока приёмки
+        Index('ix_blocks_in_train_reception_id_is_checked', 'reception_id', 'is_checked'),
+        # Блок по позиции в приёмке (TrainReception.next_block_position)
+        Index('ix_blocks_in_train_reception_id_position', 'reception_id', 'position', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     reception_id = Column(Integer, ForeignKey('train_receptions.id'), nullable=False)
     block_number = Column(String, nullable=False)
+    position = Column(Integer, nullable=False, default=0)
     is_checked = Column(Boolean, default=False)
     notes = Column(String, nullable=True)
     
     # Отношения
     reception = relationship("TrainReception", back_populates="blocks")
+
+class StatCounter(Base):
+    """Счётчик статистики, обновляется в одной транзакции с изменением данных"""
+    __tablename__ = 'stat_counters'
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class ChecklistVersion(Base):
+    """Версия каталога чек-листов. Версии не изменяются: правка — новая версия"""
+    __tablename__ = 'checklist_versions'
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.now)
+    comment = Column(String, nullable=True)
+
+    blocks = relationship("ChecklistBlock", back_populates="version", order_by="ChecklistBlock.position")
+
+class ChecklistBlock(Base):
+    """Блок проверки типа состава в версии каталога"""
+    __tablename__ = 'checklist_blocks'
+    __table_args__ = (
+        Index('ix_checklist_blocks_version_id_train_type_position', 'version_id', 'train_type', 'position', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    version_id = Column(Integer, ForeignKey('checklist_versions.id'), nullable=False)
+    train_type = Column(SQLEnum(TrainType), nullable=False)
+    position = Column(Integer, nullable=False)
+    name = Column(String, nullable=False)
+    description = Column(String, nullable=False)
+
+    version = relationship("ChecklistVersion", back_populates="blocks")
+    items = relationship("ChecklistItem", back_populates="block", order_by="ChecklistItem.position")
+
+class ChecklistItem(Base):
+    """Критерий проверки блока"""
+    __tablename__ = 'checklist_items'
+    __table_args__ = (
+        Index('ix_checklist_items_block_id_position', 'block_id', 'position', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    block_id = Column(Integer, ForeignKey('checklist_blocks.id'), nullable=False)
+    position = Column(Integer, nullable=False)
+    text = Column(String, nullable=False)
+
+    block = relationship("ChecklistBlock", back_populates="items")
@@ -0,0 +1,307 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Optional
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+# Ограничения Telegram: около 30 сообщений в секунду на бота, около одного
+# в секунду в личный чат (с коротким всплеском) и 20 в минуту в группу.
+# Общий лимит взят с запасом: из-за разброса сетевых задержек запросы,
+# выпущенные ровно по 30 в секунду, приходят к Telegram неравномерно
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '28'))
+OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', '1'))
+OUTBOUND_CHAT_BURST = int(os.getenv('OUTBOUND_CHAT_BURST', '3'))
+OUTBOUND_GROUP_PER_MINUTE = float(os.getenv('OUTBOUND_GROUP_PER_MINUTE', '20'))
+
+# Доля общей корзины, которую уведомления и рассылки оставляют ответам
+# пользователям: при непрерывной рассылке ответ не ждёт пополнения корзины
+OUTBOUND_INTERACTIVE_RESERVE = float(os.getenv('OUTBOUND_INTERACTIVE_RESERVE', '0.3'))
+
+# Предел очереди каждого приоритета и число повторов после 429
+OUTBOUND_QUEUE_SIZE = int(os.getenv('OUTBOUND_QUEUE_SIZE', '1000'))
+OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '3'))
+
+# Приоритеты отправки (rate_limit_args методов бота): ответы пользователю,
+# уведомления, массовые рассылки
+INTERACTIVE, NOTIFICATION, BULK = range(3)
+PRIORITY_NAMES = ('interactive', 'notification', 'bulk')
+
+# Методы, на которые распространяются ограничения на сообщения
+_LIMITED_METHODS = ('send', 'edit', 'copy', 'forward')
+# Правки, которые целиком заменяют предыдущую правку того же сообщения тем
+# же методом: из ожидающих в очереди отправляется только последняя
+_COALESCED_METHODS = ('editMessageText', 'editMessageCaption', 'editMessageReplyMarkup', 'editMessageMedia')
+
+# Сколько корзин чатов держать, прежде чем выбросить простаивающие
+_MAX_IDLE_BUCKETS = 10000
+
+class OutboundQueueFull(Exception):
+    """Очередь приоритета заполнена — отправка отклонена"""
+
+class TokenBucket:
+    """Корзина маркеров: rate маркеров в секунду, не больше capacity"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def delay(self, now: float, need: float = 1) -> float:
+        """Через сколько секунд в корзине будет need маркеров (0 — уже есть)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        """Корзина полна — чат давно ничего не получал"""
+        self.delay(now)
+        return self.tokens >= self.capacity
+
+class _Pending:
+    __slots__ = ('chat_id', 'future', 'enqueued_at')
+
+    def __init__(self, chat_id, future, enqueued_at: float):
+        self.chat_id = chat_id
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+# Результат ожидания правки, которую заменила более новая правка того же сообщения
+_SUPERSEDED = object()
+
+def priority_args(bot, priority: int) -> dict:
+    """rate_limit_args для методов бота.
+
+    ExtBot без планировщика отвергает rate_limit_args, поэтому без него
+    (в скриптах и стендах) аргумент не передаётся.
+    """
+    return {'rate_limit_args': priority} if getattr(bot, 'rate_limiter', None) else {}
+
+class OutboundScheduler(BaseRateLimiter[int]):
+    """Планировщик исходящих сообщений с приоритетами.
+
+    Подключается к ApplicationBuilder().rate_limiter(), и через него идут
+    все запросы бота. Отправка сообщения в чат (send*, edit*, copy*,
+    forward*) должна получить маркер из общей корзины бота и из корзины
+    чата; остальные методы (ответы на нажатия, getMe) проходят сразу.
+    Ожидающие запросы стоят в ограниченных очередях по приоритету
+    (rate_limit_args: INTERACTIVE — по умолчанию, NOTIFICATION, BULK), и
+    маркеры выдаются строго по приоритету, а внутри приоритета — по
+    очереди, пропуская чаты, у которых маркеров пока нет. Уведомления и
+    рассылки не берут последние interactive_reserve маркеров общей
+    корзины. Так рассылка не задерживает ответы пользователям, а сообщения
+    одному чату выходят в исходном порядке.
+
+    Правки сообщений расходуют маркеры чата наравне с отправкой. Если
+    правка ещё ждёт в очереди, а приходит новая правка того же сообщения
+    тем же методом, старая не отправляется (её вызов сразу возвращает
+    True, как Bot API для правки): в режиме чек-листа частые нажатия не
+    копят очередь правок, и пользователь быстрее видит итоговое состояние.
+
+    На 429 (RetryAfter) все отправки приостанавливаются на retry_after,
+    и запрос повторяется в своей очереди (до max_retries раз).
+    """
+
+    def __init__(self, global_rate: float = OUTBOUND_GLOBAL_RATE, chat_rate: float = OUTBOUND_CHAT_RATE,
+                 chat_burst: int = OUTBOUND_CHAT_BURST, group_per_minute: float = OUTBOUND_GROUP_PER_MINUTE,
+                 interactive_reserve: float = OUTBOUND_INTERACTIVE_RESERVE,
+                 queue_size: int = OUTBOUND_QUEUE_SIZE, max_retries: int = OUTBOUND_MAX_RETRIES):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_per_minute / 60
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate, time.monotonic())
+        # Сколько маркеров общей корзины нужно для отправки с каждым приоритетом
+        self._global_need = tuple(
+            1 if priority == INTERACTIVE else 1 + global_rate * interactive_reserve
+            for priority in range(len(PRIORITY_NAMES))
+        )
+        self._chats = {}
+        self._lanes = tuple(deque() for _ in PRIORITY_NAMES)
+        # Ожидающие правки: (метод, чат, сообщение) -> _Pending
+        self._edits = {}
+        self._paused_until = 0.0
+        self._wakeup = None
+        self._task = None
+
+        self.retries = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.sent = [0] * len(PRIORITY_NAMES)
+        self.wait_total = [0.0] * len(PRIORITY_NAMES)
+        self.wait_max = [0.0] * len(PRIORITY_NAMES)
+
+    async def initialize(self):
+        # ExtBot инициализирует планировщик при каждом bot.initialize(), а при
+        # polling его вызывают и Application, и Updater
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for lane in self._lanes:
+            while lane:
+                lane.popleft().future.cancel()
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get('chat_id')
+        if chat_id is None or not endpoint.startswith(_LIMITED_METHODS):
+            return await callback(*args, **kwargs)
+
+        priority = INTERACTIVE if rate_limit_args is None else rate_limit_args
+        message_id = data.get('message_id')
+        edit_key = (endpoint, chat_id, message_id) if endpoint in _COALESCED_METHODS and message_id else None
+        for attempt in range(self.max_retries + 1):
+            # Повтор встаёт в начало очереди, чтобы не обогнать следующие сообщения чата
+            if await self._acquire(chat_id, priority, retry=attempt > 0, edit_key=edit_key) is _SUPERSEDED:
+                return True
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self.retries += 1
+                if attempt == self.max_retries:
+                    raise
+                self._pause(float(e.retry_after))
+
+    def stats(self):
+        """Отправлено, ожидание по приоритетам, повторы после 429 и отказы"""
+        return {
+            'retries': self.retries,
+            'rejected': self.rejected,
+            'coalesced': self.coalesced,
+            'chats': len(self._chats),
+            **{
+                name: {
+                    'queued': len(self._lanes[priority]),
+                    'sent': self.sent[priority],
+                    'wait_avg': self.wait_total[priority] / self.sent[priority] if self.sent[priority] else 0.0,
+                    'wait_max': self.wait_max[priority]
+                }
+                for priority, name in enumerate(PRIORITY_NAMES)
+            }
+        }
+
+    async def _acquire(self, chat_id, priority: int, retry: bool = False, edit_key: tuple = None):
+        """Дожидается маркеров для отправки в чат. Для правки (edit_key)
+        возвращает _SUPERSEDED, если её заменила более новая"""
+        previous = self._edits.get(edit_key) if edit_key is not None else None
+        if previous is not None and not previous.future.done():
+            self.coalesced += 1
+            if retry:
+                # Пока правка ждала повтора после 429, пришла более новая
+                return _SUPERSEDED
+            # Диспетчер выбросит заменённую правку из очереди как завершённую
+            previous.future.set_result(_SUPERSEDED)
+
+        now = time.monotonic()
+        # Очереди этого и более срочных приоритетов пусты — отправляем сразу,
+        # не переключаясь на задачу-диспетчер
+        if not any(self._lanes[:priority + 1]) and self._try_take(chat_id, priority, now):
+            self._record(priority, 0.0)
+            return
+
+        lane = self._lanes[priority]
+        if len(lane) >= self.queue_size and not retry:
+            self.rejected += 1
+            raise OutboundQueueFull(f'Очередь {PRIORITY_NAMES[priority]} заполнена ({self.queue_size})')
+        future = asyncio.get_running_loop().create_future()
+        pending = _Pending(chat_id, future, now)
+        if retry:
+            lane.appendleft(pending)
+        else:
+            lane.append(pending)
+        if edit_key is not None:
+            self._edits[edit_key] = pending
+        self._wakeup.set()
+        try:
+            return await future
+        finally:
+            if edit_key is not None and self._edits.get(edit_key) is pending:
+                del self._edits[edit_key]
+
+    def _try_take(self, chat_id, priority: int, now: float) -> bool:
+        if now < self._paused_until or self._global.delay(now, self._global_need[priority]):
+            return False
+        bucket = self._chat_bucket(chat_id, now)
+        if bucket.delay(now):
+            return False
+        self._global.take()
+        bucket.take()
+        return True
+
+    def _chat_bucket(self, chat_id, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= _MAX_IDLE_BUCKETS:
+                self._chats = {
+                    key: value for key, value in self._chats.items() if not value.is_full(now)
+                }
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            else:
+                bucket = TokenBucket(self.group_rate, 1, now)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _record(self, priority: int, waited: float):
+        self.sent[priority] += 1
+        self.wait_total[priority] += waited
+        self.wait_max[priority] = max(self.wait_max[priority], waited)
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._release(time.monotonic())
+            if delay is None:
+                await self._wakeup.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _release(self, now: float) -> Optional[float]:
+        """Выдаёт маркеры ожидающим; возвращает, через сколько проверить снова
+        (None — очереди пусты)"""
+        if now < self._paused_until:
+            return self._paused_until - now if any(self._lanes) else None
+
+        retry_in = None
+        for priority, lane in enumerate(self._lanes):
+            need = self._global_need[priority]
+            index = 0
+            while index < len(lane):
+                pending = lane[index]
+                if pending.future.done():  # Отправитель перестал ждать
+                    del lane[index]
+                    continue
+                global_delay = self._global.delay(now, need)
+                if global_delay:
+                    return global_delay if retry_in is None else min(retry_in, global_delay)
+                bucket = self._chat_bucket(pending.chat_id, now)
+                chat_delay = bucket.delay(now)
+                if chat_delay:
+                    retry_in = chat_delay if retry_in is None else min(retry_in, chat_delay)
+                    index += 1
+                    continue
+                self._global.take()
+                bucket.take()
+                del lane[index]
+                self._record(priority, now - pending.enqueued_at)
+                pending.future.set_result(None)
+        return retry_in
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import pickle
+from collections import defaultdict
+from sqlalchemy import MetaData, Table, Column, String, LargeBinary, select, delete, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from telegram.ext import BasePersistence, PersistenceInput
+
+from database import create_db_engine
+
+# Файл с состояниями диалогов и user_data/chat_data/bot_data бота
+PERSISTENCE_DB_PATH = os.getenv('PERSISTENCE_DB_PATH', 'persistence.db')
+# Как часто изменённые записи сбрасываются на диск (сек)
+PERSISTENCE_INTERVAL = float(os.getenv('PERSISTENCE_INTERVAL', '5'))
+
+metadata = MetaData()
+
+# Одна строка на пользователя, чат или ключ диалога. kind — 'user', 'chat',
+# 'bot', 'callback' или 'conversation:<имя обработчика>'
+persistence_entries = Table(
+    'persistence_entries', metadata,
+    Column('kind', String, primary_key=True),
+    Column('key', String, primary_key=True),
+    Column('data', LargeBinary, nullable=False),
+)
+
+def _conversation_kind(name: str) -> str:
+    return f'conversation:{name}'
+
+class SQLitePersistence(BasePersistence):
+    """Хранение диалогов и данных бота в отдельной базе SQLite.
+
+    В отличие от PicklePersistence, который на каждом сбросе переписывает
+    весь файл, здесь каждая запись — своя строка, и на диск попадают
+    только изменившиеся. Application раз в update_interval вызывает
+    update_* для тронутых пользователей, чатов и диалогов; все вызовы
+    одного прохода собираются в одну транзакцию. Записи, сериализованное
+    содержимое которых не поменялось с последней записи, пропускаются.
+
+    При запуске вся таблица читается одним запросом.
+    """
+
+    def __init__(self, path: str = PERSISTENCE_DB_PATH, update_interval: float = PERSISTENCE_INTERVAL,
+                 store_data: PersistenceInput = None):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.path = path
+        self.commits = 0
+        self.rows_written = 0
+        self._engine = create_db_engine(path)
+        metadata.create_all(self._engine)
+        self._loaded = None
+        # Сериализованное содержимое, которое сейчас лежит в базе
+        self._written = {}
+        # Ожидающие записи: (kind, key) -> bytes, None — удалить строку
+        self._pending = {}
+        self._batch = None
+        self._commit_lock = asyncio.Lock()
+
+    async def get_user_data(self):
+        entries = await self._take_loaded('user')
+        return {int(key): value for key, value in entries.items()}
+
+    async def get_chat_data(self):
+        entries = await self._take_loaded('chat')
+        return {int(key): value for key, value in entries.items()}
+
+    async def get_bot_data(self):
+        entries = await self._take_loaded('bot')
+        return entries.get('', {})
+
+    async def get_callback_data(self):
+        entries = await self._take_loaded('callback')
+        return entries.get('')
+
+    async def get_conversations(self, name: str):
+        entries = await self._take_loaded(_conversation_kind(name))
+        return {tuple(json.loads(key)): state for key, state in entries.items()}
+
+    async def update_conversation(self, name: str, key, new_state):
+        await self._write(_conversation_kind(name), json.dumps(list(key)), new_state)
+
+    async def update_user_data(self, user_id: int, data):
+        await self._write('user', str(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data):
+        await self._write('chat', str(chat_id), data)
+
+    async def update_bot_data(self, data):
+        await self._write('bot', '', data)
+
+    async def update_callback_data(self, data):
+        await self._write('callback', '', data)
+
+    async def drop_user_data(self, user_id: int):
+        await self._write('user', str(user_id), None)
+
+    async def drop_chat_data(self, chat_id: int):
+        await self._write('chat', str(chat_id), None)
+
+    async def refresh_user_data(self, user_id: int, user_data):
+        pass  # Данные меняет только этот процесс, перечитывать нечего
+
+    async def refresh_chat_data(self, chat_id: int, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        """Дописывает оставшиеся записи при остановке бота"""
+        await self._write_pending()
+        self._engine.dispose()
+
+    def stats(self):
+        """Число транзакций и записанных строк"""
+        return {
+            'commits': self.commits,
+            'rows_written': self.rows_written,
+            'pending': len(self._pending)
+        }
+
+    async def _take_loaded(self, kind: str) -> dict:
+        """Отдаёт загруженные записи одного вида (после этого они хранятся в Application)"""
+        if self._loaded is None:
+            self._loaded = await asyncio.to_thread(self._load_all)
+        return self._loaded.pop(kind, {})
+
+    def _load_all(self) -> dict:
+        loaded = defaultdict(dict)
+        with self._engine.connect() as connection:
+            for kind, key, data in connection.execute(select(persistence_entries)):
+                self._written[(kind, key)] = data
+                loaded[kind][key] = pickle.loads(data)
+        return loaded
+
+    async def _write(self, kind: str, key: str, value):
+        data = None if value is None else pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        entry = (kind, key)
+        if entry not in self._pending and self._written.get(entry) == data:
+            return  # Не изменилось с последней записи
+
+        self._pending[entry] = data
+        if self._batch is None:
+            # Задача запустится после остальных update_* этого прохода
+            # Application.update_persistence, и они попадут в ту же пачку
+            self._batch = asyncio.ensure_future(self._write_pending())
+        await asyncio.shield(self._batch)
+
+    async def _write_pending(self):
+        self._batch = None
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        async with self._commit_lock:
+            try:
+                await asyncio.to_thread(self._commit, pending)
+            except Exception:
+                # Вернём записи в очередь, если их ещё не перезаписали более новыми
+                for entry, data in pending.items():
+                    self._pending.setdefault(entry, data)
+                raise
+
+        for entry, data in pending.items():
+            if data is None:
+                self._written.pop(entry, None)
+            else:
+                self._written[entry] = data
+
+    def _commit(self, pending: dict):
+        upserts = [
+            {'kind': kind, 'key': key, 'data': data}
+            for (kind, key), data in pending.items() if data is not None
+        ]
+        deletes = [
+            {'del_kind': kind, 'del_key': key}
+            for (kind, key), data in pending.items() if data is None
+        ]
+
+        with self._engine.begin() as connection:
+            if upserts:
+                statement = sqlite_insert(persistence_entries)
+                connection.execute(statement.on_conflict_do_update(
+                    index_elements=[persistence_entries.c.kind, persistence_entries.c.key],
+                    set_={'data': statement.excluded.data}
+                ), upserts)
+            if deletes:
+                connection.execute(delete(persistence_entries).where(
+                    persistence_entries.c.kind == bindparam('del_kind'),
+                    persistence_entries.c.key == bindparam('del_key')
+                ), deletes)
+
+        self.commits += 1
+        self.rows_written += len(pending)
@@ -0,0 +1,174 @@
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+# Медленный запрос (пишется в журнал с параметрами), мс
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '100'))
+# Сколько запросов к БД допустимо на одно обновление
+DB_UPDATE_QUERY_BUDGET = int(os.getenv('DB_UPDATE_QUERY_BUDGET', '20'))
+# С какого повтора одинаковый запрос в одном обновлении считается N+1
+DB_REPEATED_QUERY_LIMIT = int(os.getenv('DB_REPEATED_QUERY_LIMIT', '3'))
+
+class QueryBudgetExceeded(AssertionError):
+    """Фрагмент выполнил больше запросов, чем допущено, или запрос N+1"""
+
+class QueryLog:
+    """Запросы, выполненные при обработке одного обновления (или внутри
+    expect_queries). Запросы вложенного журнала попадают и во внешний."""
+
+    __slots__ = ('update_id', 'handler', 'statements', 'duration', 'parent')
+
+    def __init__(self, update_id: Optional[int], handler: str, parent: 'QueryLog' = None):
+        self.update_id = update_id
+        self.handler = handler
+        self.statements = []
+        self.duration = 0.0
+        self.parent = parent
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def record(self, statement: str, duration: float):
+        log = self
+        while log is not None:
+            log.statements.append(statement)
+            log.duration += duration
+            log = log.parent
+
+    def repeated(self, limit: int = DB_REPEATED_QUERY_LIMIT) -> list:
+        """Запросы, выполненные не меньше limit раз: (запрос, число)"""
+        return [(statement, count) for statement, count in Counter(self.statements).items() if count >= limit]
+
+    def describe(self) -> str:
+        where = self.handler or 'вне обработчика'
+        return f'{where}, обновление {self.update_id}' if self.update_id is not None else where
+
+# Журнал запросов текущего обновления. asyncio.to_thread, run_sync
+# сессий SQLAlchemy и writer.submit переносят контекст, так что запросы
+# из потоков и greenlet'ов тоже попадают в журнал своего обновления
+_current = ContextVar('query_log', default=None)
+
+class QueryProfiler:
+    """Профилировщик SQL: время каждого запроса и привязка к обновлению.
+
+    Подписывается на before/after_cursor_execute движков. Медленные
+    запросы пишутся в журнал с параметрами. По окончании обновления
+    (finish или выход из scope) проверяются бюджет запросов и повторы
+    одинакового запроса — признак N+1 (ленивая загрузка связи в цикле).
+    О каждом повторе в обработчике сообщается один раз, счётчики растут
+    при каждом.
+    """
+
+    def __init__(self, slow_ms: float = DB_SLOW_QUERY_MS, budget: int = DB_UPDATE_QUERY_BUDGET,
+                 repeated_limit: int = DB_REPEATED_QUERY_LIMIT):
+        self.slow = slow_ms / 1000
+        self.budget = budget
+        self.repeated_limit = repeated_limit
+        self._reported = set()
+
+        self.queries = 0
+        self.unattributed = 0
+        self.slow_queries = 0
+        self.updates = 0
+        self.over_budget = 0
+        self.repeated = 0
+
+    def attach(self, *engines):
+        """Подписывается на запросы движков (синхронных и асинхронных)"""
+        for db_engine in engines:
+            target = getattr(db_engine, 'sync_engine', db_engine)
+            event.listen(target, 'before_cursor_execute', self._before)
+            event.listen(target, 'after_cursor_execute', self._after)
+
+    def begin(self, update_id: Optional[int] = None, handler: str = '') -> tuple:
+        """Начинает журнал обновления; возвращает (журнал, токен) для finish()"""
+        log = QueryLog(update_id, handler, _current.get())
+        return log, _current.set(log)
+
+    def finish(self, log: QueryLog, token):
+        """Закрывает журнал: проверка бюджета и повторов"""
+        _current.reset(token)
+        self._check(log)
+
+    @contextmanager
+    def scope(self, update_id: Optional[int] = None, handler: str = ''):
+        """Относит запросы внутри блока к обновлению и обработчику"""
+        log, token = self.begin(update_id, handler)
+        try:
+            yield log
+        finally:
+            self.finish(log, token)
+
+    def stats(self):
+        """Запросов всего и вне обновлений, медленных, обновлений сверх бюджета и с N+1"""
+        return {
+            'queries': self.queries,
+            'unattributed': self.unattributed,
+            'slow': self.slow_queries,
+            'updates': self.updates,
+            'over_budget': self.over_budget,
+            'repeated': self.repeated
+        }
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['query_started'].pop()
+        self.queries += 1
+        log = _current.get()
+        if log is None:
+            # BEGIN/COMMIT пачек writer, persistence, скрипты
+            self.unattributed += 1
+        else:
+            log.record(statement, duration)
+        if duration >= self.slow:
+            self.slow_queries += 1
+            print(
+                f"Медленный запрос {duration * 1000:.0f} мс ({log.describe() if log else 'вне обработчика'}): "
+                f"{' '.join(statement.split())} {parameters!r}"
+            )
+
+    def _check(self, log: QueryLog):
+        self.updates += 1
+        if log.count > self.budget:
+            self.over_budget += 1
+            print(f"Превышен бюджет запросов ({log.describe()}): {log.count} > {self.budget}")
+        if log.count < self.repeated_limit:
+            return
+        for statement, count in log.repeated(self.repeated_limit):
+            self.repeated += 1
+            if (log.handler, statement) not in self._reported:
+                self._reported.add((log.handler, statement))
+                print(
+                    f"Повторяющийся запрос ×{count}, возможно N+1 ({log.describe()}): "
+                    f"{' '.join(statement.split())}"
+                )
+
+query_profiler = QueryProfiler()
+
+@contextmanager
+def expect_queries(max_queries: int, name: str = '', repeated_limit: int = DB_REPEATED_QUERY_LIMIT):
+    """Для проверок (check_queries.py): не больше max_queries запросов
+    внутри блока и без повторов N+1, иначе QueryBudgetExceeded"""
+    log = QueryLog(None, name, _current.get())
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+    problems = []
+    if log.count > max_queries:
+        problems.append(f'{log.count} запросов, допустимо {max_queries}')
+    problems.extend(
+        f'запрос ×{count}: {" ".join(statement.split())}'
+        for statement, count in log.repeated(repeated_limit)
+    )
+    if problems:
+        statements = '\n'.join(f'    {" ".join(statement.split())}' for statement in log.statements)
+        raise QueryBudgetExceeded(f'{name}: {"; ".join(problems)}\n{statements}')
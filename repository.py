@@ -0,0 +1,390 @@
+from datetime import datetime
+from sqlalchemy import insert, select, update, func, and_, tuple_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session as OrmSession, joinedload, selectinload
+
+from models import TrainReception, BlockInTrain, TrainType, User, UserRole
+from checklists import checklist_catalog
+from stats import (
+    increment_counters,
+    receptions_day_counter,
+    USERS_TOTAL,
+    USERS_ADMIN,
+    USERS_BLOCKED,
+    RECEPTIONS_TOTAL,
+    RECEPTIONS_OPEN,
+    RECEPTIONS_FAULTY
+)
+
+def create_receptions(session: OrmSession, receptions: list) -> list:
+    """Создаёт приёмки вместе с их блоками двумя пакетными INSERT.
+
+    receptions — список словарей с ключами train_number, train_type, user_id
+    (и, при импорте, created_at / is_completed / checklist_version). Блоки
+    берутся из текущей версии каталога чек-листов, и приёмка закрепляет её
+    за собой. Приёмки вставляются одним
+    INSERT ... RETURNING, блоки всех приёмок — одним executemany, всё в
+    транзакции переданной сессии. Вставки идут по таблицам, минуя пакетный
+    режим ORM: на одну приёмку его подготовка дороже самих INSERT.
+    Возвращает id приёмок в исходном порядке.
+
+    Функция синхронная, чтобы её могли использовать и скрипты импорта через
+    session_scope(), и обработчики через writer.submit().
+    """
+    if not receptions:
+        return []
+
+    # Не чаще интервала проверяет, не опубликована ли новая версия каталога
+    checklist_catalog.refresh(session)
+    receptions = [
+        {'checklist_version': checklist_catalog.current_version, **reception}
+        for reception in receptions
+    ]
+    block_names = [
+        checklist_catalog.blocks(reception['train_type'], reception['checklist_version'])
+        for reception in receptions
+    ]
+    # Приёмка типа без блоков завершена сразу: mark_block_checked её
+    # никогда не закроет, и она навсегда осталась бы в открытых
+    receptions = [
+        {**reception, 'is_completed': bool(reception.get('is_completed')) or not names}
+        for reception, names in zip(receptions, block_names)
+    ]
+
+    # Core-вставке нужны одинаковые ключи во всех строках, поэтому
+    # created_at задаётся явно (он же нужен для счётчика дня)
+    now = datetime.now()
+    receptions = [
+        {'blocks_total': len(names), **reception, 'created_at': reception.get('created_at') or now}
+        for reception, names in zip(receptions, block_names)
+    ]
+    receptions_table = TrainReception.__table__
+    reception_ids = session.scalars(
+        insert(receptions_table).returning(receptions_table.c.id, sort_by_parameter_order=True),
+        receptions
+    ).all()
+
+    blocks = [
+        {
+            'reception_id': reception_id,
+            'block_number': block_number,
+            'position': position,
+            'is_checked': False
+        }
+        for reception_id, names in zip(reception_ids, block_names)
+        for position, block_number in enumerate(names)
+    ]
+    if blocks:
+        session.execute(insert(BlockInTrain.__table__), blocks)
+
+    counters = {
+        RECEPTIONS_TOTAL: len(reception_ids),
+        RECEPTIONS_OPEN: sum(1 for reception in receptions if not reception['is_completed'])
+    }
+    for reception in receptions:
+        day = receptions_day_counter(reception['created_at'].date())
+        counters[day] = counters.get(day, 0) + 1
+    increment_counters(session, counters)
+
+    return list(reception_ids)
+
+def create_reception(session: OrmSession, train_number: str, train_type: TrainType, user_id: int) -> int:
+    """Создаёт одну приёмку со всеми блоками её типа и возвращает её id"""
+    return create_receptions(session, [{
+        'train_number': train_number,
+        'train_type': train_type,
+        'user_id': user_id
+    }])[0]
+
+def get_next_block(session: OrmSession, reception_id: int):
+    """Возвращает (приёмка, следующий блок) одним запросом по счётчикам приёмки.
+
+    Блок равен None, если все блоки проверены. Если приёмка не найдена,
+    возвращает (None, None).
+    """
+    row = session.execute(
+        select(TrainReception, BlockInTrain)
+        .outerjoin(BlockInTrain, and_(
+            BlockInTrain.reception_id == TrainReception.id,
+            BlockInTrain.position == TrainReception.next_block_position
+        ))
+        .filter(TrainReception.id == reception_id)
+    ).first()
+    return (row[0], row[1]) if row else (None, None)
+
+def mark_block_checked(session: OrmSession, block_id: int, notes: str):
+    """Отмечает блок проверенным и атомарно обновляет счётчики приёмки.
+
+    Блоки можно отмечать в любом порядке (режим чек-листа): следующим
+    становится первый непроверенный по позиции. Повторная отметка уже
+    проверенного блока (двойное нажатие) ничего не меняет. Возвращает id
+    приёмки или None, если блок не найден или уже был проверен.
+    """
+    row = session.execute(
+        update(BlockInTrain)
+        .filter(BlockInTrain.id == block_id, BlockInTrain.is_checked == False)
+        .values(is_checked=True, notes=notes)
+        .returning(BlockInTrain.reception_id, BlockInTrain.position)
+    ).first()
+    if not row:
+        return None
+
+    reception_id, position = row
+    is_fault = notes != "Исправен"
+    blocks_checked, blocks_total, faults_found = session.execute(
+        update(TrainReception)
+        .filter(TrainReception.id == reception_id)
+        .values(
+            blocks_checked=TrainReception.blocks_checked + 1,
+            faults_found=TrainReception.faults_found + (1 if is_fault else 0),
+            next_block_position=_first_unchecked_position(reception_id),
+            is_completed=TrainReception.blocks_checked + 1 >= TrainReception.blocks_total
+        )
+        .returning(
+            TrainReception.blocks_checked,
+            TrainReception.blocks_total,
+            TrainReception.faults_found
+        )
+        .execution_options(synchronize_session=False)
+    ).one()
+
+    # Приёмка завершилась или получила первую неисправность
+    increment_counters(session, {
+        RECEPTIONS_OPEN: -1 if blocks_checked == blocks_total else 0,
+        RECEPTIONS_FAULTY: 1 if is_fault and faults_found == 1 else 0
+    })
+    return reception_id
+
+def set_block_result(session: OrmSession, block_id: int, notes: str):
+    """Ставит или меняет результат проверки блока (переключатели чек-листа).
+
+    Непроверенный блок отмечается как в mark_block_checked(). У проверенного
+    меняются замечания, а при переходе «исправен» <-> «неисправен» —
+    счётчик неисправностей приёмки. Возвращает id приёмки или None, если
+    блок не найден или результат не изменился.
+    """
+    reception_id = mark_block_checked(session, block_id, notes)
+    if reception_id is not None:
+        return reception_id
+
+    row = session.execute(
+        select(BlockInTrain.reception_id, BlockInTrain.notes)
+        .filter(BlockInTrain.id == block_id, BlockInTrain.is_checked == True)
+    ).first()
+    if not row or row.notes == notes:
+        return None
+
+    reception_id, old_notes = row
+    session.execute(
+        update(BlockInTrain)
+        .filter(BlockInTrain.id == block_id)
+        .values(notes=notes)
+        .execution_options(synchronize_session=False)
+    )
+    delta = (notes != "Исправен") - (old_notes != "Исправен")
+    if delta:
+        faults_found = session.execute(
+            update(TrainReception)
+            .filter(TrainReception.id == reception_id)
+            .values(faults_found=TrainReception.faults_found + delta)
+            .returning(TrainReception.faults_found)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+        # Приёмка получила первую неисправность или лишилась последней
+        if faults_found == (1 if delta > 0 else 0):
+            increment_counters(session, {RECEPTIONS_FAULTY: delta})
+    return reception_id
+
+def mark_remaining_ok(session: OrmSession, reception_id: int):
+    """Отмечает все непроверенные блоки приёмки исправными одним UPDATE.
+
+    Возвращает id приёмки или None, если непроверенных блоков не было.
+    """
+    checked = session.execute(
+        update(BlockInTrain)
+        .filter(BlockInTrain.reception_id == reception_id, BlockInTrain.is_checked == False)
+        .values(is_checked=True, notes="Исправен")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not checked:
+        return None
+
+    session.execute(
+        update(TrainReception)
+        .filter(TrainReception.id == reception_id)
+        .values(
+            blocks_checked=TrainReception.blocks_checked + checked,
+            next_block_position=TrainReception.blocks_total,
+            is_completed=True
+        )
+        .execution_options(synchronize_session=False)
+    )
+    increment_counters(session, {RECEPTIONS_OPEN: -1})
+    return reception_id
+
+def get_checklist(session: OrmSession, reception_id: int):
+    """Приёмка с упорядоченными блоками для сообщения-чек-листа (два запроса)"""
+    return session.get(TrainReception, reception_id, options=[selectinload(TrainReception.blocks)])
+
+def _first_unchecked_position(reception_id: int):
+    """Позиция первого непроверенного блока приёмки (blocks_total, если их нет)"""
+    return func.coalesce(
+        select(func.min(BlockInTrain.position))
+        .filter(BlockInTrain.reception_id == reception_id, BlockInTrain.is_checked == False)
+        .scalar_subquery(),
+        TrainReception.blocks_total
+    )
+
+def get_reception_report(session: OrmSession, reception_id: int):
+    """Загружает приёмку с проверяющим и упорядоченными блоками для отчёта.
+
+    Ровно два запроса: приёмка вместе с пользователем (JOIN) и блоки
+    (SELECT ... IN). Используется текстовым отчётом и PDF-генератором.
+    """
+    return session.get(
+        TrainReception,
+        reception_id,
+        options=[joinedload(TrainReception.user), selectinload(TrainReception.blocks)]
+    )
+
+def get_archived_reception_report(archive_session: OrmSession, reception_id: int):
+    """Приёмка для отчёта из архивной базы, как get_reception_report.
+
+    Пока архивации не было, файла archive.db или его таблиц нет — тогда
+    приёмка считается не найденной (None).
+    """
+    try:
+        return get_reception_report(archive_session, reception_id)
+    except OperationalError:
+        return None
+
+def get_reception_history(session: OrmSession, user_id: int, limit: int, older_than: tuple = None, newer_than: tuple = None):
+    """Страница истории приёмок пользователя с пагинацией по ключу (created_at, id).
+
+    older_than/newer_than — курсоры (created_at, id) крайних приёмок страницы.
+    Стоимость запроса не зависит от номера страницы: это поиск по индексу
+    (user_id, created_at), а не OFFSET. Возвращает (приёмки от новых к старым, есть_старее, есть_новее).
+    """
+    key = tuple_(TrainReception.created_at, TrainReception.id)
+    query = select(TrainReception).filter(TrainReception.user_id == user_id)
+
+    if newer_than:
+        query = query.filter(key > tuple_(*newer_than)).order_by(
+            TrainReception.created_at, TrainReception.id
+        )
+    else:
+        if older_than:
+            query = query.filter(key < tuple_(*older_than))
+        query = query.order_by(TrainReception.created_at.desc(), TrainReception.id.desc())
+
+    receptions = session.scalars(query.limit(limit + 1)).all()
+    has_more = len(receptions) > limit
+    receptions = list(receptions[:limit])
+
+    if newer_than:
+        receptions.reverse()
+        return receptions, True, has_more
+    return receptions, has_more, bool(older_than)
+
+def get_users_page(session: OrmSession, limit: int, after: tuple = None, before: tuple = None,
+                   blocked: bool = None, admin: bool = None, railway=None, branch: str = None,
+                   prefix: str = None):
+    """Страница списка пользователей по алфавиту с пагинацией по ключу (full_name_lower, id).
+
+    after/before — курсор (ФИО в нижнем регистре, id) крайнего пользователя
+    соседней страницы. Если ФИО в курсоре нет (None: старые кнопки или
+    ФИО не поместилось в callback_data), оно читается по id отдельным
+    запросом. Поиск по началу ФИО без учёта регистра выполняется
+    диапазоном по индексу. Возвращает (пользователи, есть_следующая,
+    есть_предыдущая).
+    """
+    query = select(User)
+    if blocked is not None:
+        query = query.filter(User.is_blocked == blocked)
+    if admin is not None:
+        query = query.filter(User.role == UserRole.ADMIN if admin else User.role != UserRole.ADMIN)
+    if railway is not None:
+        query = query.filter(User.railway == railway)
+    if branch:
+        query = query.filter(User.branch == branch)
+    if prefix:
+        prefix = prefix.lower()
+        query = query.filter(User.full_name_lower >= prefix, User.full_name_lower < prefix + '\uffff')
+
+    key = tuple_(User.full_name_lower, User.id)
+    cursor = before or after
+    if cursor and cursor[0] is None:
+        name = session.scalar(select(User.full_name_lower).filter(User.id == cursor[1]))
+        cursor = (name, cursor[1]) if name is not None else None
+
+    if before and cursor:
+        query = query.filter(key < tuple_(*cursor)).order_by(User.full_name_lower.desc(), User.id.desc())
+    else:
+        if after and cursor:
+            query = query.filter(key > tuple_(*cursor))
+        query = query.order_by(User.full_name_lower, User.id)
+
+    users = session.scalars(query.limit(limit + 1)).all()
+    has_more = len(users) > limit
+    users = list(users[:limit])
+
+    if before and cursor:
+        users.reverse()
+        return users, True, has_more
+    return users, has_more, bool(after and cursor)
+
+def register_user(session: OrmSession, user_id: int, username: str, full_name: str, position: str,
+                  railway, branch: str, phone: str) -> User:
+    """Создаёт пользователя с ролью USER и учитывает его в счётчиках.
+
+    Как и остальные операции записи обработчиков, выполняется через
+    writer.submit(); возвращённая строка остаётся читаемой после фиксации.
+    """
+    user = User(
+        id=user_id,
+        username=username,
+        full_name=full_name,
+        position=position,
+        railway=railway,
+        branch=branch,
+        phone=phone,
+        role=UserRole.USER,
+        is_active=True
+    )
+    session.add(user)
+    session.flush()
+    increment_counters(session, {USERS_TOTAL: 1})
+    return user
+
+def update_profile(session: OrmSession, user_id: int, full_name: str, position: str, railway, branch: str):
+    """Сохраняет профиль пользователя. Возвращает пользователя или None, если его нет"""
+    user = session.get(User, user_id)
+    if user is None:
+        return None
+    user.full_name = full_name
+    user.position = position
+    user.railway = railway
+    user.branch = branch
+    session.flush()
+    return user
+
+def set_user_admin(session: OrmSession, user_id: int):
+    """Назначает пользователя администратором. Возвращает пользователя или None"""
+    user = session.get(User, user_id)
+    if user is None:
+        return None
+    # Счётчики меняем только при реальной смене статуса
+    increment_counters(session, {USERS_ADMIN: 0 if user.is_admin else 1})
+    user.role = UserRole.ADMIN
+    session.flush()
+    return user
+
+def set_user_blocked(session: OrmSession, user_id: int, blocked: bool):
+    """Блокирует или разблокирует пользователя. Возвращает пользователя или None"""
+    user = session.get(User, user_id)
+    if user is None:
+        return None
+    increment_counters(session, {USERS_BLOCKED: int(blocked) - int(bool(user.is_blocked))})
+    user.is_blocked = blocked
+    session.flush()
+    return user
@@ -0,0 +1,117 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, func, case, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session as OrmSession
+
+from models import StatCounter, User, UserRole, TrainReception
+from database import archive_session_scope
+
+# Имена счётчиков
+USERS_TOTAL = 'users_total'
+USERS_ADMIN = 'users_admin'
+USERS_BLOCKED = 'users_blocked'
+RECEPTIONS_TOTAL = 'receptions_total'
+RECEPTIONS_OPEN = 'receptions_open'
+RECEPTIONS_FAULTY = 'receptions_faulty'
+
+# Одна инструкция на все вызовы: executemany по таблице берётся из кэша
+# компиляции, а VALUES на N строк компилировался бы заново каждый раз
+_counters_upsert = sqlite_insert(StatCounter.__table__)
+_counters_upsert = _counters_upsert.on_conflict_do_update(
+    index_elements=[StatCounter.__table__.c.name],
+    set_={'value': StatCounter.__table__.c.value + _counters_upsert.excluded.value}
+)
+
+def receptions_day_counter(day: date) -> str:
+    """Имя счётчика приёмок, созданных в указанный день"""
+    return f'receptions_day_{day.isoformat()}'
+
+def increment_counters(session: OrmSession, deltas: dict):
+    """Атомарно прибавляет значения к счётчикам в транзакции переданной сессии.
+
+    Вызывается рядом с изменением данных (регистрация, блокировка, смена
+    роли, приёмки), поэтому счётчики фиксируются или откатываются вместе
+    с ними.
+    """
+    rows = [{'name': name, 'value': value} for name, value in deltas.items() if value]
+    if rows:
+        session.execute(_counters_upsert, rows)
+
+def get_statistics(session: OrmSession, today: date = None) -> dict:
+    """Читает статистику из счётчиков одним запросом фиксированного размера"""
+    today = today or datetime.now().date()
+    week_days = [today - timedelta(days=offset) for offset in range(today.weekday() + 1)]
+    names = [
+        USERS_TOTAL, USERS_ADMIN, USERS_BLOCKED,
+        RECEPTIONS_TOTAL, RECEPTIONS_OPEN, RECEPTIONS_FAULTY
+    ] + [receptions_day_counter(day) for day in week_days]
+
+    values = dict(session.execute(
+        select(StatCounter.name, StatCounter.value).filter(StatCounter.name.in_(names))
+    ).all())
+
+    return {
+        'users_total': values.get(USERS_TOTAL, 0),
+        'users_admin': values.get(USERS_ADMIN, 0),
+        'users_blocked': values.get(USERS_BLOCKED, 0),
+        'users_active': values.get(USERS_TOTAL, 0) - values.get(USERS_BLOCKED, 0),
+        'receptions_total': values.get(RECEPTIONS_TOTAL, 0),
+        'receptions_open': values.get(RECEPTIONS_OPEN, 0),
+        'receptions_faulty': values.get(RECEPTIONS_FAULTY, 0),
+        'receptions_today': values.get(receptions_day_counter(today), 0),
+        'receptions_week': sum(values.get(receptions_day_counter(day), 0) for day in week_days),
+    }
+
+def _reception_counts(session: OrmSession):
+    """Всего, незавершённых и с неисправностями приёмок, а также число по дням"""
+    receptions = session.execute(select(
+        func.count(),
+        func.coalesce(func.sum(case((TrainReception.is_completed == True, 0), else_=1)), 0),
+        func.coalesce(func.sum(case((TrainReception.faults_found > 0, 1), else_=0)), 0)
+    )).one()
+    days = session.execute(
+        select(func.date(TrainReception.created_at), func.count())
+        .group_by(func.date(TrainReception.created_at))
+    ).all()
+    return tuple(receptions), days
+
+def rebuild_counters(session: OrmSession):
+    """Пересчитывает все счётчики по таблицам.
+
+    Пользователи и приёмки считаются одним агрегирующим проходом по каждой
+    таблице. Приёмки, перенесённые в архив (archive.py), остаются в
+    счётчиках, поэтому считаются и в archive.db, если он есть: так
+    пересчёт совпадает с накопленными счётчиками. Нужен для начального
+    заполнения и для сверки.
+    """
+    users = session.execute(select(
+        func.count(),
+        func.coalesce(func.sum(case((User.role == UserRole.ADMIN, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((User.is_blocked == True, 1), else_=0)), 0)
+    )).one()
+    receptions, days = _reception_counts(session)
+    with archive_session_scope() as archive_session:
+        try:
+            archived, archived_days = _reception_counts(archive_session)
+        except OperationalError:
+            # Архивации ещё не было
+            archived, archived_days = (0, 0, 0), []
+
+    counters = {
+        USERS_TOTAL: users[0],
+        USERS_ADMIN: users[1],
+        USERS_BLOCKED: users[2],
+        RECEPTIONS_TOTAL: receptions[0] + archived[0],
+        RECEPTIONS_OPEN: receptions[1] + archived[1],
+        RECEPTIONS_FAULTY: receptions[2] + archived[2],
+    }
+    for day, count in days + archived_days:
+        if day:
+            name = receptions_day_counter(date.fromisoformat(day))
+            counters[name] = counters.get(name, 0) + count
+
+    session.execute(delete(StatCounter))
+    session.execute(sqlite_insert(StatCounter).values(
+        [{'name': name, 'value': value} for name, value in counters.items()]
+    ))
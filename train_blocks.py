@@ -1,5 +1,9 @@
 from models import TrainType
 
+# Первая версия каталога чек-листов. Она заполняется миграцией и init_db.py,
+# дальше каталог меняется публикацией новых версий (python checklists.py),
+# а не правкой этого файла — см. checklists.py
+
 # Блоки для проверки каждого типа состава
 TRAIN_BLOCKS = {
     # Электрички
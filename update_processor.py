@@ -0,0 +1,138 @@
+import asyncio
+import os
+import time
+from collections import deque
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Сколько обработчиков выполняется одновременно
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '16'))
+
+# Предел семафора Application: обновления не должны ждать на нём, иначе
+# ожидающие своего чата занимали бы места обработчиков
+_UNBOUNDED = 2 ** 31
+
+def _chat_key(update: object):
+    """Чат, в пределах которого обновления обрабатываются по порядку
+    (None — обновление ни к какому чату не относится)"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return None
+
+class ChatUpdateProcessor(BaseUpdateProcessor):
+    """Параллельная обработка обновлений с сохранением порядка в чате.
+
+    Подключается к ApplicationBuilder().concurrent_updates(). Обновления
+    разных чатов обрабатываются одновременно (не больше concurrency), а
+    обновления одного чата — строго по одному в порядке поступления: пока
+    обрабатывается предыдущее, следующее ждёт в очереди чата, не занимая
+    места обработчика. Так ConversationHandler видит состояние диалога
+    после предыдущего нажатия, а PDF или медленная запись одного
+    инспектора не задерживают остальных.
+
+    Application создаёт задачу на каждое обновление и сразу забирает
+    следующее из update_queue, поэтому порядок входа в do_process_update
+    совпадает с порядком в очереди, а pending — все полученные, но ещё не
+    обработанные обновления (их учитывает webhook при переполнении).
+    """
+
+    def __init__(self, concurrency: int = UPDATE_CONCURRENCY):
+        super().__init__(_UNBOUNDED)
+        self.concurrency = concurrency
+        self._slots = None
+        self._chats = {}
+
+        self.pending = 0
+        self.processed = 0
+        self.running = 0
+        self.waiting_chat = 0
+        self.waiting_slot = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def initialize(self):
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    async def shutdown(self):
+        pass
+
+    async def do_process_update(self, update: object, coroutine):
+        key = _chat_key(update)
+        enqueued_at = time.monotonic()
+        self.pending += 1
+        try:
+            if key is not None:
+                await self._chat_turn(key)
+        except asyncio.CancelledError:
+            self.pending -= 1
+            raise
+        try:
+            self.waiting_slot += 1
+            try:
+                await self._slots.acquire()
+            finally:
+                self.waiting_slot -= 1
+            try:
+                self._record(time.monotonic() - enqueued_at)
+                self.running += 1
+                await coroutine
+            finally:
+                self.running -= 1
+                self._slots.release()
+        finally:
+            self.pending -= 1
+            if key is not None:
+                self._next_turn(key)
+
+    def stats(self):
+        """Обработано, в работе, глубина очередей и ожидание до начала обработки"""
+        return {
+            'pending': self.pending,
+            'processed': self.processed,
+            'running': self.running,
+            'waiting_chat': self.waiting_chat,
+            'waiting_slot': self.waiting_slot,
+            'busy_chats': len(self._chats),
+            'wait_avg': self.wait_total / self.processed if self.processed else 0.0,
+            'wait_max': self.wait_max
+        }
+
+    async def _chat_turn(self, key):
+        """Дожидается, пока чат освободится от предыдущих обновлений"""
+        queue = self._chats.get(key)
+        if queue is None:
+            # Чат свободен: отмечаем его занятым, очередь пока пуста
+            self._chats[key] = deque()
+            return
+
+        turn = asyncio.get_running_loop().create_future()
+        queue.append(turn)
+        self.waiting_chat += 1
+        try:
+            await turn
+        except asyncio.CancelledError:
+            # Очередь уже передана этому обновлению — передаём её дальше
+            if turn.done() and not turn.cancelled():
+                self._next_turn(key)
+            raise
+        finally:
+            self.waiting_chat -= 1
+
+    def _next_turn(self, key):
+        """Передаёт чат следующему ожидающему обновлению или освобождает его"""
+        queue = self._chats[key]
+        while queue:
+            turn = queue.popleft()
+            if not turn.done():  # Ожидание не отменено
+                turn.set_result(None)
+                return
+        del self._chats[key]
+
+    def _record(self, waited: float):
+        self.processed += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
@@ -0,0 +1,113 @@
+import os
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from models import User, UserRole
+from database import async_read_session_scope
+
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '300'))  # секунд
+
+class UserIdentity(NamedTuple):
+    """Неизменяемый снимок данных пользователя, нужных для проверки доступа"""
+    id: int
+    full_name: str
+    role: UserRole
+    is_blocked: bool
+    branch: str
+
+    @property
+    def is_admin(self):
+        return self.role == UserRole.ADMIN
+
+    @classmethod
+    def from_user(cls, user: User):
+        return cls(
+            id=user.id,
+            full_name=user.full_name,
+            role=user.role,
+            is_blocked=bool(user.is_blocked),
+            branch=user.branch
+        )
+
+class UserCache:
+    """LRU-кэш пользователей с ограничением времени жизни записей.
+
+    Кэшируется и отсутствие пользователя (None), поэтому после регистрации,
+    изменения профиля или действий администратора запись нужно обновить
+    через update() или сбросить через invalidate().
+    """
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Идущие загрузки из БД: user_id -> [число загрузок, версия записи].
+        # update()/invalidate() во время загрузки повышают версию, и
+        # загруженная до изменения строка не попадает в кэш
+        self._loading = {}
+
+    async def get(self, user_id: int) -> Optional[UserIdentity]:
+        """Возвращает пользователя из кэша, при промахе загружает из БД"""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        loading = self._loading.setdefault(user_id, [0, 0])
+        loading[0] += 1
+        version = loading[1]
+        try:
+            async with async_read_session_scope() as session:
+                user = await session.get(User, user_id)
+                identity = UserIdentity.from_user(user) if user else None
+        finally:
+            loading[0] -= 1
+            if not loading[0]:
+                del self._loading[user_id]
+        if loading[1] == version:
+            self._store(user_id, identity)
+        return identity
+
+    def update(self, user: User):
+        """Записывает в кэш актуальные данные пользователя после изменения"""
+        self._changed(user.id)
+        self._store(user.id, UserIdentity.from_user(user))
+
+    def invalidate(self, user_id: int):
+        """Удаляет пользователя из кэша"""
+        self._changed(user_id)
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        for loading in self._loading.values():
+            loading[1] += 1
+        self._entries.clear()
+
+    def stats(self):
+        """Счётчики попаданий и промахов"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def _changed(self, user_id: int):
+        loading = self._loading.get(user_id)
+        if loading is not None:
+            loading[1] += 1
+
+    def _store(self, user_id: int, identity: Optional[UserIdentity]):
+        self._entries[user_id] = (identity, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+user_cache = UserCache()
@@ -0,0 +1,241 @@
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import signal
+from urllib.parse import urlsplit
+from telegram import Update
+from metrics import registry
+
+# Режим получения обновлений: polling (getUpdates) или webhook
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+
+# Публичный https-адрес, на который Telegram шлёт обновления, и где его
+# слушать (обычно за обратным прокси). Путь по умолчанию — из WEBHOOK_URL
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH')
+
+# Секрет из заголовка X-Telegram-Bot-Api-Secret-Token; если не задан,
+# генерируется при каждом запуске (его всё равно передаёт setWebhook)
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+
+# Соединений, которые Telegram держит одновременно; сколько необработанных
+# обновлений допускается в очереди (сверх — 503, Telegram повторит позже);
+# предел тела запроса (байт) и простоя keep-alive соединения (сек)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+WEBHOOK_MAX_QUEUE = int(os.getenv('WEBHOOK_MAX_QUEUE', '1000'))
+WEBHOOK_MAX_BODY = int(os.getenv('WEBHOOK_MAX_BODY', str(1024 * 1024)))
+WEBHOOK_IDLE_TIMEOUT = float(os.getenv('WEBHOOK_IDLE_TIMEOUT', '75'))
+
+_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    503: 'Service Unavailable'
+}
+
+def _response(status: int, keep_alive: bool) -> bytes:
+    connection = 'keep-alive' if keep_alive else 'close'
+    return (
+        f'HTTP/1.1 {status} {_REASONS[status]}\r\n'
+        f'Content-Length: 0\r\n'
+        f'Connection: {connection}\r\n\r\n'
+    ).encode()
+
+# Ответы без тела собраны заранее: (статус, keep-alive) -> байты
+_RESPONSES = {
+    (status, keep_alive): _response(status, keep_alive)
+    for status in _REASONS
+    for keep_alive in (True, False)
+}
+
+class WebhookServer:
+    """Встроенный HTTP/1.1-сервер для webhook Telegram на asyncio.
+
+    Принимает только POST на path с верным секретом. Тело разбирается один
+    раз: json.loads -> Update.de_json, и готовый Update кладётся в
+    application.update_queue, откуда его берёт Application, как при
+    polling. 200 отправляется сразу после постановки в очередь, не
+    дожидаясь обработки. Если необработанных уже max_queue, сервер
+    отвечает 503, и Telegram повторяет доставку позже. Соединения
+    keep-alive: Telegram держит до max_connections соединений и шлёт по
+    ним обновления подряд.
+    """
+
+    def __init__(self, application, path: str, secret: str, max_queue: int = WEBHOOK_MAX_QUEUE,
+                 max_body: int = WEBHOOK_MAX_BODY, idle_timeout: float = WEBHOOK_IDLE_TIMEOUT):
+        self.application = application
+        self.path = path
+        self.max_queue = max_queue
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self._secret = secret.encode()
+        self._server = None
+        self._connections = set()
+        self.received = 0
+        self.rejected = {}
+
+    @property
+    def port(self) -> int:
+        """Порт, который слушает сервер (нужен, если запущен на порту 0)"""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str, port: int):
+        self._server = await asyncio.start_server(self._serve, host, port)
+
+    async def stop(self):
+        """Перестаёт принимать соединения и закрывает открытые"""
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    def backlog(self) -> int:
+        """Обновления, принятые, но ещё не обработанные. При параллельной
+        обработке Application сразу забирает их из update_queue, и они
+        учитываются в pending обработчика обновлений"""
+        processor = self.application.update_processor
+        return self.application.update_queue.qsize() + getattr(processor, 'pending', 0)
+
+    def stats(self):
+        """Принято обновлений, отказы по статусам, необработанные обновления"""
+        return {
+            'received': self.received,
+            'rejected': dict(self.rejected),
+            'backlog': self.backlog()
+        }
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.idle_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    return
+
+                try:
+                    request_line, *header_lines = head[:-4].decode('latin-1').split('\r\n')
+                    method, target, version = request_line.split(' ', 2)
+                    headers = {}
+                    for line in header_lines:
+                        name, _, value = line.partition(':')
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get('content-length', '0'))
+                except ValueError:
+                    writer.write(_RESPONSES[400, False])
+                    await writer.drain()
+                    return
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                if length > self.max_body or 'transfer-encoding' in headers:
+                    status = 413 if length > self.max_body else 400
+                    self.rejected[status] = self.rejected.get(status, 0) + 1
+                    writer.write(_RESPONSES[status, False])
+                    await writer.drain()
+                    return
+
+                try:
+                    body = await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+
+                status = self._accept(method, target, headers, body)
+                writer.write(_RESPONSES[status, keep_alive])
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    def _accept(self, method: str, target: str, headers: dict, body: bytes) -> int:
+        """Проверяет запрос и ставит обновление в очередь; возвращает статус ответа"""
+        if target != self.path:
+            status = 404
+        elif method != 'POST':
+            status = 405
+        elif not hmac.compare_digest(
+            headers.get('x-telegram-bot-api-secret-token', '').encode('latin-1'), self._secret
+        ):
+            status = 403
+        elif self.backlog() >= self.max_queue:
+            status = 503
+        else:
+            try:
+                update = Update.de_json(json.loads(body), self.application.bot)
+            except (ValueError, TypeError, KeyError, AttributeError):
+                update = None
+            if update is None:
+                status = 400
+            else:
+                self.application.update_queue.put_nowait(update)
+                self.received += 1
+                return 200
+
+        self.rejected[status] = self.rejected.get(status, 0) + 1
+        return status
+
+def _webhook_metrics(stats: dict) -> dict:
+    """stats() сервера для метрик: отказы — с меткой HTTP-статуса"""
+    rejected = stats.pop('rejected')
+    return {**stats, **{status: {'rejected': count} for status, count in rejected.items()}}
+
+async def run_webhook(application, url: str = WEBHOOK_URL, listen: str = WEBHOOK_LISTEN,
+                      port: int = WEBHOOK_PORT, path: str = WEBHOOK_PATH, secret: str = WEBHOOK_SECRET,
+                      stop: asyncio.Event = None):
+    """Работает в режиме webhook до SIGINT/SIGTERM (или до stop).
+
+    Жизненный цикл Application тот же, что у run_polling(), включая
+    post_init/post_stop/post_shutdown. Переключение с polling без потерь:
+    сервер начинает слушать до setWebhook, а обновления, накопившиеся у
+    Telegram, он доставит на webhook. Работающий по-старому экземпляр
+    после setWebhook получает 409 на getUpdates и может быть остановлен.
+    Обратно на polling бот переходит сам: run_polling() удаляет webhook.
+    При остановке webhook не удаляется — Telegram копит обновления до
+    следующего запуска.
+    """
+    if not url:
+        raise ValueError('Для режима webhook нужен WEBHOOK_URL')
+    secret = secret or secrets.token_urlsafe(32)
+    server = WebhookServer(application, path or urlsplit(url).path or '/', secret)
+    registry.register_stats('webhook', lambda: _webhook_metrics(server.stats()), label='status')
+
+    if stop is None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    try:
+        await server.start(listen, port)
+        await application.bot.set_webhook(
+            url,
+            secret_token=secret,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=Update.ALL_TYPES
+        )
+        await stop.wait()
+    finally:
+        await server.stop()
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
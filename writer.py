@@ -0,0 +1,135 @@
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from sqlalchemy.orm import sessionmaker
+
+from database import engine
+
+# Максимум операций в одной транзакции и время добора пачки (сек)
+WRITER_MAX_BATCH = int(os.getenv('WRITER_MAX_BATCH', '256'))
+WRITER_MAX_DELAY = float(os.getenv('WRITER_MAX_DELAY', '0.002'))
+
+class GroupCommitWriter:
+    """Единственный поток записи с групповой фиксацией транзакций.
+
+    Обработчики передают небольшие операции записи — синхронные функции
+    вида operation(session, *args), например repository.mark_block_checked.
+    Поток собирает из очереди всё, что накопилось (и добирает до
+    max_delay), выполняет пачку в одной транзакции и делает один COMMIT.
+    Корутина, вызвавшая submit(), получает результат своей операции только
+    после фиксации пачки.
+
+    Если какая-то операция пачки падает, пачка откатывается и операции
+    повторяются по одной в отдельных транзакциях, так что ошибка одной
+    не влияет на остальные.
+    """
+
+    def __init__(self, db_engine=engine, max_batch: int = WRITER_MAX_BATCH,
+                 max_delay: float = WRITER_MAX_DELAY):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.commits = 0
+        self.operations = 0
+        # Операции могут вернуть строки ORM (например, пользователя для
+        # user_cache): после фиксации их атрибуты остаются загруженными
+        self._make_session = sessionmaker(bind=db_engine, expire_on_commit=False)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Запускает поток записи (повторный вызов ничего не делает)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Дожидается записи очереди и останавливает поток"""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    async def submit(self, operation, *args):
+        """Ставит операцию в очередь и ждёт фиксации её транзакции"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Операция выполняется в контексте вызвавшего обработчика, чтобы её
+        # запросы попали в журнал его обновления (query_profiler)
+        self._queue.put((operation, args, contextvars.copy_context(), loop, future))
+        return await future
+
+    def stats(self):
+        """Число операций, транзакций и средний размер пачки"""
+        return {
+            'operations': self.operations,
+            'commits': self.commits,
+            'batch_size': self.operations / self.commits if self.commits else 0.0,
+            'queued': self._queue.qsize()
+        }
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch: list):
+        try:
+            with self._make_session() as session:
+                results = [context.run(operation, session, *args) for operation, args, context, _, _ in batch]
+                session.commit()
+        except Exception as e:
+            if len(batch) > 1:
+                for item in batch:
+                    self._commit([item])
+            else:
+                _, _, _, loop, future = batch[0]
+                self._resolve(loop, future, error=e)
+            return
+
+        self.commits += 1
+        self.operations += len(batch)
+        for (_, _, _, loop, future), result in zip(batch, results):
+            self._resolve(loop, future, result)
+
+    @staticmethod
+    def _resolve(loop, future, result=None, error=None):
+        def deliver():
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        try:
+            loop.call_soon_threadsafe(deliver)
+        except RuntimeError:
+            pass  # Цикл событий уже закрыт
+
+writer = GroupCommitWriter()